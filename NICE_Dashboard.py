@@ -1,7 +1,28 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import dataclasses
 import io
+import zoneinfo
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import plotly.express as px
+
+from phonesystem import DEFAULT_CALENDAR, export_filename
+from phonesystem.bundle import bundle_filename, export_bundle, is_bundle, read_bundle
+from phonesystem.cache import ResultCache, cache_key
+from phonesystem.config import BUSINESS_HOURS, INTERVAL_MINUTES, PROFILE_LOG_PATH, SAVED_QUERIES_PATH
+from phonesystem.excel import WorkbookBuild
+from phonesystem.filters import FilterIndex
+from phonesystem.intervals import INTERVAL_COLUMNS, RATIO_METRICS, IntervalCube
+from phonesystem.multifile import files_name, process_pool, run_files
+from phonesystem.pipeline import excel_sheets
+from phonesystem.profiling import StageProfiler
+from phonesystem.query import QueryEngine, duckdb_available, load_saved_queries, save_query
+from phonesystem.repeat_contacts import repeat_rates
+from phonesystem.rules import default_rules
+from phonesystem.store import MonthStore
 
 # =========================
 # Session State Initialization
@@ -23,6 +44,131 @@ if "spam_calls_df" not in st.session_state:
 
 st.set_page_config(page_title="Phone System Data Analysis", layout="wide")
 
+
+# =========================
+# Shared Result Cache
+# =========================
+@st.cache_resource
+def result_cache():
+    # One cache per server process, shared by every session
+    return ResultCache()
+
+
+@st.cache_resource
+def export_executor():
+    # Background workbook builds, shared by every session
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="excel-export")
+
+
+@st.cache_resource
+def worker_pool():
+    # Parses several uploaded exports in parallel, shared by every session
+    return process_pool()
+
+
+def calendar_settings():
+    # Holidays and time zones on top of the configured DEFAULT_CALENDAR
+    unchanged = "As exported"
+    zones = [unchanged] + sorted(zoneinfo.available_timezones())
+    with st.expander("Business calendar"):
+        text = st.text_input(
+            "Holidays (YYYY-MM-DD, comma separated)",
+            value=", ".join(map(str, DEFAULT_CALENDAR.holidays)),
+        )
+        holidays = tuple(day.strip() for day in text.split(",") if day.strip())
+        if pd.to_datetime(pd.Series(holidays, dtype=object), errors="coerce").isna().any():
+            st.error("Holidays must be dates written as YYYY-MM-DD; ignoring them.")
+            holidays = ()
+
+        source = st.selectbox(
+            "Time zone of the export's start times", zones,
+            index=zones.index(DEFAULT_CALENDAR.source_timezone or unchanged),
+        )
+        timezones = {}
+        if source != unchanged:
+            columns = st.columns(len(BUSINESS_HOURS))
+            for column, department in zip(columns, BUSINESS_HOURS):
+                zone = column.selectbox(
+                    f"{department} hours in", zones,
+                    index=zones.index(DEFAULT_CALENDAR.timezones.get(department, unchanged)),
+                )
+                if zone != unchanged:
+                    timezones[department] = zone
+    return dataclasses.replace(
+        DEFAULT_CALENDAR,
+        holidays=holidays,
+        timezones=timezones,
+        source_timezone=None if source == unchanged else source,
+    )
+
+
+def bundle_bytes(result):
+    # Runs when the download button is clicked, not on every rerun
+    return export_bundle(result, io.BytesIO()).getvalue()
+
+
+def load_processed_sheets(processed_file):
+    if is_bundle(processed_file):
+        return read_bundle(processed_file)
+    return pd.read_excel(processed_file, sheet_name=None)
+
+
+@st.fragment
+def interval_heatmap(interval_df):
+    # Runs on its own, so changing a control keeps the selection tabs open
+    cube = IntervalCube.from_frame(interval_df)
+    col1, col2, col3 = st.columns(3)
+    metric = col1.selectbox("Metric", INTERVAL_COLUMNS + list(RATIO_METRICS), key="interval_metric")
+    minutes = col2.radio("Interval (minutes)", INTERVAL_MINUTES, index=1, horizontal=True, key="interval_minutes")
+    skills = sorted(interval_df["skill_name"].dropna().unique())
+    skill = col3.selectbox("Skill", ["All"] + skills, key="interval_skill")
+
+    grid = cube.grid(metric, minutes=minutes, skill_name=None if skill == "All" else skill)
+    fig = px.imshow(
+        grid, aspect="auto", color_continuous_scale="Blues",
+        labels={"x": "Interval start", "y": "Day of week", "color": metric},
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Busiest intervals of the selection
+    busiest = grid.stack().sort_values(ascending=False).head(10).rename(metric)
+    st.dataframe(busiest.rename_axis(["day_of_week", "interval_start"]).reset_index(), hide_index=True)
+
+
+def session_query_engine(slot, key, build):
+    # One DuckDB connection per session and source, replaced when the source changes
+    if st.session_state.get(f"{slot}_engine_key") != key:
+        previous = st.session_state.get(f"{slot}_engine")
+        if previous is not None:
+            previous.close()
+        st.session_state[f"{slot}_engine"] = build()
+        st.session_state[f"{slot}_engine_key"] = key
+    return st.session_state[f"{slot}_engine"]
+
+
+@st.fragment
+def query_panel(engine, key):
+    # Saved and ad-hoc SQL over the engine's views; runs on its own like the heatmap
+    saved = load_saved_queries()
+    col1, col2 = st.columns([1, 2])
+    name = col1.selectbox("Saved query", list(saved), key=f"{key}_saved")
+    with col1.expander("Tables"):
+        for table in engine.tables():
+            st.caption(table)
+            st.dataframe(engine.describe(table)[["column_name", "column_type"]], hide_index=True)
+
+    sql = col2.text_area("SQL", value=saved[name], height=200, key=f"{key}_sql_{name}")
+    if col2.button("Run Query", key=f"{key}_run"):
+        try:
+            st.dataframe(engine.query(sql), use_container_width=True)
+        except ValueError as error:
+            st.error(str(error))
+
+    save_name = col2.text_input("Save query as", key=f"{key}_name")
+    if col2.button("Save Query", key=f"{key}_save") and save_name:
+        save_query(save_name, sql)
+        st.success(f"Saved {save_name} to {SAVED_QUERIES_PATH}")
+
 # =========================
 # Custom CSS
 # =========================
@@ -121,445 +267,157 @@ for title, text in sections.items():
 # File Upload
 # =========================
 st.subheader("Phone System File Upload")
-phonesystem_file = st.file_uploader(
-    "Upload Phone System Data File",
-    type=["xlsx", "xls"]
+phonesystem_files = st.file_uploader(
+    "Upload Phone System Data Files (one or more monthly or site exports)",
+    type=["xlsx", "xls", "csv"],
+    accept_multiple_files=True
+)
+normalized_output = st.toggle(
+    "Write number and team frequencies as separate tables",
+    value=False
+)
+build_excel = st.toggle(
+    "Also build the Excel workbook",
+    value=True
+)
+use_store = st.toggle(
+    "Merge into the local month store",
+    value=False
+)
+store_dir = None
+if use_store:
+    store_dir = st.text_input("Month store directory", value="phonesystem_store")
+calendar = calendar_settings()
+track_memory = st.toggle(
+    "Also trace allocations per stage (slower; traced runs wait for each other)",
+    value=False
 )
 process_button = st.button("Process New Data")
-
-if phonesystem_file is not None and process_button:
-    with st.spinner("Processing data... Please wait."):
-
-        # =========================
-        # Load Data
-        # =========================
-        total_calls = pd.read_excel(phonesystem_file)
-        total_calls.drop(columns=['ACW_Time'], inplace=True, errors='ignore')
-
-        total_calls["start_date"] = pd.to_datetime(total_calls["start_date"], errors="coerce")
-        total_calls["start_time"] = pd.to_datetime(
-            total_calls["start_date"].astype(str) + " " + total_calls["start_time"].astype(str),
-            errors="coerce"
-        )
-        total_calls.sort_values("start_time", inplace=True)
-
-        total_calls['Total_Time'] = total_calls['Total_Time'].fillna(0)
-        total_calls['team_name'] = total_calls['team_name'].fillna('No Assigned Team')
-
-        for col in ["master_contact_id", "contact_id", "contact_name"]:
-            total_calls[col] = total_calls[col].astype(str)
-
-        # =========================
-        # Spam Filter
-        # =========================
-        excluded_mask = (total_calls["InQueue"] == 0) & (total_calls["PreQueue"] > 0)
-        spam_calls_df = total_calls.loc[excluded_mask].copy()
-        excluded_calls = len(spam_calls_df)
-        total_calls = total_calls.loc[~excluded_mask].copy()
-        st.info(f"{excluded_calls} calls classified as spam and removed.")
-
-        # =========================
-        # Timeframe
-        # =========================
-        total_calls["Timeframe"] = total_calls["start_date"].dt.to_period("M").dt.to_timestamp()
-
-        # =========================
-        # Time Calculations
-        # =========================
-        total_calls['Agent_Work_Time'] = total_calls['ACW_Seconds'].fillna(0) + total_calls['Agent_Time'].fillna(0)
-        time_cols = ['PreQueue', 'InQueue', 'Agent_Time', 'PostQueue']
-        total_calls['customer_call_time'] = total_calls[time_cols].sum(axis=1)
-
-        # =========================
-        # Call Category
-        # =========================
-        skill_clean = total_calls["skill_name"].astype(str).str.lower().str.replace(" ", "", regex=False)
-        total_calls["call_category"] = np.select(
-            [   skill_clean.str.contains(r"\bafterhours\b", na=False),
-                skill_clean.str.contains(r"\bnoagent\b", na=False),
-                skill_clean.str.contains(r"\bib\b", na=False),
-                skill_clean.str.contains(r"\bob\b|\boutreach\b", na=False, regex=True),
-                skill_clean.str.contains(r"\bvm\b", na=False),
-            ],
-            [   "After Hours",
-                "No Agent",
-                "Inbound",
-                "Outbound",
-                "Voicemail",
-            ],
-            default="Other"
-        )
-
-        # =========================
-        # Team → Department Mapping
-        # =========================
-        team_to_dept = {
-            'Field Services': 'Deployment',
-            'Comissioning': 'Deployment',
-            'SB-AM': 'Sales',
-            'SDR Team': 'Sales',
-            'Account Manager': 'Sales',
-            'Inside Sales': 'Sales',
-            'Billing': 'Billing and Collections',
-            'Collections': 'Billing and Collections',
-            'Business Support': 'Billing and Collections',
-            'MCF Support': 'Customer Support',
-            'Customer Support ATL': 'Customer Support',
-            'Solutions': 'Customer Support',
-            'Level 2 Support': 'Customer Support',
-            'Admin': 'Technical Team',
-            'Test': 'Technical Team',
-            'No Assigned Team': 'Other',
-            'Default Team': 'Other'
-        }
-        total_calls["department"] = total_calls["team_name"].map(team_to_dept).fillna("Other")
-
-        # =========================
-        # Business Hours
-        # =========================
-        business_hours = {
-            "Customer Support": (7, 0, 18, 30),
-            "Sales": (8, 0, 17, 0),
-            "Billing and Collections": (8, 0, 17, 0),
-            "Technical Team": (9, 0, 17, 0),
-            "Other": (9, 0, 17, 0)
-        }
-
-        def is_business_hours(row):
-            dep = row['department']
-            call_time = row['start_time']
-            if pd.isna(call_time):
-                return 0
-            start_h, start_m, end_h, end_m = business_hours.get(dep, (9, 0, 17, 0))
-            start_dt = call_time.replace(hour=start_h, minute=start_m, second=0)
-            end_dt = call_time.replace(hour=end_h, minute=end_m, second=0)
-            return int(start_dt <= call_time <= end_dt)
-
-        total_calls['Business_Hours'] = total_calls.apply(is_business_hours, axis=1)
-
-        # =========================
-        # Monthly Aggregation - Team View
-        # =========================
-        st.session_state.dfs = {}
-        call_type_options = [
-            "All Calls", "All Calls Business Hours",
-            "Inbound", "Inbound Business Hours",
-            "Outbound", "Outbound Business Hours",
-            "Voicemail", "Voicemail Business Hours",
-            "After Hours", "After Hours Business Hours",
-            "No Agent", "No Agent Business Hours"
-        ]
-
-        # =========================
-        # Monthly Aggregation
-        # =========================
-        st.session_state.skill_dfs = {}
-
-        for option in call_type_options:
-            if option == "All Calls":
-                df_filtered = total_calls.copy()
-            elif option == "All Calls Business Hours":
-                df_filtered = total_calls[total_calls["Business_Hours"] == 1]
-            elif option.endswith("Business Hours"):
-                base_category = option.replace(" Business Hours", "")
-                df_filtered = total_calls[
-                    (total_calls["call_category"] == base_category) &
-                    (total_calls["Business_Hours"] == 1)
-                ]
-            else:
-                df_filtered = total_calls[total_calls["call_category"] == option]
-
-            if df_filtered.empty:
-                st.session_state.skill_dfs[option] = pd.DataFrame()
-                continue
-
-            monthly_skill_calls = (
-                df_filtered
-                .groupby(["skill_name", "department", 'team_name', "Timeframe"])
-                .agg(
-                    call_volume=("master_contact_id", "count"),
-
-                    total_customer_call_time=("customer_call_time", "sum"),
-                    prequeue_time=("PreQueue", "sum"),
-                    inqueue_time=("InQueue", "sum"),
-                    agent_time=("Agent_Time", "sum"),
-                    postqueue_time=("PostQueue", "sum"),
-                    acw_time=("ACW_Seconds", "sum"),
-                    agent_total_time=("Agent_Work_Time", "sum"),
-                    abandon_time=("Abandon_Time", "sum"),
-
-                    sla_missed=("SLA", lambda x: (x == -1).sum()),
-                    sla_met=("SLA", lambda x: (x == 0).sum()),
-                    sla_exceeded=("SLA", lambda x: (x == 1).sum()),
-
-                    business_hours_calls=("Business_Hours", lambda x: (x == 1).sum()),
-                    after_hours_calls=("Business_Hours", lambda x: (x == 0).sum()),
-
-                    unique_agents_count=("agent_name", "nunique"),
-                    unique_teams_count=("team_name", "nunique"),
-                    unique_campaigns_count=("campaign_name", "nunique"),
-
-
-                    agents_list=("agent_name", lambda x: list(x.dropna().unique())),
-                    teams_list=("team_name", lambda x: list(x.dropna().unique())),
-                    campaigns_dict=("campaign_name", lambda x: x.value_counts().to_dict()),
-
-                    inbound_calls=("call_category", lambda x: (x == "Inbound").sum()),
-                    outbound_calls=("call_category", lambda x: (x == "Outbound").sum()),
-                    voicemail_calls=("call_category", lambda x: (x == "Voicemail").sum()),
-                    afterhours_calls=("call_category", lambda x: (x == "After Hours").sum()),
-                    noagent_calls=("call_category", lambda x: (x == "No Agent").sum()),
-                    other_calls=("call_category", lambda x: (x == "Other").sum()),
-                )
-                .reset_index()
-                .sort_values(["Timeframe", "skill_name"])
-            )
-
-
-
-            # =========================
-            # Add Internal/External Number Dictionaries
-            # =========================
-
-            def build_internal_dict(group):
-                combined = pd.concat([
-                    group.loc[group["call_category"] == "Outbound", "ANI"],
-                    group.loc[group["call_category"] != "Outbound", "DNIS"],
-                ])
-                return combined.dropna().value_counts().to_dict()
-
-            def build_external_dict(group):
-                combined = pd.concat([
-                    group.loc[group["call_category"] == "Outbound", "DNIS"],
-                    group.loc[group["call_category"] != "Outbound", "ANI"],
-                ])
-                return combined.dropna().value_counts().to_dict()
-
-
-            internal_dict_series = (
-                df_filtered
-                .groupby(["skill_name", "department", "team_name", "Timeframe"])
-                .apply(build_internal_dict)
-                .reset_index(name="internal_num_dict")
-            )
-
-            external_dict_series = (
-                df_filtered
-                .groupby(["skill_name", "department", "team_name", "Timeframe"])
-                .apply(build_external_dict)
-                .reset_index(name="external_num_dict")
-            )
-
-            monthly_skill_calls = monthly_skill_calls.merge(
-                internal_dict_series,
-                on=["skill_name", "department", "team_name", "Timeframe"],
-                how="left"
-            )
-
-            monthly_skill_calls = monthly_skill_calls.merge(
-                external_dict_series,
-                on=["skill_name", "department", "team_name", "Timeframe"],
-                how="left"
-            )
-
-
-            monthly_skill_calls["Timeframe"] = (
-                pd.to_datetime(monthly_skill_calls["Timeframe"], errors="coerce")
-                .dt.to_period("M")
+store_button = use_store and st.button("Rebuild From Month Store")
+
+# Classification rules ($PHONESYSTEM_RULES), re-read when the file changes
+rules = default_rules()
+
+result = None
+# Identifies the data behind ``result``; exports are rebuilt only when it changes
+result_key = None
+profiler = StageProfiler(trace_memory=track_memory)
+if phonesystem_files and process_button:
+    with st.spinner("Processing data... Please wait."), profiler.activate():
+
+        if use_store:
+            store = MonthStore(store_dir)
+            updated_months = store.ingest(
+                phonesystem_files, calendar=calendar, rules=rules, executor=worker_pool()
             )
-
-
-            st.session_state.skill_dfs[option] = monthly_skill_calls
-
-
-        # =========================
-        # Master Contact View
-        # =========================
-        master_contact_df = (
-            total_calls
-            .groupby("master_contact_id")
-            .agg(
-                # Identifiers
-                contact_id=("contact_id", lambda x: list(x.dropna().unique())),
-
-                # Timing Columns (as lists)
-                PreQueue=("PreQueue", lambda x: list(x.fillna(0))),
-                InQueue=("InQueue", lambda x: list(x.fillna(0))),
-                Agent_Time=("Agent_Time", lambda x: list(x.fillna(0))),
-                ACW_Seconds=("ACW_Seconds", lambda x: list(x.fillna(0))),
-                PostQueue=("PostQueue", lambda x: list(x.fillna(0))),
-
-                # Call Info
-                skill_name=("skill_name", lambda x: list(x.dropna().unique())),
-                team_name=("team_name", lambda x: list(x.dropna().unique())),
-                department=("department", lambda x: list(x.dropna().unique())),
-                agent_name=("agent_name", lambda x: list(x.dropna().unique())),
-                call_category=("call_category", lambda x: list(x.dropna().unique())),
-
-                # SLA Counts
-                sla_missed=("SLA", lambda x: (x == -1).sum()),
-                sla_met=("SLA", lambda x: (x == 0).sum()),
-                sla_exceeded=("SLA", lambda x: (x == 1).sum()),
-
-                # Business Hours
-                business_hours_flag=("Business_Hours", lambda x: int((x == 1).any())),
-                business_hours_list=("Business_Hours", lambda x: list(x.fillna(0))),
-
-                # Dates
-                start_time=("start_time", lambda x: list(x.dt.strftime("%Y-%m-%d %H:%M:%S"))),
-                Timeframe=("Timeframe", "first"),
-
-                # Optional: total customer time per interaction
-                customer_call_time=("customer_call_time", lambda x: list(x.fillna(0))),
-                agent_total_time = ('Agent_Work_Time', lambda x: list(x.fillna(0))),
+            st.info(f"Updated months: {', '.join(updated_months) or 'none'}")
+            result = store.result(normalized=normalized_output)
+            result_key = f"store:{store.fingerprint()}:{normalized_output}"
+        else:
+            # Files are parsed in parallel; later uploads win on duplicate contact_id
+            key = cache_key(
+                phonesystem_files, stage="pipeline",
+                normalized=normalized_output, calendar=calendar, rules=rules.to_dict(),
             )
-            .reset_index()
-        )
-
-        # Build internal/external number lists separately
-        def build_internal_numbers(group):
-            combined = pd.concat([
-                group.loc[group["call_category"] == "Outbound", "ANI"],
-                group.loc[group["call_category"] != "Outbound", "DNIS"],
-            ])
-            return combined.dropna().unique().tolist()
-
-        def build_external_numbers(group):
-            combined = pd.concat([
-                group.loc[group["call_category"] == "Outbound", "DNIS"],
-                group.loc[group["call_category"] != "Outbound", "ANI"],
-            ])
-            return combined.dropna().unique().tolist()
-
-        internal_external_df = (
-            total_calls
-            .groupby("master_contact_id")
-            .apply(lambda g: pd.Series({
-                "internal_num_list": build_internal_numbers(g),
-                "external_num_list": build_external_numbers(g),
-            }))
-            .reset_index()
-        )
-
-        master_contact_df = master_contact_df.merge(
-            internal_external_df,
-            on="master_contact_id",
-            how="left"
-        )
-
-
-        master_contact_df["Timeframe"] = (
-            pd.to_datetime(master_contact_df["Timeframe"], errors="coerce")
-            .dt.to_period("M")
-        )
-
-
-
-        st.session_state.master_contact_df = master_contact_df
-        st.session_state.total_calls = total_calls
-        st.session_state.spam_calls_df = spam_calls_df
-
-
-
-        # =========================
-        # Phone Role Columns
-        # =========================
-        total_calls["internal_number"] = np.where(
-            total_calls["call_category"] == "Outbound",
-            total_calls["ANI"],
-            total_calls["DNIS"]
-        )
-
-        total_calls["external_number"] = np.where(
-            total_calls["call_category"] == "Outbound",
-            total_calls["DNIS"],
-            total_calls["ANI"]
-        )
-        # =========================
-        # Phone Numbers DataFrame
-        # =========================
-        phone_internal = total_calls.copy()
-        phone_internal["phone_number"] = phone_internal["internal_number"]
-        phone_internal["internal_external"] = "Internal"
-
-        phone_external = total_calls.copy()
-        phone_external["phone_number"] = phone_external["external_number"]
-        phone_external["internal_external"] = "External"
-
-        phone_df = pd.concat([phone_internal, phone_external], ignore_index=True)
-
-        phone_df = phone_df.dropna(subset=["phone_number"])
-
-        phone_numbers_df = (
-            phone_df
-            .groupby(["Timeframe", "phone_number", "internal_external"])
-            .agg(
-                contact_count=("master_contact_id", "count"),
-
-                teams_dict=("team_name", lambda x: x.value_counts().to_dict()),
-                departments_dict=("department", lambda x: x.value_counts().to_dict()),
-                agents_dict=("agent_name", lambda x: x.value_counts().to_dict()),
-                skillss_dict=("skill_name", lambda x: x.value_counts().to_dict()),
+            def process_files():
+                processed = run_files(
+                    phonesystem_files, calendar=calendar, normalized=normalized_output,
+                    rules=rules, executor=worker_pool(),
+                )
+                # Built before caching, so the cache counts it and the shared result is not changed later
+                processed.master_contact_frame()
+                return processed
+
+            result = result_cache().get_or_compute(key, process_files)
+            result_key = key
+
+elif store_button:
+    with st.spinner("Loading stored months... Please wait."), profiler.activate():
+        store = MonthStore(store_dir)
+        result = store.result(normalized=normalized_output)
+        result_key = f"store:{store.fingerprint()}:{normalized_output}"
+
+if result is not None:
+    st.info(f"{len(result.spam_calls)} calls classified as spam and removed.")
+    if result.coerced_start_times:
+        st.warning(f"{result.coerced_start_times} start times could not be parsed and were left empty.")
+
+    if result.memory_report is not None:
+        with st.expander("Call table memory"):
+            st.dataframe(result.memory_report, hide_index=True)
+
+    st.session_state.dfs = result.team_dfs
+    st.session_state.skill_dfs = result.skill_dfs
+    with profiler.activate():
+        st.session_state.master_contact_df = result.master_contact_frame()
+    st.session_state.total_calls = result.total_calls
+    st.session_state.spam_calls_df = result.spam_calls
+    st.session_state.phone_numbers_df = result.phone_numbers
 
-                total_agent_time=("Agent_Work_Time", "sum"),
-                total_customer_time=("customer_call_time", "sum"),
+    # =========================
+    # Processed Dataset Download
+    # =========================
+    st.subheader("Export All Data")
+    st.download_button(
+        label="Download Processed Dataset (Parquet)",
+        data=partial(bundle_bytes, result),
+        file_name=bundle_filename(result.total_calls),
+        mime="application/zip",
+        on_click="ignore"
+    )
 
-                call_times_list=("start_time", lambda x: list(
-                    x.dt.strftime("%Y-%m-%d %H:%M:%S")
-                ))
-            )
-            .reset_index()
+    # =========================
+    # Excel Download
+    # =========================
+    if build_excel:
+        # Written to a temporary file in the background, once per result; it
+        # is read only on a click, waiting for the build if needed. The file
+        # goes with the session state.
+        excel_build = st.session_state.get("excel_build")
+        if st.session_state.get("excel_build_key") != result_key:
+            if excel_build is not None:
+                excel_build.discard()
+            excel_build = WorkbookBuild.start(excel_sheets(result), export_executor())
+            st.session_state.excel_build = excel_build
+            st.session_state.excel_build_key = result_key
+        st.download_button(
+            label="Download Complete Excel Workbook",
+            data=excel_build.read,
+            file_name=export_filename(result.total_calls),
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            on_click="ignore"
         )
 
+    # =========================
+    # Stage Timings
+    # =========================
+    if profiler.records:
+        source = files_name(phonesystem_files) if phonesystem_files else store_dir
+        profiler.write_jsonl(PROFILE_LOG_PATH, source=source)
+        with st.expander("Stage timings"):
+            st.dataframe(profiler.to_frame(), hide_index=True)
+            st.caption(f"Appended to {PROFILE_LOG_PATH} (run {profiler.run_id})")
 
 
-        phone_numbers_df["Timeframe"] = (
-            pd.to_datetime(phone_numbers_df["Timeframe"], errors="coerce")
-            .dt.to_period("M")
+# =========================
+# Month Store Queries
+# =========================
+if use_store and duckdb_available() and MonthStore(store_dir).months():
+    # Scans the stored Parquet months in place, so years of calls need not fit in memory
+    with st.expander("Query the month store"):
+        store = MonthStore(store_dir)
+        store_engine = session_query_engine(
+            "store", repr(store.manifest()), lambda: QueryEngine.from_store(store)
         )
-
-        st.session_state.phone_numbers_df = phone_numbers_df
+        query_panel(store_engine, "store_query")
 
 
-
-        # =========================
-        # Excel Download
-        # =========================
-        st.subheader("Export All Data to Excel")
-        output = io.BytesIO()
-        if not total_calls.empty:
-            first_month = total_calls["start_date"].min().strftime("%b-%Y")
-            last_month = total_calls["start_date"].max().strftime("%b-%Y")
-            dynamic_filename = f"Phone_System_Analysis_{first_month}_to_{last_month}.xlsx"
-        else:
-            dynamic_filename = "Phone_System_Analysis.xlsx"
-
-        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-            # Team sheets
-            for option, df in st.session_state.dfs.items():
-                sheet_name = f"Team - {option}"[:31]
-                df_to_save = df if not df.empty else pd.DataFrame({"No Data": []})
-                df_to_save.to_excel(writer, sheet_name=sheet_name, index=False)
-
-            # Skill sheets
-            for option, df in st.session_state.skill_dfs.items():
-                sheet_name = f"Skill - {option}"[:31]
-                df_to_save = df if not df.empty else pd.DataFrame({"No Data": []})
-                df_to_save.to_excel(writer, sheet_name=sheet_name, index=False)
-
-            # Detail sheets
-            st.session_state.master_contact_df.to_excel(writer, sheet_name="Master_Contacts", index=False)
-            st.session_state.total_calls.to_excel(writer, sheet_name="Total_Calls", index=False)
-            st.session_state.spam_calls_df.to_excel(writer, sheet_name="Spam_Calls", index=False)
-            st.session_state.phone_numbers_df.to_excel(writer,sheet_name="Phone_Numbers",index=False)
-
-        output.seek(0)
-        st.download_button(
-            label="Download Complete Excel Workbook",
-            data=output,
-            file_name=dynamic_filename,
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+cache_stats = result_cache().stats()
+st.caption(
+    f"Result cache: {cache_stats.hits} hits, {cache_stats.misses} misses, "
+    f"{cache_stats.entries} entries, "
+    f"{cache_stats.bytes / 1e6:.0f} of {cache_stats.max_bytes / 1e6:.0f} MB"
+)
 
 
 # =========================
@@ -569,13 +427,23 @@ st.subheader("Processed Phone System File Upload")
 
 processed_file = st.file_uploader(
     "Upload Processed Phone System Data File",
-    type=["xlsx", "xls"]
+    type=["xlsx", "xls", "zip"]
 )
 
 if processed_file:
 
-    # Load ALL sheets into dictionary
-    all_sheets = pd.read_excel(processed_file, sheet_name=None)
+    # Load ALL sheets into dictionary (parsed once per file content)
+    sheets_key = cache_key(processed_file, stage="sheets")
+    all_sheets = result_cache().get_or_compute(
+        sheets_key,
+        lambda: load_processed_sheets(processed_file)
+    )
+
+    # Department / business hours row positions, built once per file
+    filter_index = result_cache().get_or_compute(
+        f"{sheets_key}:filter-index",
+        lambda: FilterIndex.build(all_sheets)
+    )
 
     # Store original sheets
     st.session_state.processed_sheets = all_sheets
@@ -583,26 +451,7 @@ if processed_file:
     # =========================
     # Collect Departments From NON-Master Sheets
     # =========================
-    department_set = set()
-
-    for sheet_name, df in all_sheets.items():
-
-        # Skip Master_Contacts (department is a list there)
-        if sheet_name == "Master_Contacts":
-            continue
-
-        if "department" in df.columns:
-
-            valid_departments = df["department"].dropna()
-
-            # Only keep scalar string values (ignore lists)
-            valid_departments = valid_departments[
-                valid_departments.apply(lambda x: isinstance(x, str))
-            ]
-
-            department_set.update(valid_departments.unique())
-
-    department_list = sorted(list(department_set))
+    department_list = filter_index.departments()
 
     # Add "All" option
     department_options = ["All"] + department_list
@@ -626,65 +475,17 @@ if processed_file:
 
     if selected_department and process_filtered_button:
 
-        filtered_sheets = {}
-
-        for sheet_name, df in all_sheets.items():
-
-            temp_df = df.copy()
-
-            # =========================
-            # Department Filtering
-            # =========================
-            if selected_department != "All":
-
-                if sheet_name == "Master_Contacts" and "department" in temp_df.columns:
-
-                    # Excel may store list column as string → convert safely
-                    def contains_department(value):
-                        if isinstance(value, list):
-                            return selected_department in value
-                        if isinstance(value, str):
-                            # Handle stringified list from Excel
-                            try:
-                                parsed = eval(value)
-                                if isinstance(parsed, list):
-                                    return selected_department in parsed
-                            except:
-                                return value == selected_department
-                        return False
-
-                    temp_df = temp_df[
-                        temp_df["department"].apply(contains_department)
-                    ]
-
-                elif "department" in temp_df.columns:
-                    temp_df = temp_df[
-                        temp_df["department"] == selected_department
-                    ]
-
-            # =========================
-            # Business Hours Filtering
-            # =========================
-            if exclude_outside_hours:
-
-                # TEAM & SKILL SHEETS → only keep Business Hours versions
-                if sheet_name.startswith("Team") or sheet_name.startswith("Skill"):
-                    if "Business Hours" not in sheet_name:
-                        continue
-
-                # TOTAL CALLS → row-level filter
-                if sheet_name == "Total_Calls" and "Business_Hours" in temp_df.columns:
-                    temp_df = temp_df[temp_df["Business_Hours"] == 1]
-
-                # MASTER CONTACTS → use aggregated flag
-                if sheet_name == "Master_Contacts" and "business_hours_flag" in temp_df.columns:
-                    temp_df = temp_df[temp_df["business_hours_flag"] == 1]
-
-            filtered_sheets[sheet_name] = temp_df
+        filtered_sheets = filter_index.select(
+            all_sheets,
+            department=selected_department,
+            business_hours_only=exclude_outside_hours
+        )
 
         st.session_state.filtered_sheets = filtered_sheets
 
-        tab1, tab2, tab3, tab4 = st.tabs(["Team", "Skill", "Customer", "Phone Numbers"])
+        tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(
+            ["Team", "Skill", "Customer", "Phone Numbers", "Intervals", "Query"]
+        )
 
         # =========================
         # TEAM TAB
@@ -699,6 +500,18 @@ if processed_file:
                 st.subheader(name)
                 st.dataframe(df, use_container_width=True)
 
+            # Team / department / company totals by month, quarter and year
+            rollup_sheets = {
+                name: df for name, df in filtered_sheets.items()
+                if name.startswith("Rollup - ")
+            }
+
+            if rollup_sheets:
+                st.subheader("Rollups")
+                for name, df in rollup_sheets.items():
+                    with st.expander(name.replace("Rollup - ", "").replace(" - ", " by ")):
+                        st.dataframe(df, use_container_width=True)
+
 
         # =========================
         # SKILL TAB
@@ -719,13 +532,26 @@ if processed_file:
         with tab3:
             customer_sheets = {
                 name: df for name, df in filtered_sheets.items()
-                if name in ["Master_Contacts", "Total_Calls"]
+                if name in ["Master_Contacts", "Transfer_Paths", "Total_Calls"]
             }
 
             for name, df in customer_sheets.items():
                 st.subheader(name)
                 st.dataframe(df, use_container_width=True)
 
+            # Callers who came back within 24 hours, 72 hours or 7 days
+            repeat_df = filtered_sheets.get("Repeat_Contacts", pd.DataFrame())
+
+            if not repeat_df.empty:
+                st.subheader("Repeat Contacts by Department")
+                st.dataframe(
+                    repeat_rates(repeat_df, ["department", "Timeframe"]),
+                    use_container_width=True
+                )
+
+                st.subheader("Repeat_Contacts")
+                st.dataframe(repeat_df, use_container_width=True)
+
         # =========================
         # PHONE NUMBER TAB
         # =========================
@@ -767,3 +593,37 @@ if processed_file:
 
             else:
                 st.write("No phone number data available.")
+
+        # =========================
+        # INTERVAL TAB
+        # =========================
+        with tab5:
+            interval_df = filtered_sheets.get("Interval_Calls", pd.DataFrame())
+
+            if not interval_df.empty:
+                st.subheader("Calls by Day of Week and Time of Day")
+                interval_heatmap(interval_df)
+
+            else:
+                st.write("No interval data available.")
+
+        # =========================
+        # QUERY TAB
+        # =========================
+        with tab6:
+            if duckdb_available():
+                # Bundles are scanned as Parquet; workbooks are registered as Arrow tables
+                engine = session_query_engine(
+                    "processed", sheets_key,
+                    lambda: (
+                        QueryEngine.from_bundle(processed_file) if is_bundle(processed_file)
+                        else QueryEngine.from_sheets(all_sheets)
+                    )
+                )
+                # The department and business-hours selection becomes a WHERE on each table
+                engine.select(selected_department, exclude_outside_hours)
+                st.caption(f"Tables: {', '.join(engine.tables())}")
+                query_panel(engine, "processed_query")
+
+            else:
+                st.write("Install duckdb to query the processed data with SQL.")
@@ -0,0 +1,63 @@
+"""Processing pipeline behind the Phone System Data Analysis dashboard."""
+
+from phonesystem.business_calendar import BusinessCalendar
+from phonesystem.master_contacts import MasterContactLegs
+from phonesystem.multifile import process_files, run_files
+from phonesystem.pipeline import (
+    BUSINESS_HOURS,
+    CALL_TYPE_OPTIONS,
+    DEFAULT_CALENDAR,
+    TEAM_TO_DEPT,
+    PipelineResult,
+    add_phone_roles,
+    aggregate_skills,
+    build_master_contacts,
+    build_phone_numbers,
+    build_result,
+    classify,
+    export,
+    export_filename,
+    load_calls,
+    process_calls,
+    run_pipeline,
+    split_spam,
+)
+from phonesystem.percentiles import PercentileSketch
+from phonesystem.query import QueryEngine
+from phonesystem.repeat_contacts import RepeatIndex
+from phonesystem.rollup import RollupCube
+from phonesystem.rules import ClassificationRules, load_rules
+from phonesystem.store import MonthStore
+from phonesystem.streaming import stream_pipeline
+
+__all__ = [
+    "BUSINESS_HOURS",
+    "BusinessCalendar",
+    "CALL_TYPE_OPTIONS",
+    "ClassificationRules",
+    "DEFAULT_CALENDAR",
+    "MasterContactLegs",
+    "MonthStore",
+    "TEAM_TO_DEPT",
+    "PercentileSketch",
+    "PipelineResult",
+    "QueryEngine",
+    "RepeatIndex",
+    "RollupCube",
+    "add_phone_roles",
+    "aggregate_skills",
+    "build_master_contacts",
+    "build_phone_numbers",
+    "build_result",
+    "classify",
+    "export",
+    "export_filename",
+    "load_calls",
+    "load_rules",
+    "process_calls",
+    "process_files",
+    "run_files",
+    "run_pipeline",
+    "split_spam",
+    "stream_pipeline",
+]
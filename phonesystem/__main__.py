@@ -0,0 +1,3 @@
+from phonesystem.cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,152 @@
+"""Benchmark the pipeline on synthetic exports.
+
+For each size a seeded synthetic export (see :mod:`phonesystem.synthetic`)
+is written as CSV, run through :func:`~phonesystem.pipeline.run_pipeline`
+and exported, with every pipeline stage timed by a
+:class:`~phonesystem.profiling.StageProfiler`. The Excel round-trip
+(workbook export, then reading every sheet back) is timed as well while
+the call table fits on one sheet::
+
+    python -m phonesystem.benchmark --sizes 10000 100000 --log bench.jsonl
+    python -m phonesystem.benchmark --sizes 10000 100000 --baseline bench.jsonl
+
+Runs are appended to the log as JSON lines, one per stage, so a later run
+can be compared against it and stages that got slower are reported.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+from phonesystem.bundle import export_bundle
+from phonesystem.pipeline import export, result_sheets, run_pipeline
+from phonesystem.profiling import StageProfiler, stage
+from phonesystem.synthetic import EXCEL_MAX_ROWS, generate_calls, write_calls
+
+
+BENCHMARK_SIZES = (10_000, 100_000, 1_000_000, 5_000_000)
+
+# A stage regresses when it is this much slower than the baseline...
+REGRESSION_RATIO = 1.25
+# ...and took at least this long there (shorter stages are mostly noise)
+REGRESSION_MIN_SECONDS = 0.05
+
+
+def benchmark_size(rows, workdir, seed=0, normalized=False, excel=True, trace_memory=False):
+    """Profile one synthetic export of ``rows`` legs. Returns the profiler."""
+    profiler = StageProfiler(trace_memory=trace_memory)
+    with profiler.activate():
+        with stage("generate") as record:
+            calls = generate_calls(rows, seed=seed)
+            record.rows_out = len(calls)
+        with stage("write source", rows) as record:
+            source = write_calls(calls, os.path.join(workdir, f"synthetic_{rows}.csv"))
+            record.rows_out = rows
+        del calls
+
+        with stage("pipeline total", rows) as record:
+            result = run_pipeline(source, normalized=normalized)
+            record.rows_out = len(result.total_calls)
+        export_bundle(result, os.path.join(workdir, f"synthetic_{rows}.parquet.zip"))
+
+        sheets = result_sheets(result)
+        if excel and max(len(df) for df in sheets.values()) <= EXCEL_MAX_ROWS:
+            workbook = export(result, os.path.join(workdir, f"synthetic_{rows}.xlsx"))
+            with stage("excel read", sum(len(df) for df in sheets.values())) as record:
+                read_back = pd.read_excel(workbook, sheet_name=None)
+                record.rows_out = sum(len(df) for df in read_back.values())
+        elif excel:
+            print(f"{rows} rows: Excel round-trip skipped, a sheet exceeds {EXCEL_MAX_ROWS} rows",
+                  file=sys.stderr)
+    return profiler
+
+
+def run_benchmark(sizes=BENCHMARK_SIZES, seed=0, normalized=False, excel=True,
+                  trace_memory=False, log_path=None):
+    """Stage timings for every size as one frame, optionally appended to ``log_path``."""
+    frames = []
+    with tempfile.TemporaryDirectory(prefix="phonesystem-bench-") as workdir:
+        for rows in sizes:
+            profiler = benchmark_size(
+                rows, workdir, seed=seed, normalized=normalized,
+                excel=excel, trace_memory=trace_memory,
+            )
+            if log_path:
+                profiler.write_jsonl(log_path, benchmark_rows=rows, seed=seed, normalized=normalized)
+            timings = profiler.to_frame()
+            timings.insert(0, "benchmark_rows", rows)
+            timings["run"] = profiler.run_id
+            frames.append(timings)
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_log(path):
+    """Latest logged run per benchmark size, one row per stage."""
+    log = pd.read_json(path, lines=True)
+    log = log[log["benchmark_rows"].notna()]
+    latest = log.groupby("benchmark_rows")["run"].last()
+    log = log[log["run"].isin(latest)]
+    return log.groupby(["benchmark_rows", "stage"], as_index=False, sort=False)["seconds"].sum()
+
+
+def compare(baseline, current, ratio=REGRESSION_RATIO, min_seconds=REGRESSION_MIN_SECONDS):
+    """Join two timing frames on size and stage and flag the stages that slowed down."""
+    merged = baseline.merge(
+        current[["benchmark_rows", "stage", "seconds"]],
+        on=["benchmark_rows", "stage"], suffixes=("_baseline", ""),
+    )
+    merged["ratio"] = (merged["seconds"] / merged["seconds_baseline"]).round(2)
+    merged["regression"] = (merged["ratio"] > ratio) & (merged["seconds_baseline"] >= min_seconds)
+    return merged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m phonesystem.benchmark",
+        description="Time every pipeline stage on synthetic exports.",
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=list(BENCHMARK_SIZES),
+        help="Export sizes in call legs (default: %(default)s)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument(
+        "--normalized", action="store_true",
+        help="Benchmark the tidy value-count tables instead of dict columns",
+    )
+    parser.add_argument("--no-excel", action="store_true", help="Skip the Excel round-trip")
+    parser.add_argument(
+        "--profile-memory", action="store_true",
+        help="Also trace peak allocations per stage (slows allocation-heavy stages)",
+    )
+    parser.add_argument("--log", metavar="JSONL", help="Append the stage timings to this file")
+    parser.add_argument(
+        "--baseline", metavar="JSONL",
+        help="Compare against the latest run per size in this log; exit 1 on a regression",
+    )
+    args = parser.parse_args(argv)
+
+    # Read the baseline first in case it is also the log being appended to
+    baseline = read_log(args.baseline) if args.baseline else None
+    timings = run_benchmark(
+        args.sizes, seed=args.seed, normalized=args.normalized, excel=not args.no_excel,
+        trace_memory=args.profile_memory, log_path=args.log,
+    )
+    print(timings.drop(columns="run").to_string(index=False))
+    if baseline is None:
+        return 0
+
+    comparison = compare(baseline, timings)
+    print(comparison.to_string(index=False))
+    regressions = comparison[comparison["regression"]]
+    for row in regressions.itertuples():
+        print(f"{row.benchmark_rows} rows: {row.stage} is {row.ratio}x slower than the baseline",
+              file=sys.stderr)
+    return 1 if len(regressions) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,145 @@
+"""Processed-dataset bundle.
+
+A bundle is a zip archive holding one typed Parquet file per sheet plus a
+``manifest.json`` that records sheet names and order. Unlike the Excel
+workbook it keeps dtypes: ``Timeframe`` periods, list columns and the
+``{value: count}`` dict columns (stored as Parquet maps) load back as-is.
+List columns are returned as numpy arrays per row.
+"""
+
+import io
+import itertools
+import json
+import zipfile
+
+import pandas as pd
+# Registers the pandas.period Arrow type, which pandas otherwise only does
+# on first conversion: without it a fresh process reads Timeframe as int64
+import pandas.core.arrays.arrow.extension_types  # noqa: F401
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from phonesystem.dtypes import widen_numbers
+from phonesystem.pipeline import export_filename, result_sheets
+from phonesystem.profiling import stage
+
+
+BUNDLE_SUFFIX = ".parquet.zip"
+MANIFEST = "manifest.json"
+FORMAT = "phonesystem-bundle"
+FORMAT_VERSION = 1
+
+
+def _first_valid(series):
+    for value in series:
+        if isinstance(value, (list, dict)) or not pd.isna(value):
+            return value
+    return None
+
+
+def _as_text(value):
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+def _dict_array(series):
+    keys = list(itertools.chain.from_iterable(d for d in series if isinstance(d, dict)))
+    try:
+        key_type = pa.array(keys).type
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        key_type = pa.string()
+    if pa.types.is_null(key_type):
+        key_type = pa.string()
+    if key_type == pa.string() or pa.types.is_large_string(key_type):
+        key_type = pa.string()
+        items = [
+            [(_as_text(k), v) for k, v in d.items()] if isinstance(d, dict) else None
+            for d in series
+        ]
+    else:
+        items = [list(d.items()) if isinstance(d, dict) else None for d in series]
+    return pa.array(items, type=pa.map_(key_type, pa.int64()))
+
+
+def _list_array(series):
+    values = [v if isinstance(v, list) else None for v in series]
+    try:
+        return pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array(
+            [[_as_text(x) for x in v] if v is not None else None for v in values],
+            type=pa.list_(pa.string()),
+        )
+
+
+def _column_array(series):
+    sample = _first_valid(series) if series.dtype == object else None
+    if isinstance(sample, dict):
+        return _dict_array(series)
+    if isinstance(sample, list):
+        return _list_array(series)
+    try:
+        return pa.Array.from_pandas(series)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed scalar types (e.g. numbers and labels in one column)
+        return pa.array([None if pd.isna(v) else _as_text(v) for v in series], type=pa.string())
+
+
+def to_table(df):
+    """Convert a sheet to an Arrow table, typing list and dict columns.
+
+    Narrow numbers of compacted frames are written as 64-bit, so sums in
+    readers and DuckDB cannot overflow.
+    """
+    df = widen_numbers(df)
+    columns = [_column_array(df[column]) for column in df.columns]
+    return pa.Table.from_arrays(columns, names=[str(column) for column in df.columns])
+
+
+def write_bundle(sheets, target):
+    """Write ``{sheet name: DataFrame}`` as a Parquet bundle to a path or buffer."""
+    manifest = {"format": FORMAT, "version": FORMAT_VERSION, "sheets": []}
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_STORED) as bundle:
+        for position, (name, df) in enumerate(sheets.items()):
+            member = f"{position:02d}.parquet"
+            buffer = io.BytesIO()
+            pq.write_table(to_table(df), buffer, compression="zstd")
+            bundle.writestr(member, buffer.getvalue())
+            manifest["sheets"].append({"name": name, "file": member, "rows": len(df)})
+        bundle.writestr(MANIFEST, json.dumps(manifest, indent=2))
+    return target
+
+
+def read_bundle(source, sheets=None):
+    """Load a bundle into ``{sheet name: DataFrame}``, optionally only ``sheets``."""
+    with zipfile.ZipFile(source) as bundle:
+        manifest = json.loads(bundle.read(MANIFEST))
+        if manifest.get("format") != FORMAT:
+            raise ValueError("Not a processed phone system bundle")
+
+        loaded = {}
+        for entry in manifest["sheets"]:
+            if sheets is not None and entry["name"] not in sheets:
+                continue
+            table = pq.read_table(io.BytesIO(bundle.read(entry["file"])))
+            loaded[entry["name"]] = table.to_pandas(maps_as_pydicts="strict")
+    return loaded
+
+
+def is_bundle(source):
+    """True when ``source`` (path or file object) looks like a bundle."""
+    name = getattr(source, "name", source)
+    return isinstance(name, str) and name.endswith(BUNDLE_SUFFIX)
+
+
+def bundle_filename(total_calls):
+    """Bundle name matching the dated Excel workbook name."""
+    return export_filename(total_calls).replace(".xlsx", BUNDLE_SUFFIX)
+
+
+def export_bundle(result, target):
+    """Write every view of a :class:`~phonesystem.pipeline.PipelineResult` as a bundle."""
+    sheets = result_sheets(result)
+    with stage("parquet export", sum(len(df) for df in sheets.values())) as record:
+        write_bundle(sheets, target)
+        record.rows_out = record.rows_in
+    return target
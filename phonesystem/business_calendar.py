@@ -0,0 +1,116 @@
+"""Vectorized business-hours calendar.
+
+Opening hours are expanded into a ``(department, weekday)`` table of
+open/close minutes once, then every call is flagged with array lookups
+against its minutes-since-midnight instead of a per-row Python function.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+
+WEEKDAYS = (0, 1, 2, 3, 4)
+
+
+@dataclass
+class BusinessCalendar:
+    """Department opening hours, weekly schedules, holidays and time zones.
+
+    ``hours`` maps a department to either a single ``(start_h, start_m,
+    end_h, end_m)`` tuple, applied on every day in ``workdays``, or to a
+    ``{weekday: (start_h, start_m, end_h, end_m)}`` dict (Monday is 0) for
+    departments with a different schedule per day. Days without an entry
+    are closed. ``timezones`` maps departments to the zone their hours are
+    expressed in; call times are read as ``source_timezone`` and converted
+    before comparison. Both boundaries are inclusive.
+    """
+
+    hours: dict
+    default_hours: tuple = (9, 0, 17, 0)
+    workdays: tuple = WEEKDAYS
+    holidays: tuple = ()
+    timezones: dict = field(default_factory=dict)
+    source_timezone: str = None
+
+    def _weekly(self, spec):
+        if isinstance(spec, dict):
+            return {int(day): hours for day, hours in spec.items()}
+        return {day: spec for day in self.workdays}
+
+    def schedule_table(self):
+        """Long-form ``department, weekday, open_minute, close_minute`` table.
+
+        The default schedule is listed under a ``None`` department.
+        """
+        records = []
+        specs = list(self.hours.items()) + [(None, self.default_hours)]
+        for department, spec in specs:
+            for day, (start_h, start_m, end_h, end_m) in sorted(self._weekly(spec).items()):
+                records.append((department, day, start_h * 60 + start_m, end_h * 60 + end_m))
+        return pd.DataFrame(
+            records, columns=["department", "weekday", "open_minute", "close_minute"]
+        )
+
+    def _minute_arrays(self):
+        # Row per department (default last), column per weekday; closed = -1/-2
+        departments = list(self.hours)
+        open_min = np.full((len(departments) + 1, 7), -1.0)
+        close_min = np.full((len(departments) + 1, 7), -2.0)
+        table = self.schedule_table()
+        dept_pos = table["department"].map({d: i for i, d in enumerate(departments)})
+        rows = dept_pos.fillna(len(departments)).to_numpy(dtype=np.int64)
+        days = table["weekday"].to_numpy(dtype=np.int64)
+        open_min[rows, days] = table["open_minute"].to_numpy()
+        close_min[rows, days] = table["close_minute"].to_numpy()
+        return departments, open_min, close_min
+
+    def localize(self, start_time, department):
+        """Convert naive call times into each department's local wall time."""
+        start_time = pd.to_datetime(start_time)
+        if not self.timezones or self.source_timezone is None:
+            return start_time
+
+        local = start_time.copy()
+        zones = department.map(self.timezones)
+        for zone in zones.dropna().unique():
+            mask = (zones == zone).to_numpy()
+            local.loc[mask] = (
+                start_time.loc[mask]
+                .dt.tz_localize(self.source_timezone, ambiguous="NaT", nonexistent="NaT")
+                .dt.tz_convert(zone)
+                .dt.tz_localize(None)
+            )
+        return local
+
+    def flag(self, start_time, department):
+        """Return an int array, 1 where the call falls inside business hours."""
+        department = pd.Series(department, copy=False).reset_index(drop=True)
+        start_time = pd.Series(start_time, copy=False).reset_index(drop=True)
+        if start_time.empty:
+            return np.zeros(0, dtype=np.int64)
+
+        local = self.localize(start_time, department)
+        departments, open_min, close_min = self._minute_arrays()
+
+        # Departments without their own hours (-1) take the default row
+        rows = pd.Index(departments).get_indexer(department)
+        rows[rows < 0] = len(departments)
+
+        valid = local.notna().to_numpy()
+        day_start = local.dt.normalize()
+        minute = ((local - day_start) / pd.Timedelta(minutes=1)).to_numpy(dtype=float, na_value=np.nan)
+        weekday = local.dt.weekday.to_numpy(dtype=float, na_value=0).astype(np.int64)
+
+        in_hours = (
+            valid
+            & (open_min[rows, weekday] <= minute)
+            & (minute <= close_min[rows, weekday])
+        )
+
+        if len(self.holidays):
+            holidays = pd.to_datetime(pd.Series(list(self.holidays))).dt.normalize()
+            in_hours &= ~day_start.isin(holidays).to_numpy()
+
+        return in_hours.astype(np.int64)
@@ -0,0 +1,178 @@
+"""Content-addressed result cache.
+
+Parsed workbooks and pipeline results are cached under a key built from
+the SHA-256 of the uploaded file's bytes plus the pipeline configuration,
+so the same export is parsed and aggregated once no matter which session
+uploads it. Entries are evicted least-recently-used once their estimated
+in-memory size exceeds the byte budget. The size is taken when a value is
+stored, so values must be complete then and not grow while cached.
+"""
+
+import dataclasses
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from phonesystem.config import RESULT_CACHE_BYTES
+
+
+HASH_BLOCK = 1024 * 1024
+
+# Cells of an object column measured for the contents of list and dict cells
+NESTED_SAMPLE = 1000
+
+
+def content_hash(source):
+    """SHA-256 hex digest of a path or file object, leaving its position unchanged."""
+    digest = hashlib.sha256()
+    if hasattr(source, "read"):
+        position = source.tell()
+        source.seek(0)
+        for block in iter(lambda: source.read(HASH_BLOCK), b""):
+            digest.update(block)
+        source.seek(position)
+    else:
+        with open(source, "rb") as handle:
+            for block in iter(lambda: handle.read(HASH_BLOCK), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(source, **config):
+    """Key for ``source`` (or a list of sources) under a pipeline configuration.
+
+    ``config`` values only need a stable ``repr`` (calendars, flags, ...).
+    The key of a list depends on the order of its files, which decides
+    the winner on duplicate contacts.
+    """
+    if isinstance(source, (list, tuple)):
+        hashes = ":".join(content_hash(item) for item in source)
+        content = hashlib.sha256(hashes.encode()).hexdigest()
+    else:
+        content = content_hash(source)
+    settings = json.dumps(config, sort_keys=True, default=repr)
+    return f"{content}:{hashlib.sha256(settings.encode()).hexdigest()}"
+
+
+def _cell_bytes(cell):
+    # What ``memory_usage(deep=True)`` leaves out: the items of list and dict cells
+    if isinstance(cell, dict):
+        return sum(sys.getsizeof(key) + sys.getsizeof(item) for key, item in cell.items())
+    if isinstance(cell, (list, tuple)):
+        return sum(sys.getsizeof(item) for item in cell)
+    if isinstance(cell, np.ndarray):
+        return cell.nbytes
+    return 0
+
+
+def _nested_bytes(column):
+    """Size of the items of container cells in ``column``, scaled up from a sample."""
+    if column.dtype != object or column.empty:
+        return 0
+    step = max(len(column) // NESTED_SAMPLE, 1)
+    sample = column.iloc[::step]
+    return int(sum(map(_cell_bytes, sample)) * len(column) / len(sample))
+
+
+def estimate_bytes(value):
+    """Approximate in-memory size of DataFrames, arrays and containers of them."""
+    if isinstance(value, pd.DataFrame):
+        nested = sum(_nested_bytes(value.iloc[:, position]) for position in range(value.shape[1]))
+        return int(value.memory_usage(deep=True, index=True).sum()) + nested
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True, index=True)) + _nested_bytes(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(estimate_bytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_bytes(item) for item in value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return sum(estimate_bytes(getattr(value, f.name)) for f in dataclasses.fields(value))
+    return sys.getsizeof(value)
+
+
+@dataclasses.dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+    max_bytes: int = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ResultCache:
+    """Thread-safe LRU cache with a byte budget.
+
+    Cached values are shared, so callers must copy before mutating them;
+    anything built lazily on a value (e.g.
+    :meth:`~phonesystem.pipeline.PipelineResult.master_contact_frame`) is
+    built before it is stored, so its size is counted. A value larger than
+    the whole budget is returned but not stored.
+    """
+
+    def __init__(self, max_bytes=RESULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = CacheStats(max_bytes=max_bytes)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self._stats.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        size = estimate_bytes(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return value
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self._stats.evictions += 1
+        return value
+
+    def get_or_compute(self, key, compute):
+        """Cached value for ``key``, calling ``compute()`` and storing it on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = self.put(key, compute())
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return dataclasses.replace(self._stats, entries=len(self._entries), bytes=self._bytes)
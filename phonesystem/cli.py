@@ -0,0 +1,215 @@
+"""Command-line batch mode.
+
+Usage::
+
+    python -m phonesystem export.xlsx --output-dir processed/ --format both
+    python -m phonesystem march.xlsx --store store/ --month 2024-01 --month 2024-03
+    python -m phonesystem jan.xlsx feb.xlsx mar.xlsx --workers 3
+"""
+
+import argparse
+import contextlib
+import dataclasses
+import os
+import sys
+import zoneinfo
+
+from phonesystem.bundle import BUNDLE_SUFFIX, export_bundle
+from phonesystem.config import PROFILE_LOG_PATH
+from phonesystem.multifile import files_name, process_pool, run_files
+from phonesystem.pipeline import DEFAULT_CALENDAR, export, export_filename
+from phonesystem.profiling import StageProfiler
+from phonesystem.rules import RULES_ENV, default_rules, load_rules, save_rules
+from phonesystem.store import MonthStore
+from phonesystem.streaming import DEFAULT_CHUNKSIZE, stream_pipeline
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m phonesystem",
+        description="Process a NICE phone system export without the dashboard.",
+    )
+    parser.add_argument(
+        "input", nargs="*",
+        help="Raw phone system exports (.xlsx/.xls/.csv); several files are processed "
+             "in parallel and later files win on duplicate contact_id",
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="File to write with a single --format (default: dated name in --output-dir)",
+    )
+    parser.add_argument(
+        "--output-dir", default=".",
+        help="Directory for dated output files when --output is not given",
+    )
+    parser.add_argument(
+        "--format", choices=["xlsx", "parquet", "both"], default="xlsx",
+        help="Excel workbook, Parquet bundle or both (default: xlsx)",
+    )
+    parser.add_argument(
+        "--holiday", action="append", default=[], metavar="YYYY-MM-DD",
+        help="Date to treat as outside business hours (repeatable)",
+    )
+    parser.add_argument(
+        "--source-timezone", metavar="ZONE", default=DEFAULT_CALENDAR.source_timezone,
+        help="Time zone of the export's start times, e.g. America/New_York",
+    )
+    parser.add_argument(
+        "--department-timezone", action="append", default=[], metavar="DEPARTMENT=ZONE",
+        help="Time zone a department's business hours are in (repeatable; needs --source-timezone)",
+    )
+    parser.add_argument(
+        "--normalized", action="store_true",
+        help="Write value counts as tidy sheets instead of dict columns",
+    )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help=(
+            "Read the export in chunks; builds only the skill, team, phone number "
+            "(without call times) and interval views"
+        ),
+    )
+    parser.add_argument(
+        "--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+        help=f"Rows per chunk with --stream (default: {DEFAULT_CHUNKSIZE})",
+    )
+    parser.add_argument(
+        "--store", metavar="DIR",
+        help="Merge the export into a month-partitioned store and build the views from it",
+    )
+    parser.add_argument(
+        "--month", action="append", metavar="YYYY-MM",
+        help="With --store, only build the views for these stored months (repeatable)",
+    )
+    parser.add_argument(
+        "--workers", type=int, metavar="N",
+        help="Worker processes for several input files (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--rules", metavar="JSON",
+        help=f"Classification rules file (default: ${RULES_ENV} or the built-in rules)",
+    )
+    parser.add_argument(
+        "--write-rules", metavar="JSON",
+        help="Write the active classification rules to a file and exit",
+    )
+    parser.add_argument(
+        "--memory-report", action="store_true",
+        help="Print per-column memory of the call table before and after compaction",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Print per-stage time, row counts and peak resident memory",
+    )
+    parser.add_argument(
+        "--profile-memory", action="store_true",
+        help="Also trace peak allocations per stage (slows allocation-heavy stages)",
+    )
+    parser.add_argument(
+        "--profile-log", nargs="?", const=PROFILE_LOG_PATH, metavar="JSONL",
+        help=f"Append per-stage timings to a JSON lines file (default: {PROFILE_LOG_PATH})",
+    )
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.store and args.stream:
+        parser.error("--store cannot be combined with --stream")
+    if args.stream and len(args.input) > 1:
+        parser.error("--stream reads a single input file")
+
+    rules = load_rules(args.rules) if args.rules else default_rules()
+    if args.write_rules:
+        print(save_rules(rules, args.write_rules))
+        return 0
+    if not args.input:
+        parser.error("the following arguments are required: input")
+
+    timezones = dict(DEFAULT_CALENDAR.timezones)
+    for entry in args.department_timezone:
+        department, separator, zone = entry.partition("=")
+        if not separator:
+            parser.error(f"--department-timezone expects DEPARTMENT=ZONE, got {entry!r}")
+        timezones[department] = zone
+    for zone in [args.source_timezone, *timezones.values()]:
+        if zone is not None and zone not in zoneinfo.available_timezones():
+            parser.error(f"unknown time zone {zone!r}")
+    calendar = dataclasses.replace(
+        DEFAULT_CALENDAR,
+        holidays=DEFAULT_CALENDAR.holidays + tuple(args.holiday),
+        timezones=timezones,
+        source_timezone=args.source_timezone,
+    )
+    profiling = args.profile or args.profile_memory or args.profile_log
+    profiler = StageProfiler(trace_memory=args.profile_memory)
+    with profiler.activate() if profiling else contextlib.nullcontext():
+        status = _run(args, calendar, rules)
+    if args.profile or args.profile_memory:
+        print(profiler.to_frame().to_string(index=False), file=sys.stderr)
+    if args.profile_log:
+        profiler.write_jsonl(args.profile_log, source=files_name(args.input))
+    return status
+
+
+def _run(args, calendar, rules):
+    executor = None
+    if len(args.input) > 1:
+        executor = process_pool(min(len(args.input), args.workers or os.cpu_count() or 1))
+    try:
+        return _run_with(args, calendar, rules, executor)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def _run_with(args, calendar, rules, executor):
+    if args.stream:
+        result, stats = stream_pipeline(
+            args.input[0], calendar=calendar, chunksize=args.chunksize,
+            normalized=args.normalized, rules=rules,
+        )
+        spam_calls = stats.spam_calls
+        coerced = stats.coerced_start_times
+    elif args.store:
+        store = MonthStore(args.store)
+        months = store.ingest(args.input, calendar=calendar, rules=rules, executor=executor)
+        print(f"Updated months: {', '.join(months) or 'none'}", file=sys.stderr)
+        result = store.result(months=args.month, normalized=args.normalized)
+        spam_calls = len(result.spam_calls)
+        coerced = 0
+    else:
+        result = run_files(
+            args.input, calendar=calendar, normalized=args.normalized, rules=rules,
+            executor=executor,
+        )
+        spam_calls = len(result.spam_calls)
+        coerced = result.coerced_start_times
+    if coerced:
+        print(f"{coerced} start times could not be parsed and were left empty.", file=sys.stderr)
+    print(f"{spam_calls} calls classified as spam and removed.", file=sys.stderr)
+    if args.memory_report and result.memory_report is not None:
+        print(result.memory_report.to_string(index=False), file=sys.stderr)
+
+    writers = {
+        "xlsx": (export, ".xlsx"),
+        "parquet": (export_bundle, BUNDLE_SUFFIX),
+    }
+    formats = list(writers) if args.format == "both" else [args.format]
+    if args.output and len(formats) > 1:
+        raise SystemExit("--output can only be used with a single --format")
+
+    for fmt in formats:
+        write, suffix = writers[fmt]
+        output = args.output
+        if output is None:
+            if args.stream:
+                filename = stats.filename(suffix)
+            else:
+                filename = export_filename(result.total_calls).replace(".xlsx", suffix)
+            os.makedirs(args.output_dir, exist_ok=True)
+            output = os.path.join(args.output_dir, filename)
+        write(result, output)
+        print(output)
+    return 0
@@ -0,0 +1,153 @@
+"""Default processing rules shared by the pipeline stages."""
+
+CALL_TYPE_OPTIONS = [
+    "All Calls", "All Calls Business Hours",
+    "Inbound", "Inbound Business Hours",
+    "Outbound", "Outbound Business Hours",
+    "Voicemail", "Voicemail Business Hours",
+    "After Hours", "After Hours Business Hours",
+    "No Agent", "No Agent Business Hours"
+]
+
+SKILL_GROUP_KEYS = ["skill_name", "department", "team_name", "Timeframe"]
+
+# Excel cuts sheet names to this many characters
+EXCEL_SHEET_NAME_LENGTH = 31
+
+TEAM_GROUP_KEYS = ["team_name", "department", "Timeframe"]
+
+# Rollup level -> grouping keys, from the finest level to company-wide
+ROLLUP_LEVELS = {
+    "Skill": ["skill_name", "department", "team_name"],
+    "Team": ["team_name", "department"],
+    "Department": ["department"],
+    "Company": [],
+}
+
+# Rollup period -> pandas period frequency of its Timeframe
+ROLLUP_PERIODS = {"Month": "M", "Quarter": "Q", "Year": "Y"}
+
+# Levels and periods written as "Rollup - <level> - <period>" sheets
+ROLLUP_SHEET_LEVELS = ["Team", "Department", "Company"]
+
+# Interval lengths in minutes for the staffing heatmaps; the first is the
+# grain the interval cube is stored at, the others re-sum it
+INTERVAL_MINUTES = [15, 30, 60]
+
+# Percentiles reported per skill and team month
+PERCENTILES = [0.5, 0.9, 0.95]
+PERCENTILE_COLUMNS = ["InQueue", "Agent_Work_Time", "customer_call_time"]
+
+# Relative error of the mergeable percentile sketch (chunked mode, rollups)
+SKETCH_RELATIVE_ACCURACY = 0.01
+
+# Repeat-contact windows in hours: a contact is repeated when the same
+# external number starts another contact within the window
+REPEAT_WINDOWS = {"24h": 24, "72h": 72, "7d": 168}
+
+# Call category per skill: first matching pattern wins. Patterns are
+# matched against the lower-cased skill name with spaces removed.
+CATEGORY_RULES = [
+    ("After Hours", r"\bafterhours\b"),
+    ("No Agent", r"\bnoagent\b"),
+    ("Inbound", r"\bib\b"),
+    ("Outbound", r"\bob\b|\boutreach\b"),
+    ("Voicemail", r"\bvm\b"),
+]
+
+DEFAULT_CATEGORY = "Other"
+
+TEAM_TO_DEPT = {
+    'Field Services': 'Deployment',
+    'Comissioning': 'Deployment',
+    'SB-AM': 'Sales',
+    'SDR Team': 'Sales',
+    'Account Manager': 'Sales',
+    'Inside Sales': 'Sales',
+    'Billing': 'Billing and Collections',
+    'Collections': 'Billing and Collections',
+    'Business Support': 'Billing and Collections',
+    'MCF Support': 'Customer Support',
+    'Customer Support ATL': 'Customer Support',
+    'Solutions': 'Customer Support',
+    'Level 2 Support': 'Customer Support',
+    'Admin': 'Technical Team',
+    'Test': 'Technical Team',
+    'No Assigned Team': 'Other',
+    'Default Team': 'Other'
+}
+
+DEFAULT_DEPARTMENT = "Other"
+
+BUSINESS_HOURS = {
+    "Customer Support": (7, 0, 18, 30),
+    "Sales": (8, 0, 17, 0),
+    "Billing and Collections": (8, 0, 17, 0),
+    "Technical Team": (9, 0, 17, 0),
+    "Other": (9, 0, 17, 0)
+}
+
+DEFAULT_BUSINESS_HOURS = (9, 0, 17, 0)
+
+# Dates (YYYY-MM-DD) on which no department is open
+HOLIDAYS = []
+
+# Time zone the export's start times are written in, and the zone each
+# department's BUSINESS_HOURS are expressed in; departments not listed
+# here, or a SOURCE_TIMEZONE of None, compare the export's times as they are
+SOURCE_TIMEZONE = None
+DEPARTMENT_TIMEZONES = {}
+
+# Byte budget of the shared result cache
+RESULT_CACHE_BYTES = 1024 * 1024 * 1024
+
+# Stage timings appended by the dashboard and CLI --profile-log
+PROFILE_LOG_PATH = "phonesystem_profile.jsonl"
+
+# DuckDB query engine (optional): memory cap before spilling to disk
+QUERY_MEMORY_LIMIT = "2GB"
+QUERY_TEMP_DIRECTORY = "phonesystem_query_spill"
+
+# Queries saved from the dashboard query panel
+SAVED_QUERIES_PATH = "phonesystem_queries.json"
+
+# Built-in saved queries over Total_Calls, Master_Contacts and Phone_Numbers
+SAVED_QUERIES = {
+    "Agent x campaign": (
+        "SELECT department, agent_name, campaign_name,\n"
+        "       count(*) AS calls, sum(Agent_Work_Time) AS agent_work_time\n"
+        "FROM Total_Calls\n"
+        "WHERE agent_name IS NOT NULL\n"
+        "GROUP BY ALL\n"
+        "ORDER BY calls DESC"
+    ),
+    "Calls per team and category by month": (
+        "SELECT Timeframe, team_name, call_category,\n"
+        "       count(*) AS calls, avg(InQueue) AS avg_inqueue\n"
+        "FROM Total_Calls\n"
+        "GROUP BY ALL\n"
+        "ORDER BY ALL"
+    ),
+    "Arrivals by hour of day": (
+        "SELECT hour(start_time) AS hour, count(*) AS calls,\n"
+        "       avg(InQueue) AS avg_inqueue, sum(abandon) AS abandons\n"
+        "FROM Total_Calls\n"
+        "GROUP BY ALL\n"
+        "ORDER BY hour"
+    ),
+    "Longest transfer chains": (
+        "SELECT master_contact_id, transfer_count, skill_path, first_to_last_leg_seconds\n"
+        "FROM Master_Contacts\n"
+        "ORDER BY transfer_count DESC, first_to_last_leg_seconds DESC\n"
+        "LIMIT 100"
+    ),
+    "Busiest external numbers": (
+        "SELECT phone_number, sum(contact_count) AS contacts,\n"
+        "       sum(total_customer_time) AS customer_time\n"
+        "FROM Phone_Numbers\n"
+        "WHERE internal_external = 'External'\n"
+        "GROUP BY ALL\n"
+        "ORDER BY contacts DESC\n"
+        "LIMIT 100"
+    ),
+}
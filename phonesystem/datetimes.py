@@ -0,0 +1,145 @@
+"""Start timestamp assembly and formatting.
+
+Exports carry the call date and the time of day in separate columns, and
+``start_time`` arrives in whatever shape the source produced: strings from
+CSV, ``datetime.time`` objects or Excel day fractions from workbooks, or
+full datetimes. Each distinct time value is parsed once into an offset
+from midnight and added to the normalized date, so no per-row format
+inference is needed.
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype, is_timedelta64_dtype
+
+
+NANOS_PER_DAY = 86_400 * 10**9
+
+
+def _time_of_day(value):
+    """Offset from midnight of one distinct ``start_time`` value, or NaT."""
+    if isinstance(value, datetime.datetime):
+        value = value.time()
+    if isinstance(value, datetime.time):
+        return pd.Timedelta(
+            hours=value.hour, minutes=value.minute,
+            seconds=value.second, microseconds=value.microsecond,
+        )
+    if isinstance(value, (datetime.timedelta, np.timedelta64)):
+        return pd.Timedelta(value)
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        # Excel serial time: fraction of a day (any whole days are the date part)
+        fraction = float(value) % 1
+        return pd.Timedelta(round(fraction * NANOS_PER_DAY, -6), unit="ns")
+    if isinstance(value, str):
+        text = value.strip()
+        parsed = pd.to_timedelta(text, errors="coerce")
+        if pd.isna(parsed):
+            stamp = pd.to_datetime(text, errors="coerce")
+            if pd.isna(stamp):
+                return pd.NaT
+            return stamp - stamp.normalize()
+        return parsed
+    return pd.NaT
+
+
+def time_of_day(start_time):
+    """``start_time`` as a timedelta offset from midnight, NaT where unparseable."""
+    if is_timedelta64_dtype(start_time.dtype):
+        return start_time
+    if is_datetime64_any_dtype(start_time.dtype):
+        return start_time - start_time.dt.normalize()
+    if is_numeric_dtype(start_time.dtype):
+        fractions = start_time.to_numpy(dtype=np.float64) % 1
+        nanos = np.round(fractions * NANOS_PER_DAY, -6)
+        return pd.Series(pd.to_timedelta(nanos, unit="ns"), index=start_time.index)
+
+    codes, uniques = pd.factorize(start_time)
+    uniques = np.asarray(uniques, dtype=object)
+    offsets = np.full(len(uniques) + 1, np.timedelta64("NaT"), dtype="timedelta64[ns]")
+
+    # Distinct strings in one vectorized pass; anything else one by one
+    is_text = np.fromiter((isinstance(v, str) for v in uniques), dtype=bool, count=len(uniques))
+    if is_text.any():
+        text = pd.Series(uniques[is_text], dtype=object).str.strip()
+        offsets[:-1][is_text] = pd.to_timedelta(text, errors="coerce").to_numpy()
+    for position in np.flatnonzero(np.isnat(offsets[:-1])):
+        offset = _time_of_day(uniques[position])
+        if not pd.isna(offset):
+            offsets[position] = offset.to_timedelta64()
+
+    # Missing values (code -1) take the trailing NaT
+    return pd.Series(offsets[codes], index=start_time.index)
+
+
+def assemble_start_times(start_date, start_time):
+    """Combine a parsed date column and a time-of-day column.
+
+    Returns ``(timestamps, coerced)`` where ``coerced`` counts rows that had
+    both a date and a time but could not be parsed.
+    """
+    # Keep the date's resolution (microseconds unless it is finer)
+    unit = "ns" if np.datetime_data(start_date.dtype)[0] == "ns" else "us"
+    offsets = time_of_day(start_time).astype(f"timedelta64[{unit}]")
+    timestamps = start_date.dt.normalize().astype(f"datetime64[{unit}]") + offsets
+    present = start_date.notna() & start_time.notna()
+    coerced = int((present & timestamps.isna()).sum())
+    return timestamps, coerced
+
+
+def month_starts(dates):
+    """First day of each date's month, computed on the int64 values."""
+    values = dates.to_numpy().astype("datetime64[M]").astype(dates.dtype)
+    return pd.Series(values, index=dates.index, name=dates.name)
+
+
+def _civil_dates(days):
+    """Year, month and day arrays from days since 1970-01-01 (proleptic Gregorian)."""
+    z = days + 719_468
+    era = z // 146_097
+    day_of_era = z - era * 146_097
+    year_of_era = (
+        day_of_era - day_of_era // 1_460 + day_of_era // 36_524 - day_of_era // 146_096
+    ) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    shifted_month = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * shifted_month + 2) // 5 + 1
+    month = np.where(shifted_month < 10, shifted_month + 3, shifted_month - 9)
+    year = year_of_era + era * 400 + (month <= 2)
+    return year, month, day
+
+
+def format_timestamps(timestamps):
+    """``YYYY-MM-DD HH:MM:SS`` strings as an object array, NaN for NaT.
+
+    Digits are computed from the int64 values and written into a fixed-width
+    byte buffer instead of formatting every timestamp through ``strftime``.
+    """
+    values = timestamps.to_numpy(dtype="datetime64[s]")
+    missing = np.isnat(values)
+    seconds = np.where(missing, 0, values.astype(np.int64))
+    days = seconds // 86_400
+    seconds -= days * 86_400
+    year, month, day = _civil_dates(days)
+    if ((year < 1000) | (year > 9999)).any():
+        return timestamps.dt.strftime("%Y-%m-%d %H:%M:%S").to_numpy(dtype=object, na_value=np.nan)
+
+    chars = np.empty((19, len(values)), dtype=np.uint8)
+    for row, field, width in [
+        (0, year, 4), (5, month, 2), (8, day, 2),
+        (11, seconds // 3600, 2), (14, seconds // 60 % 60, 2), (17, seconds % 60, 2),
+    ]:
+        for place in range(width):
+            chars[row + place] = field // 10 ** (width - 1 - place) % 10 + ord("0")
+    chars[[4, 7]] = ord("-")
+    chars[10] = ord(" ")
+    chars[[13, 16]] = ord(":")
+
+    buffer = pa.py_buffer(np.ascontiguousarray(chars.T))
+    text = pa.FixedSizeBinaryArray.from_buffers(pa.binary(19), len(values), [None, buffer])
+    text = text.cast(pa.binary()).cast(pa.string()).to_numpy(zero_copy_only=False)
+    text[missing] = np.nan
+    return text
@@ -0,0 +1,239 @@
+"""Memory-compact dtypes for the retained call table.
+
+``Total_Calls`` is kept in memory (session state, the result cache, the
+month store) and written out. Its repeated labels become categoricals
+(integer codes plus one copy of each distinct value), timing columns are
+downcast where that is lossless, and the SLA/abandon/business-hours flags
+become nullable small ints.
+
+Ids and phone numbers are mostly distinct, so categoricals gain little on
+them. They are replaced by integer codes instead, with a
+:class:`LabelTable` to map them back: decimal ids such as ``"1027493"``
+are their own codes and need no labels; other columns are factorized.
+:meth:`LabelTable.decode` restores the original values for export and
+display. Values are unchanged; only their storage is.
+
+The ``CARRIED_COLUMNS``, which no view reads, are compacted in place by
+:func:`compact_carried` before the views are built, so they do not add to
+peak memory during aggregation. The other columns are compacted once the
+views are built: the views group, count and sum them, and float32 sums
+would lose precision on large totals. :func:`widen_numbers` restores
+64-bit numbers for Parquet and DuckDB, where sums and arithmetic over
+int8/int16 columns could overflow.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_float_dtype, is_integer_dtype, is_string_dtype
+
+
+LABEL_COLUMNS = [
+    "media_name", "contact_name", "skill_name", "campaign_name", "agent_name",
+    "team_name", "call_category", "department",
+]
+
+ID_COLUMNS = ["master_contact_id", "contact_id"]
+
+PHONE_NUMBER_COLUMNS = ["ANI", "DNIS", "internal_number", "external_number"]
+
+CODE_COLUMNS = ["skill_no", "campaign_no", "agent_no", "team_no"]
+
+TIMING_COLUMNS = [
+    "PreQueue", "InQueue", "Agent_Time", "PostQueue", "Total_Time", "Abandon_Time",
+    "ACW_Seconds", "Agent_Work_Time", "customer_call_time",
+]
+
+FLAG_COLUMNS = ["SLA", "abandon", "Business_Hours"]
+
+# Columns passed through to Total_Calls without being read by any view
+CARRIED_COLUMNS = ["media_name", "contact_name", "Total_Time"] + CODE_COLUMNS
+
+# Columns with more distinct values than this share of rows stay as they are
+MAX_CATEGORY_RATIO = 0.5
+
+# Decimal ids that round-trip through int64 and back to the same text
+DECIMAL_ID = r"0|[1-9][0-9]{0,17}"
+
+
+def as_category(series, max_ratio=MAX_CATEGORY_RATIO):
+    """Categorical when values repeat enough for codes to pay off."""
+    if isinstance(series.dtype, pd.CategoricalDtype) or len(series) == 0:
+        return series
+    if series.nunique(dropna=True) > max_ratio * len(series):
+        return series
+    return series.astype("category")
+
+
+def downcast_number(series):
+    """Smallest integer, or float32 when every value survives the round trip."""
+    if is_integer_dtype(series.dtype):
+        return pd.to_numeric(series, downcast="integer")
+    if is_float_dtype(series.dtype):
+        values = series.to_numpy()
+        narrow = values.astype(np.float32)
+        if np.array_equal(narrow.astype(values.dtype), values, equal_nan=True):
+            return pd.Series(narrow, index=series.index, name=series.name)
+    return series
+
+
+def as_nullable_int(series):
+    """Smallest nullable integer dtype for whole-number flags, NaN kept as <NA>."""
+    if is_float_dtype(series.dtype):
+        values = series.to_numpy()
+        finite = values[~np.isnan(values)]
+        if not np.array_equal(finite, np.round(finite)):
+            return series
+    elif not is_integer_dtype(series.dtype):
+        return series
+    return pd.to_numeric(series.astype("Int64"), downcast="integer")
+
+
+def widen_numbers(frame):
+    """``frame`` with narrow ints as int64/Int64 and float32 as float64.
+
+    Frames without narrow numbers are returned as they are.
+    """
+    widened = {}
+    for column, dtype in frame.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype) or dtype.kind not in "iuf":
+            continue
+        if dtype.itemsize == 8:
+            continue
+        if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+            widened[column] = "Float64" if dtype.kind == "f" else "Int64"
+        else:
+            widened[column] = np.float64 if dtype.kind == "f" else np.int64
+    return frame.astype(widened) if widened else frame
+
+
+def _nbytes(series, labels=None):
+    size = series.memory_usage(deep=True, index=False)
+    return size if labels is None else size + labels.memory_usage(deep=True)
+
+
+@dataclass
+class LabelTable:
+    """Maps the integer codes of a compact call table back to ids and numbers.
+
+    ``labels[column]`` holds the value of each code, or None where the
+    codes are the values themselves; ``dtypes`` holds each column's
+    original dtype.
+    """
+
+    labels: dict = field(default_factory=dict)
+    dtypes: dict = field(default_factory=dict)
+
+    def encode(self, series):
+        """Smallest integer form of one column, recording how to map it back.
+
+        The column is returned unchanged when no integer form is smaller.
+        """
+        options = []
+        if is_integer_dtype(series.dtype):
+            options.append((downcast_number(series), None))
+        elif is_string_dtype(series.dtype) and series.str.fullmatch(DECIMAL_ID).fillna(False).all():
+            options.append((downcast_number(pd.to_numeric(series).astype(np.int64)), None))
+        codes, labels = pd.factorize(series)
+        codes = pd.Series(pd.to_numeric(codes, downcast="integer"), index=series.index, name=series.name)
+        options.append((codes, labels))
+
+        encoded, labels = min(options, key=lambda option: _nbytes(*option))
+        if _nbytes(encoded, labels) >= _nbytes(series):
+            return series
+        self.labels[series.name] = labels
+        self.dtypes[series.name] = series.dtype
+        return encoded
+
+    def label_bytes(self, column):
+        """Memory held by the labels of ``column`` (0 when it has none)."""
+        labels = self.labels.get(column)
+        return 0 if labels is None else labels.memory_usage(deep=True)
+
+    def decode(self, frame):
+        """Copy of ``frame`` with the encoded columns holding their original values."""
+        decoded = frame.copy(deep=False)
+        for column, labels in self.labels.items():
+            if column not in decoded:
+                continue
+            codes = decoded[column]
+            if labels is not None:
+                codes = pd.Series(
+                    pd.Categorical.from_codes(codes.to_numpy(), categories=labels), index=codes.index
+                )
+            decoded[column] = codes.astype(self.dtypes[column])
+        return decoded
+
+
+def _compact_column(column, series, labels=None):
+    if labels is not None and (column in ID_COLUMNS or column in PHONE_NUMBER_COLUMNS):
+        return labels.encode(series)
+    if column in LABEL_COLUMNS or column in ID_COLUMNS or column in PHONE_NUMBER_COLUMNS:
+        return as_category(series)
+    if column in CODE_COLUMNS or column in TIMING_COLUMNS:
+        return downcast_number(series)
+    if column in FLAG_COLUMNS:
+        return as_nullable_int(series)
+    return series
+
+
+def compact_calls(total_calls, labels=None):
+    """Copy of ``total_calls`` with memory-compact dtypes.
+
+    With a :class:`LabelTable` as ``labels``, ids and phone numbers are
+    encoded into it as integer codes; otherwise they become categoricals
+    when their values repeat enough.
+    """
+    compact = total_calls.copy(deep=False)
+    for column in compact.columns:
+        compact[column] = _compact_column(column, compact[column], labels)
+    return compact
+
+
+def compact_carried(total_calls):
+    """Compact the ``CARRIED_COLUMNS`` of ``total_calls`` in place, freeing the originals."""
+    for column in CARRIED_COLUMNS:
+        if column in total_calls:
+            total_calls[column] = _compact_column(column, total_calls[column])
+    return total_calls
+
+
+def column_memory(frame):
+    """Dtype and deep memory usage of each column, for :func:`memory_report`."""
+    return pd.DataFrame({
+        "dtype": frame.dtypes.astype(str),
+        "bytes": frame.memory_usage(deep=True, index=False),
+    })
+
+
+def memory_report(before, after, labels=None):
+    """Per-column dtype and deep memory usage before and after compaction.
+
+    ``before`` is the :func:`column_memory` of the frame as it was loaded.
+    With the :class:`LabelTable` of ``after``, encoded columns show as
+    ``"<dtype> codes"`` and their labels count towards ``bytes_after``.
+    """
+    bytes_after = after.memory_usage(deep=True, index=False).reindex(before.index)
+    dtypes_after = after.dtypes.reindex(before.index).astype(str)
+    if labels is not None:
+        for column in labels.labels:
+            bytes_after[column] += labels.label_bytes(column)
+            dtypes_after[column] += " codes"
+    report = pd.DataFrame({
+        "column": before.index,
+        "dtype_before": before["dtype"].to_numpy(),
+        "dtype_after": dtypes_after.to_numpy(),
+        "bytes_before": before["bytes"].to_numpy(),
+        "bytes_after": bytes_after.to_numpy(),
+    })
+    total = pd.DataFrame({
+        "column": ["TOTAL"],
+        "dtype_before": [""],
+        "dtype_after": [""],
+        "bytes_before": [report["bytes_before"].sum()],
+        "bytes_after": [report["bytes_after"].sum()],
+    })
+    report = pd.concat([report, total], ignore_index=True)
+    report["reduction"] = (report["bytes_before"] / report["bytes_after"]).round(2)
+    return report
@@ -0,0 +1,282 @@
+"""Streaming Excel workbook writer.
+
+``DataFrame.to_excel`` hands xlsxwriter one cell at a time, column by
+column, with a type check and a style lookup per cell, and xlsxwriter
+keeps every cell of the workbook in memory until it is closed. Here each
+sheet is converted in row blocks: every column of a block is turned into
+plain Python values in one pass (list and dict cells become their text,
+datetimes their Excel serial number, missing values ``None``), and the
+rows are streamed with xlsxwriter's ``constant_memory`` mode, which
+flushes each finished row to a temporary file. Memory stays at one block
+of rows whatever the sheet size.
+
+Cell contents match ``to_excel``: the header row holds the column names,
+missing values are empty cells, ``Timeframe`` periods are text and
+datetimes use the ``YYYY-MM-DD HH:MM:SS`` number format. Strings are
+always written as text, never as formulas or links.
+
+:class:`WorkbookBuild` runs the same writer in a background thread into a
+temporary file so the dashboard can offer the download without waiting.
+"""
+
+import contextlib
+import datetime
+import os
+import tempfile
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+from pandas.api.types import (
+    infer_dtype,
+    is_bool_dtype,
+    is_datetime64_any_dtype,
+    is_float_dtype,
+    is_integer_dtype,
+)
+
+from phonesystem.profiling import stage
+
+
+DATETIME_FORMAT = "YYYY-MM-DD HH:MM:SS"
+DATE_FORMAT = "YYYY-MM-DD"
+
+# Rows converted to Python values at a time
+BLOCK_ROWS = 20_000
+
+EXCEL_EPOCH = np.datetime64("1899-12-31", "us")
+
+
+def _first_valid(values):
+    for value in values:
+        if isinstance(value, (list, dict)) or not pd.isna(value):
+            return value
+    return None
+
+
+def _as_text(value):
+    if value is None or isinstance(value, (list, dict)):
+        return None if value is None else str(value)
+    if pd.isna(value):
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+def _excel_serials(series):
+    """Excel serial numbers of datetime values, computed as xlsxwriter does."""
+    if getattr(series.dtype, "tz", None) is not None:
+        raise ValueError(
+            "Excel does not support datetimes with timezones. Please ensure "
+            "that datetimes are timezone unaware before writing to Excel."
+        )
+    values = series.to_numpy(dtype="datetime64[us]")
+    missing = np.isnat(values)
+    micros = (values - EXCEL_EPOCH).astype(np.int64)
+    days, rest = np.divmod(micros, 86_400_000_000)
+    serials = days + (rest // 1_000_000 + rest % 1_000_000 / 1e6) / 86_400
+    # Excel's phantom 1900-02-29
+    serials = np.where(serials > 59, serials + 1, serials)
+    cells = serials.astype(object)
+    cells[missing] = None
+    return cells.tolist()
+
+
+def column_cells(series):
+    """``(kind, values)`` for one column block; ``None`` marks an empty cell.
+
+    ``kind`` is ``"number"``, ``"boolean"``, ``"datetime"``, ``"string"``
+    or ``"any"`` for mixed object columns.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        categories = column_cells(pd.Series(series.cat.categories))
+        lookup = np.array(categories[1] + [None], dtype=object)
+        return categories[0], lookup[codes].tolist()
+    if isinstance(dtype, pd.PeriodDtype):
+        text = series.astype(str).to_numpy(dtype=object)
+        text[series.isna().to_numpy()] = None
+        return "string", text.tolist()
+    if is_datetime64_any_dtype(dtype):
+        return "datetime", _excel_serials(series)
+    if is_bool_dtype(dtype) and not series.hasnans:
+        return "boolean", series.tolist()
+    if is_integer_dtype(dtype) or is_float_dtype(dtype):
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        cells = series.to_numpy(dtype=object, na_value=None)
+        if is_float_dtype(dtype):
+            cells[np.isnan(values)] = None
+        if np.isinf(values).any():
+            cells[np.isposinf(values)] = "inf"
+            cells[np.isneginf(values)] = "-inf"
+            return "any", cells.tolist()
+        return "number", cells.tolist()
+
+    values = series.to_numpy(dtype=object, na_value=None)
+    if isinstance(dtype, pd.StringDtype) or infer_dtype(values, skipna=True) == "string":
+        return "string", values.tolist()
+    if isinstance(_first_valid(values), (list, dict)):
+        # One pass over the column: list and dict cells become their text
+        return "string", list(map(_as_text, values))
+    return "any", [_any_cell(value) for value in values]
+
+
+def _any_cell(value):
+    if isinstance(value, (list, dict)):
+        return str(value)
+    if value is None or pd.isna(value):
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        if np.isinf(value):
+            return "inf" if value > 0 else "-inf"
+        return value.item() if isinstance(value, np.generic) else value
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(value).to_pydatetime()
+    if isinstance(value, (datetime.timedelta, np.timedelta64)):
+        # Days as a plain number, like to_excel
+        return pd.Timedelta(value).total_seconds() / 86_400
+    if hasattr(value, "isoformat"):
+        return value
+    return str(value)
+
+
+def _writers(worksheet, formats):
+    number = worksheet.write_number
+    return {
+        "number": number,
+        "boolean": worksheet.write_boolean,
+        "datetime": partial(number, cell_format=formats["datetime"]),
+        "string": _string_writer(worksheet),
+        "any": partial(_write_any, worksheet, formats),
+    }
+
+
+def _string_writer(worksheet):
+    write_string = worksheet.write_string
+
+    def write(row, col, value):
+        # Empty strings stay empty cells, as with to_excel
+        if value:
+            write_string(row, col, value)
+    return write
+
+
+def _write_any(worksheet, formats, row, col, value):
+    if isinstance(value, str):
+        if value:
+            worksheet.write_string(row, col, value)
+    elif isinstance(value, bool):
+        worksheet.write_boolean(row, col, value)
+    elif isinstance(value, (int, float)):
+        worksheet.write_number(row, col, value)
+    elif hasattr(value, "hour"):
+        worksheet.write_datetime(row, col, value, formats["datetime"])
+    elif hasattr(value, "isoformat"):
+        worksheet.write_datetime(row, col, value, formats["date"])
+    else:
+        worksheet.write_string(row, col, str(value))
+
+
+def write_sheet(worksheet, df, formats, block_rows=BLOCK_ROWS):
+    """Stream ``df`` into ``worksheet`` row by row, header first."""
+    writers = _writers(worksheet, formats)
+    for col, name in enumerate(df.columns):
+        writers["any"](0, col, name if isinstance(name, (int, float)) else str(name))
+
+    for start in range(0, len(df), block_rows):
+        block = df.iloc[start:start + block_rows]
+        kinds, columns = zip(*(column_cells(block.iloc[:, col]) for col in range(block.shape[1])))
+        write = [writers[kind] for kind in kinds]
+        for row, cells in enumerate(zip(*columns), start=start + 1):
+            for col, value in enumerate(cells):
+                if value is not None:
+                    write[col](row, col, value)
+
+
+def write_workbook(sheets, target, tmpdir=None):
+    """Write ``{sheet name: DataFrame}`` to an xlsx path or binary buffer."""
+    options = {"constant_memory": True}
+    if tmpdir is not None:
+        options["tmpdir"] = tmpdir
+    workbook = xlsxwriter.Workbook(target, options)
+    formats = {
+        "datetime": workbook.add_format({"num_format": DATETIME_FORMAT}),
+        "date": workbook.add_format({"num_format": DATE_FORMAT}),
+    }
+    with contextlib.closing(workbook):
+        for sheet_name, df in sheets.items():
+            write_sheet(workbook.add_worksheet(sheet_name), df, formats)
+    return target
+
+
+def export_to_tempfile(sheets, directory=None):
+    """Write the workbook to a new temporary ``.xlsx`` file and return its path."""
+    handle, path = tempfile.mkstemp(suffix=".xlsx", prefix="phonesystem-", dir=directory)
+    os.close(handle)
+    try:
+        with stage("excel export", sum(len(df) for df in sheets.values())) as record:
+            write_workbook(sheets, path, tmpdir=directory)
+            record.rows_out = record.rows_in
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+@dataclass
+class WorkbookBuild:
+    """A workbook being written to a temporary file in the background.
+
+    The file is deleted by :meth:`discard`, or at the latest when the build
+    is garbage collected (e.g. with the session state holding it) or the
+    process exits.
+    """
+
+    future: object
+
+    def __post_init__(self):
+        weakref.finalize(self, _discard, self.future)
+
+    @classmethod
+    def start(cls, sheets, executor=None, directory=None):
+        """Submit the export of ``sheets`` to ``executor`` (a fresh thread by default)."""
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="excel-export")
+            future = executor.submit(export_to_tempfile, sheets, directory)
+            executor.shutdown(wait=False)
+        else:
+            future = executor.submit(export_to_tempfile, sheets, directory)
+        return cls(future=future)
+
+    def done(self):
+        return self.future.done()
+
+    def path(self, timeout=None):
+        """Path of the finished workbook, waiting for the build if needed."""
+        return self.future.result(timeout)
+
+    def read(self):
+        """Bytes of the finished workbook, waiting for the build if needed."""
+        with open(self.path(), "rb") as handle:
+            return handle.read()
+
+    def discard(self):
+        """Cancel the build, or delete its file once it has finished."""
+        _discard(self.future)
+
+
+def _discard(future):
+    if not future.cancel():
+        future.add_done_callback(_remove_output)
+
+
+def _remove_output(future):
+    if future.exception() is None:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(future.result())
@@ -0,0 +1,159 @@
+"""Department and business-hours selection over processed sheets.
+
+:class:`FilterIndex` is built once when a processed file is loaded: for
+every sheet it maps each department to the sorted row positions holding it
+and keeps the business-hours row mask. Master_Contacts departments are
+lists (or their string form when read back from Excel) and are parsed once
+with :func:`ast.literal_eval`. A selection is then a dictionary lookup and
+one row gather per sheet; sheets that are not filtered are returned as-is.
+"""
+
+import ast
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from phonesystem.config import CALL_TYPE_OPTIONS, EXCEL_SHEET_NAME_LENGTH
+
+
+MASTER_SHEET = "Master_Contacts"
+
+# Sheets filtered row by row on their Business_Hours column
+BUSINESS_HOURS_ROW_SHEETS = ["Total_Calls", "Skill_Value_Counts", "Interval_Calls", "Repeat_Contacts"]
+
+
+def parse_list_cell(value):
+    """List held in a cell: lists/arrays as-is, strings parsed safely, else None."""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return list(value)
+    if isinstance(value, str):
+        try:
+            parsed = ast.literal_eval(value)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            # Plain department name rather than a stringified list
+            return [value]
+        return parsed if isinstance(parsed, list) else []
+    return []
+
+
+def _group_positions(values):
+    """``{value: sorted row positions}`` for a 1-D array of hashable values."""
+    codes, uniques = pd.factorize(values)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    return {
+        value: order[start:end]
+        for value, start, end in zip(uniques, bounds[:-1], bounds[1:])
+    }
+
+
+def department_positions(column, list_valued=False):
+    """Row positions per department, expanding list-valued cells."""
+    if not list_valued:
+        return _group_positions(column.to_numpy())
+
+    # Parse each distinct string once; Excel round-trips repeat them a lot
+    cells = column.to_numpy(dtype=object)
+    strings = pd.unique(np.array([c for c in cells if isinstance(c, str)], dtype=object))
+    parsed_strings = {text: parse_list_cell(text) for text in strings}
+    lists = [
+        parsed_strings[cell] if isinstance(cell, str) else parse_list_cell(cell)
+        for cell in cells
+    ]
+
+    lengths = np.fromiter((len(cell) for cell in lists), dtype=np.int64, count=len(lists))
+    rows = np.repeat(np.arange(len(lists)), lengths)
+    values = np.array([value for cell in lists for value in cell], dtype=object)
+    return {
+        value: np.unique(rows[positions])
+        for value, positions in _group_positions(values).items()
+    }
+
+
+def sheet_call_type(name, prefix):
+    """``CALL_TYPE_OPTIONS`` entry of sheet ``prefix + option``, or None.
+
+    Names Excel cut to ``EXCEL_SHEET_NAME_LENGTH`` characters match too.
+    """
+    for option in CALL_TYPE_OPTIONS:
+        full = prefix + option
+        if name == full or (len(name) == EXCEL_SHEET_NAME_LENGTH and full.startswith(name)):
+            return option
+    return None
+
+
+@dataclass
+class SheetIndex:
+    """Department positions and business-hours mask of one sheet."""
+
+    rows: int
+    departments: dict = None
+    business_hours: np.ndarray = None
+    business_hours_variant: bool = True
+
+
+@dataclass
+class FilterIndex:
+    """Precomputed department and business-hours lookups for a set of sheets."""
+
+    sheets: dict = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, all_sheets):
+        sheets = {}
+        for name, df in all_sheets.items():
+            index = SheetIndex(rows=len(df))
+            if "department" in df.columns:
+                index.departments = department_positions(
+                    df["department"], list_valued=name == MASTER_SHEET
+                )
+
+            if name.startswith("Team") or name.startswith("Skill - "):
+                prefix = "Team - " if name.startswith("Team") else "Skill - "
+                option = sheet_call_type(name, prefix)
+                index.business_hours_variant = (
+                    option.endswith("Business Hours") if option else "Business Hours" in name
+                )
+            elif name.startswith("Rollup - "):
+                # Rollups count all hours; they have no business-hours variant
+                index.business_hours_variant = False
+            elif name in BUSINESS_HOURS_ROW_SHEETS and "Business_Hours" in df.columns:
+                index.business_hours = (df["Business_Hours"] == 1).to_numpy()
+            elif name == MASTER_SHEET and "business_hours_flag" in df.columns:
+                index.business_hours = (df["business_hours_flag"] == 1).to_numpy()
+            sheets[name] = index
+        return cls(sheets=sheets)
+
+    def departments(self):
+        """Sorted department names found in the scalar (non-master) sheets."""
+        names = set()
+        for name, index in self.sheets.items():
+            if name == MASTER_SHEET or index.departments is None:
+                continue
+            names.update(value for value in index.departments if isinstance(value, str))
+        return sorted(names)
+
+    def positions(self, name, department="All", business_hours_only=False):
+        """Selected row positions of sheet ``name``; ``None`` means every row."""
+        index = self.sheets[name]
+        positions = None
+        if department != "All" and index.departments is not None:
+            positions = index.departments.get(department, np.empty(0, dtype=np.intp))
+        if business_hours_only and index.business_hours is not None:
+            if positions is None:
+                positions = np.flatnonzero(index.business_hours)
+            else:
+                positions = positions[index.business_hours[positions]]
+        return positions
+
+    def select(self, all_sheets, department="All", business_hours_only=False):
+        """Filter every sheet, dropping non-business-hours Team/Skill variants."""
+        selected = {}
+        for name, df in all_sheets.items():
+            index = self.sheets[name]
+            if business_hours_only and not index.business_hours_variant:
+                continue
+            positions = self.positions(name, department, business_hours_only)
+            selected[name] = df if positions is None else df.iloc[positions]
+        return selected
@@ -0,0 +1,133 @@
+"""Long-form value-count tables.
+
+The skill and phone number views carry ``{value: count}`` dict columns
+(campaigns, internal/external numbers, teams, agents, ...). In normalized
+mode those are produced instead as tidy ``keys + [field, value, count]``
+tables from a single groupby over a melted frame, and the dict columns are
+only rebuilt on request with :func:`dict_columns`.
+"""
+
+import numpy as np
+import pandas as pd
+
+from phonesystem.skill_aggregation import FINE_KEYS, parse_call_type
+
+
+SKILL_COUNT_KEYS = FINE_KEYS
+
+PHONE_COUNT_KEYS = ["Timeframe", "phone_number", "internal_external"]
+
+SKILL_DICT_FIELDS = {
+    "campaigns_dict": "campaign_name",
+    "internal_num_dict": "internal_number",
+    "external_num_dict": "external_number",
+}
+
+PHONE_DICT_FIELDS = {
+    "teams_dict": "team_name",
+    "departments_dict": "department",
+    "agents_dict": "agent_name",
+    "skillss_dict": "skill_name",
+}
+
+
+def value_counts_long(frame, keys, fields):
+    """Count every non-null value of ``fields`` per ``keys`` in one groupby."""
+    melted = frame[keys + fields].melt(
+        id_vars=keys, value_vars=fields, var_name="field", value_name="value"
+    )
+    counts = (
+        melted
+        .dropna(subset=["value"])
+        .groupby(keys + ["field", "value"], sort=False)
+        .size()
+        .reset_index(name="count")
+    )
+    if "Timeframe" in keys:
+        counts["Timeframe"] = (
+            pd.to_datetime(counts["Timeframe"], errors="coerce").dt.to_period("M")
+        )
+    return counts
+
+
+def skill_value_counts(total_calls):
+    """Campaign and internal/external number counts per skill partial.
+
+    Keys include ``call_category`` and ``Business_Hours`` so that every
+    ``CALL_TYPE_OPTIONS`` slice can be re-summed from this one table.
+    Expects the ``internal_number``/``external_number`` phone role columns.
+    """
+    return value_counts_long(total_calls, SKILL_COUNT_KEYS, list(SKILL_DICT_FIELDS.values()))
+
+
+def phone_value_counts(phone_df):
+    """Team, department, agent and skill counts per phone number and month."""
+    return value_counts_long(phone_df, PHONE_COUNT_KEYS, list(PHONE_DICT_FIELDS.values()))
+
+
+def dict_columns(counts, keys, fields):
+    """Rebuild ``{value: count}`` columns from a tidy counts table.
+
+    ``fields`` maps output column names to ``field`` labels. Counts are
+    summed over any key columns not listed in ``keys`` and each dict is
+    ordered by descending count. Returns one row per ``keys`` combination.
+    """
+    counts = (
+        counts
+        .groupby(keys + ["field", "value"], sort=False)["count"]
+        .sum()
+        .reset_index()
+    )
+    group_ids = counts.groupby(keys, sort=False).ngroup().to_numpy()
+    index = counts[keys].drop_duplicates().reset_index(drop=True)
+    result = index.copy()
+
+    for column, field in fields.items():
+        mask = (counts["field"] == field).to_numpy()
+        ids = group_ids[mask]
+        order = np.lexsort((-counts["count"].to_numpy()[mask], ids))
+        ids = ids[order]
+        values = counts["value"].to_numpy()[mask][order].tolist()
+        totals = counts["count"].to_numpy()[mask][order].tolist()
+        starts = np.searchsorted(ids, np.arange(len(index)), side="left")
+        ends = np.searchsorted(ids, np.arange(len(index)), side="right")
+        result[column] = [dict(zip(values[s:e], totals[s:e])) for s, e in zip(starts, ends)]
+
+    return result
+
+
+def attach_dict_columns(frame, counts, keys, fields):
+    """Left-join lazily rebuilt dict columns onto ``frame`` by ``keys``."""
+    if frame.empty:
+        return frame
+    dicts = dict_columns(counts, keys, fields)
+    merged = frame.merge(dicts, on=keys, how="left")
+    for column in fields:
+        merged[column] = [d if isinstance(d, dict) else {} for d in merged[column]]
+    return merged
+
+
+def attach_phone_dicts(phone_numbers, counts):
+    """Phone_Numbers with its dict columns rebuilt from :func:`phone_value_counts`.
+
+    The dicts are placed after ``contact_count``, as
+    ``aggregate_phone_numbers`` lays them out.
+    """
+    if phone_numbers.empty:
+        return phone_numbers
+    counts = counts.assign(internal_external=counts["internal_external"].astype(str))
+    frame = attach_dict_columns(phone_numbers, counts, PHONE_COUNT_KEYS, PHONE_DICT_FIELDS)
+    columns = list(phone_numbers.columns)
+    position = columns.index("contact_count") + 1
+    return frame[columns[:position] + list(PHONE_DICT_FIELDS) + columns[position:]]
+
+
+def skill_slice_counts(counts, option):
+    """Rows of a :func:`skill_value_counts` table belonging to one option."""
+    category, business_hours_only = parse_call_type(option)
+    mask = np.ones(len(counts), dtype=bool)
+    if category is not None:
+        mask &= (counts["call_category"] == category).to_numpy()
+    if business_hours_only:
+        mask &= (counts["Business_Hours"] == 1).to_numpy()
+    return counts.loc[mask]
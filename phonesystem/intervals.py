@@ -0,0 +1,154 @@
+"""Interval cube of call arrivals and handle times for staffing.
+
+Every call is bucketed by day of week and the 15-minute interval its
+start time falls in, straight from the int64 timestamps (no per-row date
+formatting), and summed per skill, department and business-hours flag::
+
+    cube = IntervalCube.from_calls(total_calls)
+    cube.grid("calls", minutes=30, department="Sales")
+
+The cube is additive: 30- and 60-minute views re-sum the 15-minute rows,
+and cubes of separate chunks merge by re-summing. It is written as the
+``Interval_Calls`` sheet, with readable day names and ``HH:MM`` interval
+starts, and :meth:`IntervalCube.from_frame` reads that sheet back.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from phonesystem.config import INTERVAL_MINUTES
+from phonesystem.skill_aggregation import SLA_COLUMNS
+
+
+BASE_MINUTES = INTERVAL_MINUTES[0]
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+GROUP_KEYS = ["skill_name", "department", "Business_Hours"]
+
+INTERVAL_COLUMNS = ["calls", "inqueue_time", "agent_work_time", "abandons"] + list(SLA_COLUMNS)
+
+# Heatmap metric -> (numerator, denominator) for per-call averages and rates
+RATIO_METRICS = {
+    "avg_inqueue_time": ("inqueue_time", "calls"),
+    "avg_agent_work_time": ("agent_work_time", "calls"),
+    "abandon_rate": ("abandons", "calls"),
+    "sla_met_rate": ("sla_met", "calls"),
+}
+
+MICROS_PER_MINUTE = 60_000_000
+MICROS_PER_DAY = 1440 * MICROS_PER_MINUTE
+
+
+def interval_slots(start_time, minutes=BASE_MINUTES):
+    """``(weekday, slot, valid)`` arrays: Monday = 0 and interval number within the day."""
+    values = start_time.to_numpy(dtype="datetime64[us]")
+    valid = ~np.isnat(values)
+    days, micros = np.divmod(values.astype(np.int64), MICROS_PER_DAY)
+    # 1970-01-01 was a Thursday
+    weekday = (days + 3) % 7
+    return weekday, micros // (minutes * MICROS_PER_MINUTE), valid
+
+
+def interval_labels(minutes):
+    """``HH:MM`` start of every interval of the day."""
+    starts = np.arange(0, 1440, minutes)
+    return [f"{start // 60:02d}:{start % 60:02d}" for start in starts]
+
+
+@dataclass
+class IntervalCube:
+    """Call counters per ``GROUP_KEYS``, weekday and base-grain slot."""
+
+    counts: pd.DataFrame
+
+    @classmethod
+    def from_calls(cls, total_calls):
+        if total_calls.empty:
+            return cls(counts=pd.DataFrame(columns=GROUP_KEYS + ["weekday", "slot"] + INTERVAL_COLUMNS))
+        weekday, slot, valid = interval_slots(total_calls["start_time"])
+        calls = total_calls.loc[valid]
+        frame = pd.DataFrame({
+            **{key: calls[key].to_numpy() for key in GROUP_KEYS},
+            "weekday": weekday[valid],
+            "slot": slot[valid],
+            "calls": np.ones(len(calls), dtype=np.int64),
+            "inqueue_time": calls["InQueue"].fillna(0).to_numpy(),
+            "agent_work_time": calls["Agent_Work_Time"].fillna(0).to_numpy(),
+            "abandons": (calls["abandon"] == 1).to_numpy(dtype=np.int64, na_value=0),
+            **{
+                name: (calls["SLA"] == level).to_numpy(dtype=np.int64, na_value=0)
+                for name, level in SLA_COLUMNS.items()
+            },
+        })
+        return cls(counts=_resum(frame))
+
+    @classmethod
+    def merge(cls, parts):
+        """Combine cubes of disjoint sets of calls."""
+        parts = [part.counts for part in parts if part is not None and not part.counts.empty]
+        if not parts:
+            return cls.from_calls(pd.DataFrame())
+        return cls(counts=_resum(pd.concat(parts, ignore_index=True)))
+
+    def to_frame(self):
+        """The ``Interval_Calls`` sheet: day names and ``HH:MM`` interval starts."""
+        counts = self.counts
+        labels = np.asarray(interval_labels(BASE_MINUTES), dtype=object)
+        frame = counts[GROUP_KEYS].copy()
+        weekdays = np.asarray(WEEKDAYS, dtype=object)
+        frame["day_of_week"] = weekdays[counts["weekday"].to_numpy(dtype=np.int64)]
+        frame["interval_start"] = labels[counts["slot"].to_numpy(dtype=np.int64)]
+        for column in INTERVAL_COLUMNS:
+            frame[column] = counts[column].to_numpy()
+        return frame
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Read an ``Interval_Calls`` sheet back into a cube."""
+        weekday = pd.Categorical(frame["day_of_week"], categories=WEEKDAYS).codes
+        interval = frame["interval_start"].astype(str)
+        minute = interval.str.slice(0, 2).astype(int) * 60 + interval.str.slice(3, 5).astype(int)
+        counts = frame[GROUP_KEYS + INTERVAL_COLUMNS].assign(
+            weekday=weekday.astype(np.int64),
+            slot=(minute // BASE_MINUTES).to_numpy(dtype=np.int64),
+        )
+        return cls(counts=counts[GROUP_KEYS + ["weekday", "slot"] + INTERVAL_COLUMNS])
+
+    def grid(self, metric="calls", minutes=BASE_MINUTES, department=None, skill_name=None,
+             business_hours_only=False):
+        """Weekday x interval table of ``metric`` for a heatmap.
+
+        ``metric`` is one of ``INTERVAL_COLUMNS`` or ``RATIO_METRICS``;
+        ``minutes`` must be a multiple of the base grain that divides a day.
+        """
+        counts = self.counts
+        mask = np.ones(len(counts), dtype=bool)
+        if department is not None:
+            mask &= (counts["department"] == department).to_numpy()
+        if skill_name is not None:
+            mask &= (counts["skill_name"] == skill_name).to_numpy()
+        if business_hours_only:
+            mask &= (counts["Business_Hours"] == 1).to_numpy()
+        counts = counts.loc[mask]
+
+        numerator, denominator = RATIO_METRICS.get(metric, (metric, None))
+        columns = [numerator] if denominator is None else [numerator, denominator]
+        slot = counts["slot"].to_numpy(dtype=np.int64) // (minutes // BASE_MINUTES)
+        summed = counts[columns].groupby([counts["weekday"].to_numpy(dtype=np.int64), slot]).sum()
+        values = summed[numerator] if denominator is None else summed[numerator] / summed[denominator]
+
+        slots = 1440 // minutes
+        grid = values.unstack().reindex(index=range(7), columns=range(slots))
+        if denominator is None:
+            grid = grid.fillna(0)
+        grid.index = WEEKDAYS
+        grid.columns = interval_labels(minutes)
+        return grid
+
+
+def _resum(frame):
+    keys = GROUP_KEYS + ["weekday", "slot"]
+    return frame.groupby(keys, sort=True, dropna=False)[INTERVAL_COLUMNS].sum().reset_index()
@@ -0,0 +1,240 @@
+"""Columnar Master_Contacts representation.
+
+Instead of one Python list per contact and column, the legs of every
+master contact are kept as a flat table sorted by ``master_contact_id``
+with an ``offsets`` array marking where each contact starts. Summary
+scalars are computed with native group reductions; list columns are only
+built by :meth:`MasterContactLegs.to_frame` for display or export.
+
+Transfer chains come from the same sorted legs: the first and last leg of
+every contact are at its offsets, and the ordered skill path is matched
+exactly by grouping contacts with the same number of legs into a matrix
+of skill codes and finding its distinct rows, so path labels are only
+built once per distinct path.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from phonesystem.datetimes import format_timestamps
+
+
+LEG_COLUMNS = [
+    "contact_id", "PreQueue", "InQueue", "Agent_Time", "ACW_Seconds", "PostQueue",
+    "skill_name", "team_name", "department", "agent_name", "call_category",
+    "SLA", "Business_Hours", "start_time", "Timeframe",
+    "customer_call_time", "Agent_Work_Time", "ANI", "DNIS", "abandon",
+]
+
+# Output column -> leg column, in Master_Contacts sheet order
+VALUE_LISTS = {
+    "PreQueue": "PreQueue",
+    "InQueue": "InQueue",
+    "Agent_Time": "Agent_Time",
+    "ACW_Seconds": "ACW_Seconds",
+    "PostQueue": "PostQueue",
+}
+
+DISTINCT_LISTS = ["skill_name", "team_name", "department", "agent_name", "call_category"]
+
+TRAILING_LISTS = {
+    "customer_call_time": "customer_call_time",
+    "agent_total_time": "Agent_Work_Time",
+}
+
+# Transfer-chain scalars appended to the Master_Contacts view
+CHAIN_COLUMNS = [
+    "transfer_count", "skill_path", "first_to_last_leg_seconds",
+    "ended_in_abandon", "ended_with_agent",
+]
+
+PATH_SEPARATOR = " > "
+UNKNOWN_SKILL = "Unknown"
+
+
+def _split(values, offsets):
+    values = values.tolist()
+    return [values[s:e] for s, e in zip(offsets[:-1], offsets[1:])]
+
+
+def _sequence_ids(codes, offsets):
+    """Id of every group's sequence of ``codes``; equal sequences share an id.
+
+    Returns ``(ids, sequences)`` with the distinct sequences as arrays.
+    """
+    lengths = np.diff(offsets)
+    base = int(codes.max(initial=-1)) + 2
+    ids = np.empty(len(lengths), dtype=np.int64)
+    sequences = []
+    for length in np.unique(lengths):
+        groups = np.flatnonzero(lengths == length)
+        starts = offsets[groups]
+        # Fold one position at a time: (sequence so far, next code) -> dense key
+        key = np.zeros(len(groups), dtype=np.int64)
+        for position in range(length):
+            key, _ = pd.factorize(key * base + codes[starts + position] + 1)
+        _, first = np.unique(key, return_index=True)
+        ids[groups] = len(sequences) + key
+        sequences.extend(codes[starts[first][:, None] + np.arange(length)])
+    return ids, sequences
+
+
+def _skill_paths(skills, offsets):
+    """Ordered ``A > B > C`` skill path per group, as a categorical."""
+    codes, names = pd.factorize(skills)
+    labels = np.append(np.asarray(names, dtype=object), UNKNOWN_SKILL)
+    path_ids, sequences = _sequence_ids(codes, offsets)
+    paths = [PATH_SEPARATOR.join(labels[sequence]) for sequence in sequences]
+    # Distinct sequences could still share a label if a skill name held the separator
+    path_codes, categories = pd.factorize(pd.Series(paths, dtype=object))
+    return pd.Categorical.from_codes(path_codes[path_ids], categories)
+
+
+def _chain_summary(legs, offsets):
+    """Transfer-chain scalars per contact from its first and last leg."""
+    first, last = offsets[:-1], offsets[1:] - 1
+    start = legs["start_time"].to_numpy(dtype="datetime64[us]")
+    abandoned = (legs["abandon"] == 1).to_numpy(dtype=bool, na_value=False)[last]
+    answered = (legs["Agent_Time"].fillna(0) > 0).to_numpy(dtype=bool)[last]
+    return {
+        "transfer_count": np.diff(offsets) - 1,
+        "skill_path": _skill_paths(legs["skill_name"], offsets),
+        "first_to_last_leg_seconds": (start[last] - start[first]) / np.timedelta64(1, "s"),
+        "ended_in_abandon": abandoned.astype(np.int64),
+        "ended_with_agent": (answered & ~abandoned).astype(np.int64),
+        "first_department": legs["department"].to_numpy()[first],
+    }
+
+
+def _distinct_split(group, values, n_groups):
+    """Per-group unique non-null values in first-seen order."""
+    keep = ~pd.isna(values) & ~pd.DataFrame({"g": group, "v": values}).duplicated().to_numpy()
+    kept_group = group[keep]
+    offsets = np.searchsorted(kept_group, np.arange(n_groups + 1))
+    return _split(values[keep], offsets)
+
+
+@dataclass
+class MasterContactLegs:
+    """Flat, sorted legs table plus offsets keyed by ``master_contact_id``.
+
+    Legs of contact ``ids[i]`` are ``legs.iloc[offsets[i]:offsets[i + 1]]``
+    in start time order. ``summary`` holds the scalar columns of the
+    Master_Contacts view, one row per contact.
+    """
+
+    ids: np.ndarray
+    offsets: np.ndarray
+    legs: pd.DataFrame
+    summary: pd.DataFrame
+
+    @classmethod
+    def from_calls(cls, total_calls):
+        codes, ids = pd.factorize(total_calls["master_contact_id"], sort=True)
+        keep = codes >= 0
+        # Legs in start order within each contact, whatever order the calls
+        # come in; NaT last and ties in input order
+        start = total_calls["start_time"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        start[total_calls["start_time"].isna().to_numpy()] = np.iinfo(np.int64).max
+        order = np.lexsort((start[keep], codes[keep]))
+        group = codes[keep][order]
+
+        legs = total_calls.loc[keep, LEG_COLUMNS].iloc[order].reset_index(drop=True)
+        offsets = np.searchsorted(group, np.arange(len(ids) + 1))
+
+        sla = legs["SLA"]
+        summary = pd.DataFrame({
+            "sla_missed": (sla == -1).astype(np.int64),
+            "sla_met": (sla == 0).astype(np.int64),
+            "sla_exceeded": (sla == 1).astype(np.int64),
+            "business_hours_flag": (legs["Business_Hours"] == 1).astype(np.int64),
+        }).groupby(group).agg({
+            "sla_missed": "sum",
+            "sla_met": "sum",
+            "sla_exceeded": "sum",
+            "business_hours_flag": "max",
+        })
+        summary["Timeframe"] = (
+            pd.to_datetime(legs["Timeframe"].groupby(group).first(), errors="coerce")
+            .dt.to_period("M")
+        )
+        summary.index = pd.Index(np.asarray(ids), name="master_contact_id")
+        if len(ids):
+            for column, values in _chain_summary(legs, offsets).items():
+                summary[column] = values
+
+        return cls(ids=np.asarray(ids), offsets=offsets, legs=legs, summary=summary)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def group(self):
+        """Contact position of every leg."""
+        return np.repeat(np.arange(len(self.ids)), np.diff(self.offsets))
+
+    def _number_lists(self, first, second):
+        # Outbound legs contribute ``first``, the others ``second``; outbound first
+        outbound = (self.legs["call_category"] == "Outbound").to_numpy()
+        group = self.group
+        numbers = np.where(outbound, self.legs[first].to_numpy(), self.legs[second].to_numpy())
+        order = np.lexsort((np.arange(len(group)), ~outbound, group))
+        return _distinct_split(group[order], numbers[order], len(self.ids))
+
+    def to_frame(self):
+        """Materialize the Master_Contacts view with its list columns."""
+        if len(self.ids) == 0:
+            return pd.DataFrame()
+
+        legs, offsets, group = self.legs, self.offsets, self.group
+        n_groups = len(self.ids)
+
+        frame = pd.DataFrame({"master_contact_id": self.ids})
+        frame["contact_id"] = _distinct_split(group, legs["contact_id"].to_numpy(), n_groups)
+        for column, source in VALUE_LISTS.items():
+            frame[column] = _split(legs[source].fillna(0).to_numpy(), offsets)
+        for column in DISTINCT_LISTS:
+            frame[column] = _distinct_split(group, legs[column].to_numpy(), n_groups)
+
+        summary = self.summary.reset_index(drop=True)
+        for column in ["sla_missed", "sla_met", "sla_exceeded", "business_hours_flag"]:
+            frame[column] = summary[column].to_numpy()
+        frame["business_hours_list"] = _split(legs["Business_Hours"].fillna(0).to_numpy(), offsets)
+        frame["start_time"] = _split(format_timestamps(legs["start_time"]), offsets)
+        frame["Timeframe"] = summary["Timeframe"].array
+        for column, source in TRAILING_LISTS.items():
+            frame[column] = _split(legs[source].fillna(0).to_numpy(), offsets)
+
+        frame["internal_num_list"] = self._number_lists("ANI", "DNIS")
+        frame["external_num_list"] = self._number_lists("DNIS", "ANI")
+        for column in CHAIN_COLUMNS:
+            frame[column] = summary[column].array
+        return frame
+
+    def transfer_paths(self):
+        """Transfer_Paths table: contacts per entry department and skill path.
+
+        Sorted by the number of contacts, most frequent path first.
+        """
+        if len(self.ids) == 0:
+            return pd.DataFrame()
+        paths = (
+            self.summary
+            .groupby(["first_department", "skill_path"], observed=True, sort=False)
+            .agg(
+                transfer_count=("transfer_count", "first"),
+                contacts=("transfer_count", "size"),
+                ended_in_abandon=("ended_in_abandon", "sum"),
+                ended_with_agent=("ended_with_agent", "sum"),
+                avg_first_to_last_leg_seconds=("first_to_last_leg_seconds", "mean"),
+            )
+            .reset_index()
+            .rename(columns={"first_department": "department"})
+        )
+        paths["skill_path"] = paths["skill_path"].astype(str)
+        paths["abandon_rate"] = paths["ended_in_abandon"] / paths["contacts"]
+        return paths.sort_values(
+            ["contacts", "department", "skill_path"], ascending=[False, True, True]
+        ).reset_index(drop=True)
@@ -0,0 +1,166 @@
+"""Parallel processing of several exports at once.
+
+The phone system exports one file per month (sometimes per site). Each
+file goes through the per-row stages of
+:func:`~phonesystem.pipeline.process_calls` (read, datetime, spam filter,
+classification, business hours, phone roles) in its own worker process,
+and the processed frames are merged before the aggregation stages, so a
+quarter takes about as long as its largest month::
+
+    result = run_files(["2024-01.xlsx", "2024-02.xlsx", "2024-03.xlsx"])
+
+Files may overlap: when the same ``contact_id`` appears in several files
+the rows from the later file win, as when a month is re-ingested into the
+:class:`~phonesystem.store.MonthStore`. Repeats of a ``contact_id`` within
+one file are kept, as :func:`~phonesystem.pipeline.run_pipeline` keeps
+them.
+"""
+
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from phonesystem.pipeline import DEFAULT_CALENDAR, build_result, process_calls, sort_calls
+from phonesystem.profiling import StageProfiler, active_profiler, stage
+from phonesystem.rules import DEFAULT_RULES
+
+
+def worker_context():
+    """Multiprocessing context for the worker pool.
+
+    Forkserver workers start from a clean process with pandas and the
+    pipeline already imported, which is safe under the dashboard's
+    threads; platforms without it use spawn.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["phonesystem.pipeline"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def process_pool(max_workers=None):
+    """A process pool for :func:`process_files` (one worker per CPU by default)."""
+    return ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), mp_context=worker_context())
+
+
+def _payload(source):
+    # Paths are read by the worker; uploads travel as their name and bytes
+    if not hasattr(source, "read"):
+        return source
+    if hasattr(source, "getvalue"):
+        data = source.getvalue()
+    else:
+        position = source.tell()
+        source.seek(0)
+        data = source.read()
+        source.seek(position)
+    return getattr(source, "name", ""), data
+
+
+def _process_payload(payload, calendar, rules, profile, trace_memory):
+    """Worker: :func:`process_calls` on one payload, plus its stage records."""
+    if isinstance(payload, tuple):
+        name, data = payload
+        payload = io.BytesIO(data)
+        payload.name = name
+    if not profile:
+        return process_calls(payload, calendar=calendar, rules=rules), []
+    profiler = StageProfiler(trace_memory=trace_memory)
+    with profiler.activate():
+        processed = process_calls(payload, calendar=calendar, rules=rules)
+    return processed, profiler.records
+
+
+def merge_processed(parts):
+    """Combine per-file ``(total_calls, spam_calls)`` pairs into one pair.
+
+    A ``contact_id`` found in several files keeps only the rows of the
+    last file it is in (whether they are calls or spam there); repeats
+    within that file are kept. Calls are returned in start order.
+    """
+    frames = [
+        (number, kind, frame)
+        for number, pair in enumerate(parts)
+        for kind, frame in enumerate(pair)
+    ]
+    with_ids = [(number, frame) for number, _, frame in frames if "contact_id" in frame]
+    contact_ids = pd.concat([frame["contact_id"] for _, frame in with_ids], ignore_index=True)
+    numbers = np.repeat([number for number, _ in with_ids], [len(frame) for _, frame in with_ids])
+    last_file = pd.Series(numbers).groupby(contact_ids.to_numpy()).transform("max").to_numpy()
+    keep = iter(np.split(
+        numbers == last_file,
+        np.cumsum([len(frame) for _, frame in with_ids])[:-1],
+    ))
+    kept = {0: [], 1: []}
+    for _, kind, frame in frames:
+        if "contact_id" in frame:
+            frame = frame[next(keep)]
+        kept[kind].append(frame)
+
+    merged = []
+    for kind in (0, 1):
+        non_empty = [frame for frame in kept[kind] if not frame.empty]
+        frame = pd.concat(non_empty, ignore_index=True) if non_empty else kept[kind][0]
+        merged.append(frame)
+    total_calls, spam_calls = (sort_calls(frame) for frame in merged)
+    total_calls.attrs["coerced_start_times"] = sum(
+        pair[0].attrs.get("coerced_start_times", 0) for pair in parts
+    )
+    return total_calls, spam_calls
+
+
+def process_files(sources, calendar=DEFAULT_CALENDAR, rules=DEFAULT_RULES, executor=None):
+    """Run :func:`process_calls` on every source in parallel and merge the results.
+
+    ``sources`` are paths or file objects, in the order later files win
+    on duplicate ``contact_id``. ``executor`` is a process pool from
+    :func:`process_pool`; without one a pool is started for this call.
+    A single source is processed in this process.
+    """
+    sources = list(sources)
+    if len(sources) == 1:
+        return process_calls(sources[0], calendar=calendar, rules=rules)
+
+    profiler = active_profiler()
+    profile = profiler is not None
+    trace_memory = profile and profiler.trace_memory
+    with stage("parallel processing", len(sources)) as record:
+        pool = executor or process_pool(min(len(sources), os.cpu_count() or 1))
+        try:
+            futures = [
+                pool.submit(_process_payload, _payload(source), calendar, rules, profile, trace_memory)
+                for source in sources
+            ]
+            outputs = [future.result() for future in futures]
+        finally:
+            if executor is None:
+                pool.shutdown(cancel_futures=True)
+        record.rows_out = sum(len(total) + len(spam) for (total, spam), _ in outputs)
+    if profile:
+        # Worker stages appear once per file, like streamed chunks
+        for _, records in outputs:
+            profiler.records.extend(records)
+
+    parts = [processed for processed, _ in outputs]
+    with stage("merge files", sum(len(total) + len(spam) for total, spam in parts)) as record:
+        total_calls, spam_calls = merge_processed(parts)
+        record.rows_out = len(total_calls) + len(spam_calls)
+    return total_calls, spam_calls
+
+
+def files_name(sources):
+    """Display name for a set of sources, e.g. ``jan.xlsx + feb.xlsx``."""
+    return " + ".join(os.path.basename(str(getattr(source, "name", source))) for source in sources)
+
+
+def run_files(sources, calendar=DEFAULT_CALENDAR, normalized=False, rules=DEFAULT_RULES, executor=None):
+    """Process several exports in parallel and build every dashboard view from them."""
+    total_calls, spam_calls = process_files(sources, calendar=calendar, rules=rules, executor=executor)
+    result = build_result(total_calls, spam_calls, normalized=normalized)
+    result.coerced_start_times = total_calls.attrs.get("coerced_start_times", 0)
+    return result
@@ -0,0 +1,239 @@
+"""Queue and handle time percentiles per skill and team month.
+
+Sums hide the tail, so the ``PERCENTILES`` of ``PERCENTILE_COLUMNS``
+(InQueue, Agent_Work_Time, customer_call_time) are reported per skill
+month and team month as the ``Skill - Percentiles`` and
+``Team - Percentiles`` sheets.
+
+:func:`exact_percentiles` sorts each column once by (group, value) and
+reads every group's percentiles off its segment of the sorted values, with
+the linear interpolation of ``groupby(...).quantile()`` but no Python
+call per group.
+
+:class:`PercentileSketch` is the mergeable form used by the chunked mode:
+a log-bucketed histogram per skill month (as in DDSketch) whose
+percentiles are within ``SKETCH_RELATIVE_ACCURACY`` of a true value.
+Sketches of separate chunks merge by adding bucket counts, and coarser
+groupings (team, department, quarter, year) re-sum the buckets, so
+percentiles roll up across months without the raw calls::
+
+    sketch = PercentileSketch.merge([PercentileSketch.from_calls(chunk) for chunk in chunks])
+    sketch.percentiles(["department"], period="Quarter")
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from phonesystem.config import (
+    PERCENTILE_COLUMNS,
+    PERCENTILES,
+    ROLLUP_LEVELS,
+    ROLLUP_PERIODS,
+    SKETCH_RELATIVE_ACCURACY,
+)
+from phonesystem.profiling import stage
+
+
+PERCENTILE_LEVELS = ["Skill", "Team"]
+
+SKETCH_KEYS = ROLLUP_LEVELS["Skill"] + ["Timeframe"]
+
+# Bucket of zero (and negative) values, sorted before every other bucket
+ZERO_BUCKET = np.iinfo(np.int64).min
+
+
+def percentile_name(column, quantile):
+    """Output column of one percentile, e.g. ``InQueue_p90``."""
+    return f"{column}_p{round(quantile * 100)}"
+
+
+def _months(timeframe):
+    return pd.to_datetime(timeframe, errors="coerce").dt.to_period("M")
+
+
+def _interpolate(sorted_values, starts, counts, quantile):
+    """Linearly interpolated ``quantile`` of each ``[start, start + count)`` segment."""
+    if not len(sorted_values):
+        return np.full(len(starts), np.nan)
+    position = starts + quantile * np.maximum(counts - 1, 0)
+    last = len(sorted_values) - 1
+    lower = np.minimum(np.floor(position).astype(np.int64), last)
+    upper = np.minimum(np.ceil(position).astype(np.int64), last)
+    low, high = sorted_values[lower], sorted_values[upper]
+    values = low + (high - low) * (position - lower)
+    return np.where(counts > 0, values, np.nan)
+
+
+def exact_percentiles(total_calls, keys, columns=PERCENTILE_COLUMNS, quantiles=PERCENTILES):
+    """Percentiles of ``columns`` per ``keys`` and month, one sort per column.
+
+    Returns ``keys``, ``Timeframe``, ``calls`` and one column per
+    percentile, sorted by ``Timeframe`` then ``keys``. Missing values are
+    skipped, as with ``quantile``.
+    """
+    frame = total_calls[keys].assign(Timeframe=_months(total_calls["Timeframe"]))
+    group_keys = ["Timeframe"] + keys
+    group_id = frame.groupby(group_keys, sort=True).ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    valid = group_id >= 0
+    groups, first = np.unique(group_id[valid], return_index=True)
+
+    table = frame[keys + ["Timeframe"]].iloc[np.flatnonzero(valid)[first]].reset_index(drop=True)
+    table["calls"] = np.bincount(group_id[valid], minlength=len(groups))
+    for column in columns:
+        values = total_calls[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        keep = valid & ~np.isnan(values)
+        order = np.lexsort((values[keep], group_id[keep]))
+        sorted_groups, sorted_values = group_id[keep][order], values[keep][order]
+        bounds = np.searchsorted(sorted_groups, np.arange(len(groups) + 1))
+        for quantile in quantiles:
+            table[percentile_name(column, quantile)] = _interpolate(
+                sorted_values, bounds[:-1], np.diff(bounds), quantile
+            )
+    return table
+
+
+def percentile_sheets(total_calls):
+    """Exact ``{"<level> - Percentiles": frame}`` for the skill and team months."""
+    if total_calls.empty:
+        return {}
+    with stage("percentiles", len(total_calls)) as record:
+        sheets = {
+            f"{level} - Percentiles": exact_percentiles(total_calls, ROLLUP_LEVELS[level])
+            for level in PERCENTILE_LEVELS
+        }
+        record.rows_out = sum(len(df) for df in sheets.values())
+    return sheets
+
+
+@dataclass
+class PercentileSketch:
+    """Log-bucketed value counts per skill month.
+
+    ``buckets`` has the ``SKETCH_KEYS``, the ``column`` position in
+    ``PERCENTILE_COLUMNS``, the ``bucket`` index and its ``count``;
+    ``calls`` counts the calls per skill month. Bucket ``i`` holds values
+    in ``(gamma ** (i - 1), gamma ** i]``.
+    """
+
+    buckets: pd.DataFrame
+    calls: pd.DataFrame
+    accuracy: float = SKETCH_RELATIVE_ACCURACY
+
+    @property
+    def gamma(self):
+        return (1 + self.accuracy) / (1 - self.accuracy)
+
+    @classmethod
+    def from_calls(cls, total_calls, accuracy=SKETCH_RELATIVE_ACCURACY):
+        log_gamma = np.log((1 + accuracy) / (1 - accuracy))
+        stacked = []
+        for column_no, column in enumerate(PERCENTILE_COLUMNS):
+            values = total_calls[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            keep = ~np.isnan(values)
+            values = values[keep]
+            positive = values > 0
+            bucket = np.full(len(values), ZERO_BUCKET, dtype=np.int64)
+            bucket[positive] = np.ceil(np.log(values[positive]) / log_gamma).astype(np.int64)
+            stacked.append(total_calls.loc[keep, SKETCH_KEYS].assign(column=column_no, bucket=bucket))
+        buckets = (
+            pd.concat(stacked, ignore_index=True)
+            .groupby(SKETCH_KEYS + ["column", "bucket"], sort=False)
+            .size()
+            .reset_index(name="count")
+        )
+        calls = total_calls.groupby(SKETCH_KEYS, sort=False).size().reset_index(name="calls")
+        return cls(buckets=buckets, calls=calls, accuracy=accuracy)
+
+    @classmethod
+    def merge(cls, parts):
+        """Combine sketches of disjoint sets of calls by adding their counts."""
+        parts = [part for part in parts if part is not None]
+        if len(parts) == 1:
+            return parts[0]
+        if len({part.accuracy for part in parts}) > 1:
+            raise ValueError("Only sketches with the same accuracy can be merged")
+        buckets = (
+            pd.concat([part.buckets for part in parts], ignore_index=True)
+            .groupby(SKETCH_KEYS + ["column", "bucket"], sort=False)["count"]
+            .sum()
+            .reset_index()
+        )
+        calls = (
+            pd.concat([part.calls for part in parts], ignore_index=True)
+            .groupby(SKETCH_KEYS, sort=False)["calls"]
+            .sum()
+            .reset_index()
+        )
+        return cls(buckets=buckets, calls=calls, accuracy=parts[0].accuracy)
+
+    def _bucket_values(self, buckets):
+        # Midpoint of the bucket in relative terms: within ``accuracy`` of any value in it
+        gamma = self.gamma
+        exponents = np.where(buckets == ZERO_BUCKET, 0, buckets).astype(np.float64)
+        return np.where(buckets == ZERO_BUCKET, 0.0, 2 * gamma ** exponents / (gamma + 1))
+
+    def percentiles(self, keys, period="Month", quantiles=PERCENTILES):
+        """Percentiles per ``keys`` (a subset of the skill keys) and ``period``.
+
+        Same layout as :func:`exact_percentiles`.
+        """
+        freq = ROLLUP_PERIODS[period]
+        group_keys = ["Timeframe"] + keys
+
+        calls = self.calls[keys].assign(Timeframe=_months(self.calls["Timeframe"]).dt.asfreq(freq))
+        table = (
+            calls.assign(calls=self.calls["calls"].to_numpy())
+            .groupby(group_keys, sort=True)["calls"]
+            .sum()
+            .reset_index()
+        )
+        group_id = pd.Series(np.arange(len(table)), index=pd.MultiIndex.from_frame(table[group_keys]))
+
+        buckets = self.buckets[keys].assign(
+            Timeframe=_months(self.buckets["Timeframe"]).dt.asfreq(freq),
+            column=self.buckets["column"].to_numpy(),
+            bucket=self.buckets["bucket"].to_numpy(),
+        )
+        summed = (
+            buckets.assign(count=self.buckets["count"].to_numpy())
+            .groupby(group_keys + ["column", "bucket"], sort=True)["count"]
+            .sum()
+            .reset_index()
+        )
+        gid = group_id.reindex(pd.MultiIndex.from_frame(summed[group_keys])).to_numpy()
+        segment = summed.groupby(group_keys + ["column"], sort=False).ngroup().to_numpy()
+        counts = summed["count"].to_numpy()
+        # Count of values up to and including each bucket within its segment
+        within = pd.Series(counts).groupby(segment).cumsum().to_numpy()
+        totals = np.bincount(segment, weights=counts)[segment]
+        values = self._bucket_values(summed["bucket"].to_numpy())
+
+        def ranked(selected, rank):
+            # Value of the bucket holding the ``rank``-th smallest value of each group
+            hit = selected & (within > rank) & (within - counts <= rank)
+            picked = np.full(len(table), np.nan)
+            picked[gid[hit]] = values[hit]
+            return picked
+
+        result = table[keys + ["Timeframe"]].copy()
+        result["calls"] = table["calls"].to_numpy()
+        column_no = summed["column"].to_numpy()
+        for position, column in enumerate(PERCENTILE_COLUMNS):
+            selected = column_no == position
+            for quantile in quantiles:
+                # Interpolated between neighbouring ranks, as exact_percentiles does
+                rank = quantile * (totals - 1)
+                fraction = np.zeros(len(table))
+                fraction[gid[selected]] = (rank - np.floor(rank))[selected]
+                low, high = ranked(selected, np.floor(rank)), ranked(selected, np.ceil(rank))
+                result[percentile_name(column, quantile)] = low + (high - low) * fraction
+        return result
+
+    def sheets(self):
+        """``{"<level> - Percentiles": frame}`` like :func:`percentile_sheets`."""
+        return {
+            f"{level} - Percentiles": self.percentiles(ROLLUP_LEVELS[level])
+            for level in PERCENTILE_LEVELS
+        }
@@ -0,0 +1,732 @@
+"""Headless processing pipeline for NICE phone system exports.
+
+Every stage is a plain function over pandas DataFrames so the same code can
+be driven by the Streamlit dashboard or by the command-line batch mode.
+"""
+
+import dataclasses
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from phonesystem.business_calendar import BusinessCalendar
+from phonesystem.config import (
+    BUSINESS_HOURS,
+    CALL_TYPE_OPTIONS,
+    DEFAULT_BUSINESS_HOURS,
+    DEPARTMENT_TIMEZONES,
+    EXCEL_SHEET_NAME_LENGTH,
+    HOLIDAYS,
+    SKILL_GROUP_KEYS,
+    SOURCE_TIMEZONE,
+    TEAM_TO_DEPT,
+)
+from phonesystem.datetimes import assemble_start_times, format_timestamps, month_starts
+from phonesystem.dtypes import LabelTable, column_memory, compact_calls, compact_carried, memory_report
+from phonesystem.excel import write_workbook
+from phonesystem.frequency import (
+    PHONE_COUNT_KEYS,
+    SKILL_DICT_FIELDS,
+    phone_value_counts,
+    skill_value_counts,
+)
+from phonesystem.intervals import IntervalCube
+from phonesystem.master_contacts import MasterContactLegs
+from phonesystem.percentiles import percentile_sheets
+from phonesystem.profiling import stage
+from phonesystem.repeat_contacts import RepeatIndex
+from phonesystem.rollup import build_rollups
+from phonesystem.rules import DEFAULT_RULES
+from phonesystem.skill_aggregation import (
+    CATEGORY_COLUMNS,
+    HOURS_COLUMNS,
+    SLA_COLUMNS,
+    SUM_COLUMNS,
+    aggregate_skills_single_pass,
+    aggregate_teams,
+    indicator_columns,
+    scan_partials,
+)
+
+
+# =========================
+# Configuration
+# =========================
+DEFAULT_CALENDAR = BusinessCalendar(
+    hours=BUSINESS_HOURS,
+    default_hours=DEFAULT_BUSINESS_HOURS,
+    holidays=tuple(HOLIDAYS),
+    timezones=DEPARTMENT_TIMEZONES,
+    source_timezone=SOURCE_TIMEZONE,
+)
+
+
+@dataclass
+class PipelineResult:
+    """All views produced by a single pipeline run."""
+
+    total_calls: pd.DataFrame
+    spam_calls: pd.DataFrame
+    skill_dfs: dict = field(default_factory=dict)
+    team_dfs: dict = field(default_factory=dict)
+    rollups: dict = field(default_factory=dict)
+    percentiles: dict = field(default_factory=dict)
+    master_contacts: pd.DataFrame = field(default_factory=pd.DataFrame)
+    transfer_paths: pd.DataFrame = field(default_factory=pd.DataFrame)
+    phone_numbers: pd.DataFrame = field(default_factory=pd.DataFrame)
+    repeat_contacts: pd.DataFrame = field(default_factory=pd.DataFrame)
+    interval_calls: pd.DataFrame = field(default_factory=pd.DataFrame)
+    value_counts: dict = field(default_factory=dict)
+    master_legs: MasterContactLegs = None
+    labels: LabelTable = None
+    memory_report: pd.DataFrame = None
+    coerced_start_times: int = 0
+
+    def master_contact_frame(self):
+        """Master_Contacts with list columns, materialized from ``master_legs`` on first use."""
+        if self.master_contacts.empty and self.master_legs is not None:
+            with stage("master contacts (materialize)", len(self.master_legs.legs)) as record:
+                self.master_contacts = self.master_legs.to_frame()
+                record.rows_out = len(self.master_contacts)
+        return self.master_contacts
+
+    def total_calls_frame(self):
+        """Total_Calls with its ids and phone numbers decoded from ``labels``."""
+        if self.labels is None:
+            return self.total_calls
+        return self.labels.decode(self.total_calls)
+
+
+# =========================
+# Load Data
+# =========================
+def source_name(source):
+    """File name of a path or uploaded file object, lower-cased."""
+    return str(getattr(source, "name", source)).lower()
+
+
+def read_calls(source):
+    """Read a raw export (.xlsx/.xls or .csv) into a DataFrame."""
+    with stage("load") as record:
+        if source_name(source).endswith(".csv"):
+            total_calls = pd.read_csv(source)
+        else:
+            total_calls = pd.read_excel(source)
+        record.rows_out = len(total_calls)
+    return total_calls
+
+
+def normalize_calls(total_calls):
+    """Parse dates and normalise fills and identifier types of raw rows."""
+    total_calls.drop(columns=['ACW_Time'], inplace=True, errors='ignore')
+
+    with stage("datetime", len(total_calls)) as record:
+        total_calls["start_date"] = pd.to_datetime(total_calls["start_date"], errors="coerce")
+        total_calls["start_time"], coerced = assemble_start_times(
+            total_calls["start_date"], total_calls["start_time"]
+        )
+        record.rows_out = len(total_calls) - int(total_calls["start_time"].isna().sum())
+    # Rows with a date and time that could not be parsed (now NaT)
+    total_calls.attrs["coerced_start_times"] = coerced
+
+    total_calls['Total_Time'] = total_calls['Total_Time'].fillna(0)
+    total_calls['team_name'] = total_calls['team_name'].fillna('No Assigned Team')
+
+    for col in ["master_contact_id", "contact_id", "contact_name"]:
+        total_calls[col] = total_calls[col].astype(str)
+
+    return total_calls
+
+
+# Ties on start_time are broken by contact_id, so calls merged from
+# several files or read back from the store keep the same order
+CALL_ORDER = ["start_time", "contact_id"]
+
+
+def sort_calls(frame):
+    """``frame`` in :data:`CALL_ORDER`, with a fresh index."""
+    if not set(CALL_ORDER) <= set(frame.columns):
+        return frame
+    return frame.sort_values(CALL_ORDER, kind="stable", ignore_index=True)
+
+
+def load_calls(source):
+    """Read a raw export and normalise dates, fills and identifier types."""
+    total_calls = normalize_calls(read_calls(source))
+    with stage("sort", len(total_calls)) as record:
+        total_calls.sort_values(CALL_ORDER, kind="stable", inplace=True)
+        record.rows_out = len(total_calls)
+    return total_calls
+
+
+# =========================
+# Spam Filter
+# =========================
+def split_spam(total_calls):
+    """Separate calls that never reached a queue. Returns ``(calls, spam)``."""
+    with stage("spam filter", len(total_calls)) as record:
+        excluded_mask = (total_calls["InQueue"] == 0) & (total_calls["PreQueue"] > 0)
+        spam_calls = total_calls.loc[excluded_mask].copy()
+        total_calls = total_calls.loc[~excluded_mask].copy()
+        record.rows_out = len(total_calls)
+    return total_calls, spam_calls
+
+
+# =========================
+# Classification
+# =========================
+def categorize_skills(skill_name, rules=DEFAULT_RULES):
+    """Map skill names to a call category label, classifying each distinct skill once."""
+    return rules.categorize(skill_name)
+
+
+def classify(total_calls, team_to_dept=None, calendar=DEFAULT_CALENDAR, rules=DEFAULT_RULES):
+    """Add Timeframe, derived times, category, department and business hours.
+
+    ``team_to_dept`` overrides the team mapping of ``rules`` when given.
+    """
+    rows = len(total_calls)
+    with stage("derived columns", rows) as record:
+        total_calls["Timeframe"] = month_starts(total_calls["start_date"])
+
+        total_calls['Agent_Work_Time'] = total_calls['ACW_Seconds'].fillna(0) + total_calls['Agent_Time'].fillna(0)
+        time_cols = ['PreQueue', 'InQueue', 'Agent_Time', 'PostQueue']
+        total_calls['customer_call_time'] = total_calls[time_cols].sum(axis=1)
+        record.rows_out = rows
+
+    with stage("categorization", rows) as record:
+        total_calls["call_category"] = categorize_skills(total_calls["skill_name"], rules)
+        if team_to_dept is not None:
+            rules = dataclasses.replace(rules, team_to_dept=team_to_dept)
+        total_calls["department"] = rules.departments(total_calls["team_name"])
+        record.rows_out = rows
+
+    with stage("business hours", rows) as record:
+        total_calls['Business_Hours'] = calendar.flag(
+            total_calls['start_time'], total_calls['department']
+        )
+        record.rows_out = int(total_calls['Business_Hours'].sum())
+    return total_calls
+
+
+def add_phone_roles(total_calls):
+    """Add ``internal_number``/``external_number`` based on call direction."""
+    outbound = total_calls["call_category"] == "Outbound"
+    total_calls["internal_number"] = np.where(outbound, total_calls["ANI"], total_calls["DNIS"])
+    total_calls["external_number"] = np.where(outbound, total_calls["DNIS"], total_calls["ANI"])
+    return total_calls
+
+
+# =========================
+# Monthly Aggregation
+# =========================
+def filter_call_type(total_calls, option):
+    """Return the slice of ``total_calls`` for one ``CALL_TYPE_OPTIONS`` entry."""
+    if option == "All Calls":
+        return total_calls
+    if option == "All Calls Business Hours":
+        return total_calls[total_calls["Business_Hours"] == 1]
+    if option.endswith("Business Hours"):
+        base_category = option.replace(" Business Hours", "")
+        return total_calls[
+            (total_calls["call_category"] == base_category) &
+            (total_calls["Business_Hours"] == 1)
+        ]
+    return total_calls[total_calls["call_category"] == option]
+
+
+def build_internal_dict(group):
+    combined = pd.concat([
+        group.loc[group["call_category"] == "Outbound", "ANI"],
+        group.loc[group["call_category"] != "Outbound", "DNIS"],
+    ])
+    return combined.dropna().value_counts().to_dict()
+
+
+def build_external_dict(group):
+    combined = pd.concat([
+        group.loc[group["call_category"] == "Outbound", "DNIS"],
+        group.loc[group["call_category"] != "Outbound", "ANI"],
+    ])
+    return combined.dropna().value_counts().to_dict()
+
+
+LAMBDA_COUNTERS = dict(
+    sla_missed=("SLA", lambda x: (x == -1).sum()),
+    sla_met=("SLA", lambda x: (x == 0).sum()),
+    sla_exceeded=("SLA", lambda x: (x == 1).sum()),
+
+    business_hours_calls=("Business_Hours", lambda x: (x == 1).sum()),
+    after_hours_calls=("Business_Hours", lambda x: (x == 0).sum()),
+
+    inbound_calls=("call_category", lambda x: (x == "Inbound").sum()),
+    outbound_calls=("call_category", lambda x: (x == "Outbound").sum()),
+    voicemail_calls=("call_category", lambda x: (x == "Voicemail").sum()),
+    afterhours_calls=("call_category", lambda x: (x == "After Hours").sum()),
+    noagent_calls=("call_category", lambda x: (x == "No Agent").sum()),
+    other_calls=("call_category", lambda x: (x == "Other").sum()),
+)
+
+SKILL_AGG_COLUMNS = (
+    ["call_volume"] + list(SUM_COLUMNS) + list(SLA_COLUMNS) + HOURS_COLUMNS
+    + ["unique_agents_count", "unique_teams_count", "unique_campaigns_count",
+       "agents_list", "teams_list", "campaigns_dict"]
+    + list(CATEGORY_COLUMNS)
+)
+
+
+def aggregate_skill_slice(df_filtered, vectorized_counters=True):
+    """Monthly per-skill metrics for one pre-filtered slice of calls.
+
+    The SLA, business-hours and category counters are summed from one-hot
+    indicator columns; ``vectorized_counters=False`` computes them with the
+    original per-group lambdas instead.
+    """
+    aggregations = dict(
+        call_volume=("master_contact_id", "count"),
+
+        total_customer_call_time=("customer_call_time", "sum"),
+        prequeue_time=("PreQueue", "sum"),
+        inqueue_time=("InQueue", "sum"),
+        agent_time=("Agent_Time", "sum"),
+        postqueue_time=("PostQueue", "sum"),
+        acw_time=("ACW_Seconds", "sum"),
+        agent_total_time=("Agent_Work_Time", "sum"),
+        abandon_time=("Abandon_Time", "sum"),
+
+        unique_agents_count=("agent_name", "nunique"),
+        unique_teams_count=("team_name", "nunique"),
+        unique_campaigns_count=("campaign_name", "nunique"),
+
+        agents_list=("agent_name", lambda x: list(x.dropna().unique())),
+        teams_list=("team_name", lambda x: list(x.dropna().unique())),
+        campaigns_dict=("campaign_name", lambda x: x.value_counts().to_dict()),
+    )
+    if not vectorized_counters:
+        aggregations.update(LAMBDA_COUNTERS)
+
+    monthly_skill_calls = df_filtered.groupby(SKILL_GROUP_KEYS).agg(**aggregations)
+
+    if vectorized_counters:
+        counters = (
+            indicator_columns(df_filtered)
+            .groupby([df_filtered[key] for key in SKILL_GROUP_KEYS])
+            .sum()
+        )
+        monthly_skill_calls = pd.concat([monthly_skill_calls, counters], axis=1)
+
+    monthly_skill_calls = (
+        monthly_skill_calls[SKILL_AGG_COLUMNS]
+        .reset_index()
+        .sort_values(["Timeframe", "skill_name"])
+    )
+
+    # =========================
+    # Add Internal/External Number Dictionaries
+    # =========================
+    internal_dict_series = (
+        df_filtered
+        .groupby(SKILL_GROUP_KEYS)
+        .apply(build_internal_dict)
+        .reset_index(name="internal_num_dict")
+    )
+
+    external_dict_series = (
+        df_filtered
+        .groupby(SKILL_GROUP_KEYS)
+        .apply(build_external_dict)
+        .reset_index(name="external_num_dict")
+    )
+
+    monthly_skill_calls = monthly_skill_calls.merge(
+        internal_dict_series, on=SKILL_GROUP_KEYS, how="left"
+    )
+    monthly_skill_calls = monthly_skill_calls.merge(
+        external_dict_series, on=SKILL_GROUP_KEYS, how="left"
+    )
+
+    monthly_skill_calls["Timeframe"] = (
+        pd.to_datetime(monthly_skill_calls["Timeframe"], errors="coerce")
+        .dt.to_period("M")
+    )
+    return monthly_skill_calls
+
+
+def aggregate_skills(total_calls, options=CALL_TYPE_OPTIONS, single_pass=True,
+                     vectorized_counters=True, dict_columns=True):
+    """Build the per-skill monthly table for every call type option.
+
+    By default every option is derived from one scan of ``total_calls``
+    (see :mod:`phonesystem.skill_aggregation`); ``single_pass=False`` runs
+    the filter-and-group loop once per option, passing
+    ``vectorized_counters`` through to :func:`aggregate_skill_slice`.
+    ``dict_columns=False`` leaves out the value-count dict columns.
+    """
+    if single_pass:
+        return aggregate_skills_single_pass(total_calls, options, dict_columns)
+
+    skill_dfs = {}
+    for option in options:
+        with stage(f"skill slice: {option}", len(total_calls)) as record:
+            df_filtered = filter_call_type(total_calls, option)
+            if df_filtered.empty:
+                skill_dfs[option] = pd.DataFrame()
+                record.rows_out = 0
+                continue
+            monthly_skill_calls = aggregate_skill_slice(df_filtered, vectorized_counters)
+            if not dict_columns:
+                monthly_skill_calls = monthly_skill_calls.drop(columns=list(SKILL_DICT_FIELDS))
+            skill_dfs[option] = monthly_skill_calls
+            record.rows_out = len(monthly_skill_calls)
+    return skill_dfs
+
+
+# =========================
+# Master Contact View
+# =========================
+def build_internal_numbers(group):
+    combined = pd.concat([
+        group.loc[group["call_category"] == "Outbound", "ANI"],
+        group.loc[group["call_category"] != "Outbound", "DNIS"],
+    ])
+    return combined.dropna().unique().tolist()
+
+
+def build_external_numbers(group):
+    combined = pd.concat([
+        group.loc[group["call_category"] == "Outbound", "DNIS"],
+        group.loc[group["call_category"] != "Outbound", "ANI"],
+    ])
+    return combined.dropna().unique().tolist()
+
+
+def build_master_contacts(total_calls, columnar=True):
+    """One row per ``master_contact_id`` with per-leg lists and SLA counts.
+
+    By default the lists are materialized from a :class:`MasterContactLegs`;
+    ``columnar=False`` builds them with the original per-group lambdas.
+    """
+    if total_calls.empty:
+        return pd.DataFrame()
+    if columnar:
+        return MasterContactLegs.from_calls(total_calls).to_frame()
+
+    master_contact_df = (
+        total_calls
+        .groupby("master_contact_id")
+        .agg(
+            # Identifiers
+            contact_id=("contact_id", lambda x: list(x.dropna().unique())),
+
+            # Timing Columns (as lists)
+            PreQueue=("PreQueue", lambda x: list(x.fillna(0))),
+            InQueue=("InQueue", lambda x: list(x.fillna(0))),
+            Agent_Time=("Agent_Time", lambda x: list(x.fillna(0))),
+            ACW_Seconds=("ACW_Seconds", lambda x: list(x.fillna(0))),
+            PostQueue=("PostQueue", lambda x: list(x.fillna(0))),
+
+            # Call Info
+            skill_name=("skill_name", lambda x: list(x.dropna().unique())),
+            team_name=("team_name", lambda x: list(x.dropna().unique())),
+            department=("department", lambda x: list(x.dropna().unique())),
+            agent_name=("agent_name", lambda x: list(x.dropna().unique())),
+            call_category=("call_category", lambda x: list(x.dropna().unique())),
+
+            # SLA Counts
+            sla_missed=("SLA", lambda x: (x == -1).sum()),
+            sla_met=("SLA", lambda x: (x == 0).sum()),
+            sla_exceeded=("SLA", lambda x: (x == 1).sum()),
+
+            # Business Hours
+            business_hours_flag=("Business_Hours", lambda x: int((x == 1).any())),
+            business_hours_list=("Business_Hours", lambda x: list(x.fillna(0))),
+
+            # Dates
+            start_time=("start_time", lambda x: list(x.dt.strftime("%Y-%m-%d %H:%M:%S"))),
+            Timeframe=("Timeframe", "first"),
+
+            # Optional: total customer time per interaction
+            customer_call_time=("customer_call_time", lambda x: list(x.fillna(0))),
+            agent_total_time=('Agent_Work_Time', lambda x: list(x.fillna(0))),
+        )
+        .reset_index()
+    )
+
+    internal_external_df = (
+        total_calls
+        .groupby("master_contact_id")
+        .apply(lambda g: pd.Series({
+            "internal_num_list": build_internal_numbers(g),
+            "external_num_list": build_external_numbers(g),
+        }))
+        .reset_index()
+    )
+
+    master_contact_df = master_contact_df.merge(
+        internal_external_df,
+        on="master_contact_id",
+        how="left"
+    )
+
+    master_contact_df["Timeframe"] = (
+        pd.to_datetime(master_contact_df["Timeframe"], errors="coerce")
+        .dt.to_period("M")
+    )
+    return master_contact_df
+
+
+# =========================
+# Phone Numbers View
+# =========================
+PHONE_COLUMNS = [
+    "master_contact_id", "team_name", "department", "agent_name", "skill_name",
+    "Agent_Work_Time", "customer_call_time", "start_time", "Timeframe",
+]
+
+
+def stack_phone_numbers(total_calls):
+    """Stack internal and external numbers into one ``phone_number`` column.
+
+    Only the columns the phone views read are projected before stacking,
+    and ``internal_external`` is stored as a categorical, so the stacked
+    frame is twice that projection rather than twice the call table.
+    """
+    projected = total_calls[PHONE_COLUMNS]
+    phone_df = pd.concat([projected, projected], ignore_index=True)
+
+    phone_df["phone_number"] = np.concatenate([
+        total_calls["internal_number"].to_numpy(),
+        total_calls["external_number"].to_numpy(),
+    ])
+    phone_df["internal_external"] = pd.Categorical.from_codes(
+        np.repeat(np.array([1, 0], dtype=np.int8), len(total_calls)),
+        categories=["External", "Internal"],
+    )
+
+    return phone_df.dropna(subset=["phone_number"])
+
+
+def aggregate_phone_numbers(phone_df, dict_columns=True):
+    """Monthly usage per stacked phone number.
+
+    ``dict_columns=False`` leaves out the team/department/agent/skill
+    count dicts (see :func:`phonesystem.frequency.phone_value_counts`).
+    """
+    aggregations = dict(contact_count=("master_contact_id", "count"))
+    if dict_columns:
+        aggregations.update(
+            teams_dict=("team_name", lambda x: x.value_counts().to_dict()),
+            departments_dict=("department", lambda x: x.value_counts().to_dict()),
+            agents_dict=("agent_name", lambda x: x.value_counts().to_dict()),
+            skillss_dict=("skill_name", lambda x: x.value_counts().to_dict()),
+        )
+    aggregations.update(
+        total_agent_time=("Agent_Work_Time", "sum"),
+        total_customer_time=("customer_call_time", "sum"),
+
+    )
+
+    grouped = phone_df.groupby(PHONE_COUNT_KEYS, observed=True)
+    phone_numbers_df = grouped.agg(**aggregations).reset_index()
+
+    # Start times per number, formatted once and split by group
+    group_ids = grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    order = np.argsort(group_ids, kind="stable")
+    stamps = format_timestamps(phone_df["start_time"])[order].tolist()
+    bounds = np.searchsorted(group_ids[order], np.arange(len(phone_numbers_df) + 1))
+    phone_numbers_df["call_times_list"] = [stamps[s:e] for s, e in zip(bounds[:-1], bounds[1:])]
+    phone_numbers_df["internal_external"] = phone_numbers_df["internal_external"].astype(str)
+
+    phone_numbers_df["Timeframe"] = (
+        pd.to_datetime(phone_numbers_df["Timeframe"], errors="coerce")
+        .dt.to_period("M")
+    )
+    return phone_numbers_df
+
+
+def build_phone_numbers(total_calls, dict_columns=True):
+    """Monthly usage per internal and external phone number."""
+    if total_calls.empty:
+        return pd.DataFrame()
+    return aggregate_phone_numbers(stack_phone_numbers(total_calls), dict_columns)
+
+
+# =========================
+# Excel Export
+# =========================
+def dated_filename(first_date, last_date, suffix=".xlsx"):
+    """Output name spanning the months of ``first_date`` and ``last_date``."""
+    first_month = first_date.strftime("%b-%Y")
+    last_month = last_date.strftime("%b-%Y")
+    return f"Phone_System_Analysis_{first_month}_to_{last_month}{suffix}"
+
+
+def export_filename(total_calls):
+    """Workbook name spanning the first and last month in the data."""
+    if total_calls.empty:
+        return "Phone_System_Analysis.xlsx"
+    return dated_filename(total_calls["start_date"].min(), total_calls["start_date"].max())
+
+
+def result_sheets(result):
+    """Every view of ``result`` keyed by sheet name, in workbook order."""
+    sheets = {}
+    for option, df in result.team_dfs.items():
+        sheets[f"Team - {option}"] = df
+    sheets.update(result.rollups)
+    for option, df in result.skill_dfs.items():
+        sheets[f"Skill - {option}"] = df
+    sheets.update(result.percentiles)
+
+    sheets["Master_Contacts"] = result.master_contact_frame()
+    sheets["Transfer_Paths"] = result.transfer_paths
+    sheets["Total_Calls"] = result.total_calls_frame()
+    sheets["Spam_Calls"] = result.spam_calls
+    sheets["Phone_Numbers"] = result.phone_numbers
+    sheets["Repeat_Contacts"] = result.repeat_contacts
+    sheets["Interval_Calls"] = result.interval_calls
+    sheets.update(result.value_counts)
+    return sheets
+
+
+def excel_sheets(result):
+    """:func:`result_sheets` with Excel sheet names and placeholder empty sheets."""
+    sheets = {}
+    for sheet_name, df in result_sheets(result).items():
+        # Team and skill sheets are always written, even when empty
+        if sheet_name.startswith(("Team - ", "Skill - ")) and df.empty:
+            df = pd.DataFrame({"No Data": []})
+        sheets[sheet_name[:EXCEL_SHEET_NAME_LENGTH]] = df
+    return sheets
+
+
+def export(result, target):
+    """Write every view of ``result`` to an xlsx path or binary buffer.
+
+    Sheets are streamed row by row (see :mod:`phonesystem.excel`).
+    """
+    sheets = excel_sheets(result)
+    with stage("excel export", sum(len(df) for df in sheets.values())) as record:
+        write_workbook(sheets, target)
+        record.rows_out = record.rows_in
+    return target
+
+
+# =========================
+# Full Run
+# =========================
+def process_calls(source, calendar=DEFAULT_CALENDAR, rules=DEFAULT_RULES):
+    """Load ``source`` and run the per-row stages.
+
+    Returns ``(total_calls, spam_calls)`` with categories, departments,
+    business hours and phone roles added to the non-spam rows.
+    """
+    total_calls, spam_calls = split_spam(load_calls(source))
+    total_calls = classify(total_calls, calendar=calendar, rules=rules)
+    with stage("phone roles", len(total_calls)) as record:
+        total_calls = add_phone_roles(total_calls)
+        record.rows_out = len(total_calls)
+    return total_calls, spam_calls
+
+
+def aggregate_views(total_calls, normalized=False):
+    """The views of ``total_calls`` that are built by grouping its rows.
+
+    Returns ``{PipelineResult field: view}`` for the skill and team
+    slices, rollups, percentiles, phone numbers, interval calls and, with
+    ``normalized=True``, the value-count tables (see :func:`build_result`).
+    """
+    rows = len(total_calls)
+    partials = scan_partials(total_calls)
+    views = {
+        "skill_dfs": aggregate_skills_single_pass(
+            total_calls, dict_columns=not normalized, partials=partials
+        ),
+        "team_dfs": aggregate_teams(partials, dict_columns=not normalized),
+        "rollups": build_rollups(partials),
+        "percentiles": percentile_sheets(total_calls),
+    }
+
+    with stage("phone numbers", rows) as record:
+        views["phone_numbers"] = pd.DataFrame()
+        if not normalized:
+            views["phone_numbers"] = build_phone_numbers(total_calls)
+        elif not total_calls.empty:
+            phone_df = stack_phone_numbers(total_calls)
+            views["phone_numbers"] = aggregate_phone_numbers(phone_df, dict_columns=False)
+        record.rows_out = len(views["phone_numbers"])
+
+    with stage("interval cube", rows) as record:
+        views["interval_calls"] = IntervalCube.from_calls(total_calls).to_frame()
+        record.rows_out = len(views["interval_calls"])
+
+    if normalized and not total_calls.empty:
+        with stage("value counts", rows) as record:
+            views["value_counts"] = {
+                "Skill_Value_Counts": skill_value_counts(total_calls),
+                "Phone_Value_Counts": phone_value_counts(phone_df),
+            }
+            record.rows_out = sum(len(counts) for counts in views["value_counts"].values())
+    return views
+
+
+def build_result(total_calls, spam_calls, normalized=False, compact=True, adjacent_calls=None,
+                 views=None):
+    """Build every dashboard view from processed calls.
+
+    With ``normalized=True`` the value-count dict columns are replaced by
+    the tidy ``Skill_Value_Counts`` and ``Phone_Value_Counts`` tables in
+    ``result.value_counts``. With ``compact=True`` the columns no view
+    reads are compacted in place first (see
+    :func:`~phonesystem.dtypes.compact_carried`), and the rest of the
+    retained call table and the master contact legs once the views are
+    built; ``result.memory_report`` compares the table before and after.
+    The call table's ids and phone numbers are then integer codes; exports
+    go through :meth:`PipelineResult.total_calls_frame`.
+    ``adjacent_calls`` are processed calls from just outside
+    ``total_calls`` (e.g. the neighbouring stored months), so repeat
+    contacts are also found across its first and last days. ``views``
+    are already built :func:`aggregate_views` of ``total_calls`` (e.g.
+    re-summed from stored months); only the row-level views are built then.
+    """
+    rows = len(total_calls)
+    compact = compact and not total_calls.empty
+    if compact:
+        with stage("compact carried columns", rows) as record:
+            loaded_memory = column_memory(total_calls)
+            compact_carried(total_calls)
+            record.rows_out = rows
+    if views is None:
+        views = aggregate_views(total_calls, normalized)
+    result = PipelineResult(total_calls=total_calls, spam_calls=spam_calls, **views)
+    if not total_calls.empty:
+        with stage("master contacts", rows) as record:
+            result.master_legs = MasterContactLegs.from_calls(total_calls)
+            record.rows_out = len(result.master_legs)
+        with stage("transfer paths", len(result.master_legs)) as record:
+            result.transfer_paths = result.master_legs.transfer_paths()
+            record.rows_out = len(result.transfer_paths)
+        with stage("repeat contacts", rows) as record:
+            adjacent = None
+            if adjacent_calls is not None and not adjacent_calls.empty:
+                adjacent = RepeatIndex.from_calls(adjacent_calls)
+            result.repeat_contacts = RepeatIndex.from_calls(total_calls).rates(adjacent=adjacent)
+            record.rows_out = len(result.repeat_contacts)
+
+    if compact:
+        with stage("compact dtypes", rows) as record:
+            result.labels = LabelTable()
+            result.total_calls = compact_calls(total_calls, labels=result.labels)
+            result.memory_report = memory_report(loaded_memory, result.total_calls, result.labels)
+            result.master_legs.legs = compact_calls(result.master_legs.legs)
+            record.rows_out = rows
+    return result
+
+
+def run_pipeline(source, calendar=DEFAULT_CALENDAR, normalized=False, rules=DEFAULT_RULES):
+    """Load ``source`` and build every dashboard view (see :func:`build_result`)."""
+    total_calls, spam_calls = process_calls(source, calendar=calendar, rules=rules)
+    result = build_result(total_calls, spam_calls, normalized=normalized)
+    result.coerced_start_times = total_calls.attrs.get("coerced_start_times", 0)
+    return result
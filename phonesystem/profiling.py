@@ -0,0 +1,173 @@
+"""Stage-level timing and memory instrumentation.
+
+Pipeline stages wrap their work in :func:`stage`. Outside a profiling run
+that is a no-op; inside ``StageProfiler.activate()`` every stage records
+wall time, rows in and out and the process's resident set high-water mark
+when it ended, with how much the stage raised it. The mark comes from
+``getrusage`` and costs nothing during the stage, but it only ever rises
+and is not available on Windows. ``trace_memory`` adds the peak traced
+allocation of each stage, which is exact but slows allocation-heavy
+stages. Tracing is global to the process, so traced runs take a
+process-wide lock and run one at a time; allocations of other threads
+running meanwhile (e.g. another dashboard session) still count towards
+their peaks::
+
+    profiler = StageProfiler()
+    with profiler.activate():
+        result = run_pipeline("export.xlsx")
+    profiler.to_frame()
+    profiler.write_jsonl("phonesystem_profile.jsonl")
+"""
+
+import contextlib
+import contextvars
+import json
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+_ACTIVE = contextvars.ContextVar("phonesystem_profiler", default=None)
+
+# Held by a traced run, so no other run starts, stops or resets tracing under it
+_TRACING = threading.RLock()
+
+
+@dataclass
+class StageRecord:
+    stage: str
+    seconds: float = 0.0
+    rows_in: int = None
+    rows_out: int = None
+    peak_bytes: int = None
+    max_rss_bytes: int = None
+    rss_growth_bytes: int = None
+
+
+def max_rss():
+    """Peak resident set size of this process so far in bytes, or None."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageProfiler:
+    """Collects :class:`StageRecord` entries for one processing run."""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.records = []
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self._open = []
+
+    @contextlib.contextmanager
+    def activate(self):
+        """Route :func:`stage` calls in this context to this profiler.
+
+        With ``trace_memory`` this waits for any other traced run to finish.
+        """
+        with _TRACING if self.trace_memory else contextlib.nullcontext():
+            started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            token = _ACTIVE.set(self)
+            try:
+                yield self
+            finally:
+                _ACTIVE.reset(token)
+                if started_tracing:
+                    tracemalloc.stop()
+
+    def _peak(self):
+        return tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        record = StageRecord(stage=name, rows_in=rows_in)
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            # The enclosing stage keeps the peak seen so far before it is reset
+            if self._open:
+                parent = self._open[-1]
+                parent.peak_bytes = max(parent.peak_bytes or 0, self._peak())
+            tracemalloc.reset_peak()
+            record.peak_bytes = 0
+        self._open.append(record)
+        self.records.append(record)
+        rss_before = max_rss()
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - started
+            record.max_rss_bytes = max_rss()
+            if rss_before is not None:
+                record.rss_growth_bytes = record.max_rss_bytes - rss_before
+            self._open.pop()
+            if tracing:
+                record.peak_bytes = max(record.peak_bytes, self._peak())
+                if self._open:
+                    parent = self._open[-1]
+                    parent.peak_bytes = max(parent.peak_bytes or 0, record.peak_bytes)
+
+    def to_frame(self):
+        """One row per stage name in first-run order; repeated stages are summed."""
+        if not self.records:
+            return pd.DataFrame(columns=[
+                "stage", "runs", "seconds", "rows_in", "rows_out",
+                "max_rss_mb", "rss_growth_mb", "peak_mb",
+            ])
+        frame = pd.DataFrame([asdict(record) for record in self.records])
+        summary = (
+            frame
+            .groupby("stage", sort=False)
+            .agg(
+                runs=("stage", "size"),
+                seconds=("seconds", "sum"),
+                rows_in=("rows_in", lambda rows: rows.sum(min_count=1)),
+                rows_out=("rows_out", lambda rows: rows.sum(min_count=1)),
+                max_rss_bytes=("max_rss_bytes", "max"),
+                rss_growth_bytes=("rss_growth_bytes", lambda growth: growth.sum(min_count=1)),
+                peak_bytes=("peak_bytes", "max"),
+            )
+            .reset_index()
+        )
+        summary["seconds"] = summary["seconds"].round(4)
+        for column in ["max_rss", "rss_growth", "peak"]:
+            summary[f"{column}_mb"] = (summary.pop(f"{column}_bytes") / 1e6).round(1)
+        return summary
+
+    def write_jsonl(self, path, **context):
+        """Append one JSON line per recorded stage run to ``path``."""
+        with open(path, "a") as handle:
+            for record in self.records:
+                line = {"run": self.run_id, "started": self.started, **context, **asdict(record)}
+                handle.write(json.dumps(line, default=str) + "\n")
+        return path
+
+
+def active_profiler():
+    """The profiler of the current context, or None."""
+    return _ACTIVE.get()
+
+
+def stage(name, rows_in=None):
+    """Context manager timing a pipeline stage when a profiler is active."""
+    profiler = _ACTIVE.get()
+    if profiler is None:
+        return contextlib.nullcontext(StageRecord(stage=name, rows_in=rows_in))
+    return profiler.stage(name, rows_in)
@@ -0,0 +1,236 @@
+"""Ad-hoc SQL over processed data with an embedded DuckDB engine.
+
+The dashboard tabs show whole sheets; a new cut (agent x campaign for one
+department, say) is a query against ``QUERY_TABLES`` instead of a code
+change::
+
+    engine = QueryEngine.from_bundle("Phone_System_Analysis_Jan-2024_to_Mar-2024.parquet.zip")
+    engine.select(department="Sales", business_hours_only=True)
+    engine.query("SELECT agent_name, campaign_name, count(*) AS calls FROM Total_Calls GROUP BY ALL")
+
+DuckDB runs in-process and is optional (``pip install duckdb``);
+:func:`duckdb_available` tells whether it is installed. Bundle tables and
+month store partitions are scanned as Parquet files where they lie, so a
+query over years of stored calls streams through them rather than loading
+them, and spills to ``QUERY_TEMP_DIRECTORY`` past ``QUERY_MEMORY_LIMIT``.
+Sheets already in memory (an uploaded workbook) are registered as Arrow
+tables.
+
+Every table is a view over its source; :meth:`QueryEngine.select`
+redefines the views with the department and business-hours predicates of
+:class:`~phonesystem.filters.FilterIndex`, which DuckDB pushes down into
+the scans.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from dataclasses import dataclass
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from phonesystem.bundle import MANIFEST as BUNDLE_MANIFEST, to_table
+from phonesystem.config import (
+    QUERY_MEMORY_LIMIT,
+    QUERY_TEMP_DIRECTORY,
+    SAVED_QUERIES,
+    SAVED_QUERIES_PATH,
+)
+from phonesystem.filters import MASTER_SHEET, parse_list_cell
+
+
+QUERY_TABLES = ["Total_Calls", "Master_Contacts", "Phone_Numbers"]
+
+# Business-hours flag of each table; Phone_Numbers has none
+BUSINESS_HOURS_FLAGS = {"Total_Calls": "Business_Hours", MASTER_SHEET: "business_hours_flag"}
+
+
+def duckdb_available():
+    """True when the optional ``duckdb`` package can be imported."""
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _duckdb():
+    try:
+        import duckdb
+    except ImportError as error:
+        raise ImportError("The query engine needs DuckDB: pip install duckdb") from error
+    return duckdb
+
+
+def quote_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def quote_identifier(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _is_period(arrow_type):
+    # pandas Period columns (monthly Timeframe) arrive as int64 month ordinals
+    return isinstance(arrow_type, pa.ExtensionType) and arrow_type.extension_name == "pandas.period"
+
+
+def _is_list(arrow_type):
+    return pa.types.is_list(arrow_type) or pa.types.is_large_list(arrow_type)
+
+
+@dataclass
+class QueryEngine:
+    """DuckDB connection with one view per table in ``sources``.
+
+    ``sources`` maps a table name to the SQL relation it reads (a
+    registered Arrow table or a ``read_parquet`` scan) and ``schemas`` to
+    its Arrow schema. ``workdir`` holds extracted bundle files and is
+    removed by :meth:`close`.
+    """
+
+    connection: object
+    sources: dict
+    schemas: dict
+    workdir: str = None
+    department: str = "All"
+    business_hours_only: bool = False
+
+    @staticmethod
+    def connect(memory_limit=QUERY_MEMORY_LIMIT, temp_directory=QUERY_TEMP_DIRECTORY):
+        """In-process connection that spills to ``temp_directory`` past ``memory_limit``."""
+        return _duckdb().connect(config={
+            "memory_limit": memory_limit,
+            "temp_directory": temp_directory,
+            # Lets large aggregations and sorts run out of core
+            "preserve_insertion_order": False,
+        })
+
+    @classmethod
+    def from_sheets(cls, sheets, **config):
+        """Engine over in-memory sheets, e.g. a processed workbook."""
+        connection = cls.connect(**config)
+        sources, schemas = {}, {}
+        for name in QUERY_TABLES:
+            df = sheets.get(name)
+            if df is None or df.empty:
+                continue
+            if name == MASTER_SHEET and "department" in df and df["department"].map(type).eq(str).any():
+                # Workbooks hold the department lists as text
+                df = df.assign(department=df["department"].map(parse_list_cell))
+            table = to_table(df)
+            source = f"{name}_data"
+            connection.register(source, table)
+            sources[name] = quote_identifier(source)
+            schemas[name] = table.schema
+        return cls(connection=connection, sources=sources, schemas=schemas).select()
+
+    @classmethod
+    def from_parquet(cls, files, workdir=None, **config):
+        """Engine over ``{table: [Parquet paths]}``, scanned in place."""
+        sources, schemas = {}, {}
+        for name, paths in files.items():
+            paths = [path for path in paths if os.path.exists(path)]
+            if not paths:
+                continue
+            listed = ", ".join(quote_literal(path) for path in paths)
+            sources[name] = f"read_parquet([{listed}], union_by_name = true)"
+            schemas[name] = pq.read_schema(paths[0])
+        engine = cls(connection=cls.connect(**config), sources=sources, schemas=schemas, workdir=workdir)
+        return engine.select()
+
+    @classmethod
+    def from_bundle(cls, source, **config):
+        """Engine over the query tables of a processed bundle (path or file object)."""
+        workdir = tempfile.mkdtemp(prefix="phonesystem-query-")
+        files = {}
+        with zipfile.ZipFile(source) as bundle:
+            manifest = json.loads(bundle.read(BUNDLE_MANIFEST))
+            for entry in manifest["sheets"]:
+                if entry["name"] in QUERY_TABLES:
+                    files[entry["name"]] = [bundle.extract(entry["file"], workdir)]
+        return cls.from_parquet(files, workdir=workdir, **config)
+
+    @classmethod
+    def from_store(cls, store, months=None, **config):
+        """Engine over the stored calls of ``months`` (default: all) of a :class:`MonthStore`."""
+        return cls.from_parquet({"Total_Calls": store.partition_files(months)}, **config)
+
+    def select(self, department="All", business_hours_only=False):
+        """Redefine the views for one department and business-hours selection."""
+        for name, source in self.sources.items():
+            schema = self.schemas[name]
+            predicates = []
+            if department != "All" and "department" in schema.names:
+                if _is_list(schema.field("department").type):
+                    predicates.append(f"list_contains(department, {quote_literal(department)})")
+                else:
+                    predicates.append(f"department = {quote_literal(department)}")
+            flag = BUSINESS_HOURS_FLAGS.get(name)
+            if business_hours_only and flag in schema.names:
+                predicates.append(f"{quote_identifier(flag)} = 1")
+
+            periods = [field.name for field in schema if _is_period(field.type)]
+            columns = "*"
+            if periods:
+                replaced = ", ".join(
+                    f"make_date(1970 + {column} // 12, {column} % 12 + 1, 1) AS {column}"
+                    for column in map(quote_identifier, periods)
+                )
+                columns = f"* REPLACE ({replaced})"
+            where = f" WHERE {' AND '.join(predicates)}" if predicates else ""
+            self.connection.execute(
+                f"CREATE OR REPLACE VIEW {quote_identifier(name)} AS SELECT {columns} FROM {source}{where}"
+            )
+        self.department = department
+        self.business_hours_only = business_hours_only
+        return self
+
+    def tables(self):
+        """Names of the queryable tables."""
+        return list(self.sources)
+
+    def describe(self, name):
+        """Column names and DuckDB types of table ``name``."""
+        return self.connection.execute(f"DESCRIBE {quote_identifier(name)}").df()
+
+    def query(self, sql):
+        """Run ``sql`` against the views and return the result as a DataFrame."""
+        try:
+            return self.connection.execute(sql).df()
+        except _duckdb().Error as error:
+            raise ValueError(str(error)) from error
+
+    def close(self):
+        self.connection.close()
+        if self.workdir is not None:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+# =========================
+# Saved Queries
+# =========================
+def load_saved_queries(path=SAVED_QUERIES_PATH):
+    """Built-in ``SAVED_QUERIES`` followed by the queries saved to ``path``."""
+    queries = dict(SAVED_QUERIES)
+    if os.path.exists(path):
+        with open(path) as handle:
+            queries.update(json.load(handle))
+    return queries
+
+
+def save_query(name, sql, path=SAVED_QUERIES_PATH):
+    """Add or replace query ``name`` in the saved-query file."""
+    saved = {}
+    if os.path.exists(path):
+        with open(path) as handle:
+            saved = json.load(handle)
+    saved[name] = sql
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as handle:
+        json.dump(saved, handle, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,150 @@
+"""Repeat contacts: callers who call back within a day, three days or a week.
+
+:class:`RepeatIndex` holds one row per inbound master contact (its first
+leg; transfers within a contact are not repeats), sorted by external
+number and start time. Each contact's distance to the next and previous
+contact of the same number is then one ``diff`` over the sorted times, and
+a contact counts as repeated within a ``REPEAT_WINDOWS`` window when the
+next contact starts inside it::
+
+    index = RepeatIndex.from_calls(total_calls)
+    index.rates(adjacent=RepeatIndex.from_calls(next_month_calls))
+
+Calls outside the selection (the stored months around it, see
+:meth:`~phonesystem.store.MonthStore.result`) are matched with
+``merge_asof``, so windows that cross the edge of the selection are not
+cut short.
+
+The ``Repeat_Contacts`` sheet counts contacts, repeated contacts (the
+caller came back after this contact) and callbacks (this contact came
+within the window of an earlier one) per skill, business-hours flag and
+month; :func:`repeat_rates` re-sums it for coarser groupings.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from phonesystem.config import REPEAT_WINDOWS, ROLLUP_LEVELS
+
+
+REPEAT_KEYS = ROLLUP_LEVELS["Skill"] + ["Business_Hours"]
+
+INDEX_COLUMNS = ["external_number", "start_time", "master_contact_id"] + REPEAT_KEYS + ["Timeframe"]
+
+# Columns of the call table the index is built from
+INPUT_COLUMNS = INDEX_COLUMNS + ["call_category"]
+
+MICROS_PER_HOUR = 3_600_000_000
+
+# Gap of a contact with no other contact of its number
+NO_CONTACT = np.iinfo(np.int64).max
+
+
+def repeat_columns(windows=REPEAT_WINDOWS):
+    """Count columns of the ``Repeat_Contacts`` sheet, in sheet order."""
+    return ["contacts"] + [
+        f"{kind}_{label}" for kind in ("repeat_contacts", "callbacks") for label in windows
+    ]
+
+
+def repeat_rates(table, keys, windows=REPEAT_WINDOWS):
+    """Counts of ``table`` re-summed per ``keys``, with a repeat rate per window."""
+    columns = repeat_columns(windows)
+    rates = table.groupby(keys, sort=True, dropna=False)[columns].sum().reset_index()
+    for label in windows:
+        rates[f"repeat_rate_{label}"] = rates[f"repeat_contacts_{label}"] / rates["contacts"]
+    return rates
+
+
+@dataclass
+class RepeatIndex:
+    """Inbound contacts sorted by external number, then start time.
+
+    ``contacts`` has the ``INDEX_COLUMNS``; ``number`` (factorized
+    external numbers) and ``time`` (start times in microseconds) are the
+    sort keys, aligned with its rows.
+    """
+
+    contacts: pd.DataFrame
+    number: np.ndarray
+    time: np.ndarray
+
+    @classmethod
+    def from_calls(cls, total_calls):
+        inbound = (
+            (total_calls["call_category"] != "Outbound").to_numpy()
+            & total_calls["external_number"].notna().to_numpy()
+            & total_calls["start_time"].notna().to_numpy()
+        )
+        calls = total_calls.loc[inbound, INDEX_COLUMNS]
+        number, _ = pd.factorize(calls["external_number"])
+        time = calls["start_time"].to_numpy(dtype="datetime64[us]").astype(np.int64)
+        order = np.lexsort((time, number))
+
+        # Legs of one master contact count once, at the first leg of its number
+        master, masters = pd.factorize(calls["master_contact_id"])
+        key = number[order] * max(len(masters), 1) + master[order]
+        order = order[~pd.Series(key).duplicated().to_numpy()]
+        return cls(
+            contacts=calls.iloc[order].reset_index(drop=True),
+            number=number[order],
+            time=time[order],
+        )
+
+    def __len__(self):
+        return len(self.contacts)
+
+    def gaps(self, adjacent=None):
+        """Microseconds to the next and since the previous contact of the same number.
+
+        ``NO_CONTACT`` where there is none. ``adjacent`` is an index of
+        calls outside this one, searched with ``merge_asof``.
+        """
+        same = self.number[1:] == self.number[:-1]
+        step = np.where(same, np.diff(self.time), NO_CONTACT)
+        following = np.append(step, NO_CONTACT)
+        preceding = np.insert(step, 0, NO_CONTACT)
+        if adjacent is not None and len(adjacent) and len(self):
+            following = np.minimum(following, self._adjacent_gaps(adjacent, "forward"))
+            preceding = np.minimum(preceding, self._adjacent_gaps(adjacent, "backward"))
+        return following, preceding
+
+    def _adjacent_gaps(self, adjacent, direction):
+        # A master contact split across the edge is not a repeat of itself
+        own = adjacent.contacts["master_contact_id"].isin(self.contacts["master_contact_id"]).to_numpy()
+        # One set of number codes for both sides, whatever dtype each was stored with
+        numbers, _ = pd.factorize(np.concatenate([
+            self.contacts["external_number"].to_numpy(),
+            adjacent.contacts["external_number"].to_numpy(),
+        ]))
+        left = pd.DataFrame({
+            "number": numbers[:len(self)],
+            "time": self.time,
+        }).sort_values("time", kind="stable")
+        right = pd.DataFrame({
+            "number": numbers[len(self):][~own],
+            "time": adjacent.time[~own],
+            "matched": adjacent.time[~own],
+        }).sort_values("time", kind="stable")
+        matched = pd.merge_asof(left, right, on="time", by="number", direction=direction)
+        gaps = np.full(len(self), NO_CONTACT, dtype=np.int64)
+        found = matched["matched"].notna().to_numpy()
+        distance = np.abs(matched["matched"].to_numpy(dtype=np.float64) - matched["time"].to_numpy())
+        gaps[left.index.to_numpy()[found]] = distance[found].astype(np.int64)
+        return gaps
+
+    def rates(self, windows=REPEAT_WINDOWS, adjacent=None):
+        """The ``Repeat_Contacts`` sheet: counts and rates per skill, business hours and month."""
+        following, preceding = self.gaps(adjacent)
+        frame = self.contacts[REPEAT_KEYS].assign(
+            Timeframe=pd.to_datetime(self.contacts["Timeframe"], errors="coerce").dt.to_period("M"),
+            contacts=1,
+        )
+        for label, hours in windows.items():
+            limit = hours * MICROS_PER_HOUR
+            frame[f"repeat_contacts_{label}"] = (following <= limit).astype(np.int64)
+            frame[f"callbacks_{label}"] = (preceding <= limit).astype(np.int64)
+        rates = repeat_rates(frame, ["Timeframe"] + REPEAT_KEYS, windows)
+        return rates[REPEAT_KEYS + ["Timeframe"] + list(rates.columns[len(REPEAT_KEYS) + 1:])]
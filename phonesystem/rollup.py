@@ -0,0 +1,142 @@
+"""Hierarchical rollups of the skill partials.
+
+:class:`RollupCube` keeps the finest-grain additive aggregate of the call
+table, one row per skill, team, department, month, call category and
+business-hours flag (the ``fine`` table of
+:class:`~phonesystem.skill_aggregation.SkillPartials`), together with the
+agents seen on each row. Every level of the skill -> team -> department ->
+company hierarchy, by month, quarter or year, is derived from it by
+re-summing the counters, without another scan of ``total_calls``::
+
+    cube = RollupCube.from_partials(partials)
+    cube.rollup("Department", "Quarter")
+
+``unique_agents_count`` is not additive, so each cube row carries its set
+of agent codes: a distinct-count sketch that is exact at this size (a few
+hundred agents a month) and merges by union, across levels and periods as
+well as across cubes from separate chunks (:meth:`RollupCube.merge`).
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from phonesystem.config import ROLLUP_LEVELS, ROLLUP_PERIODS, ROLLUP_SHEET_LEVELS
+from phonesystem.profiling import stage
+from phonesystem.skill_aggregation import (
+    CATEGORY_COLUMNS,
+    COUNTER_COLUMNS,
+    FINE_KEYS,
+    LEADING_COLUMNS,
+    VALUE_FIELDS,
+    slice_mask,
+)
+
+
+AGENT_FIELD = VALUE_FIELDS.index("agent_name")
+
+
+@dataclass
+class RollupCube:
+    """Finest-grain counters plus the agent codes seen per row.
+
+    ``fine`` has the ``FINE_KEYS`` (``Timeframe`` as a monthly period) and
+    the counter columns; ``agents`` holds one ``(fine_id, code)`` row per
+    agent of a fine row, with ``agent_names`` as the labels of the codes.
+    """
+
+    fine: pd.DataFrame
+    agents: pd.DataFrame
+    agent_names: np.ndarray
+
+    @classmethod
+    def from_partials(cls, partials):
+        fine = partials.fine[FINE_KEYS + COUNTER_COLUMNS].copy()
+        fine["Timeframe"] = pd.to_datetime(fine["Timeframe"], errors="coerce").dt.to_period("M")
+        values = partials.values
+        agents = values.loc[values["field"] == AGENT_FIELD, ["fine_id", "code"]].reset_index(drop=True)
+        return cls(
+            fine=fine, agents=agents,
+            agent_names=np.asarray(partials.uniques["agent_name"], dtype=object),
+        )
+
+    @classmethod
+    def merge(cls, parts):
+        """Combine cubes of disjoint sets of calls; rows are stacked, not re-grouped."""
+        parts = [part for part in parts if part is not None]
+        if len(parts) == 1:
+            return parts[0]
+
+        offsets = np.cumsum([0] + [len(part.fine) for part in parts])
+        names = np.concatenate([part.agent_names[part.agents["code"].to_numpy()] for part in parts])
+        codes, agent_names = pd.factorize(names)
+        agents = pd.DataFrame({
+            "fine_id": np.concatenate([
+                part.agents["fine_id"].to_numpy() + offset for part, offset in zip(parts, offsets)
+            ]),
+            "code": codes,
+        })
+        return cls(
+            fine=pd.concat([part.fine for part in parts], ignore_index=True),
+            agents=agents,
+            agent_names=np.asarray(agent_names, dtype=object),
+        )
+
+    def rollup(self, level="Company", period="Month", option="All Calls"):
+        """Totals of one call type ``option`` per ``level`` (see ``ROLLUP_LEVELS``) and ``period``."""
+        keys = ROLLUP_LEVELS[level]
+        mask = slice_mask(self.fine, option)
+        if not mask.any():
+            return pd.DataFrame()
+
+        fine = self.fine.loc[mask]
+        frame = fine[keys].assign(Timeframe=fine["Timeframe"].dt.asfreq(ROLLUP_PERIODS[period]))
+        group_id = frame.groupby(["Timeframe"] + keys, sort=True, dropna=False).ngroup().to_numpy()
+        totals = fine[COUNTER_COLUMNS].groupby(group_id).sum()
+        group_keys = (
+            frame.assign(group_id=group_id)
+            .drop_duplicates("group_id")
+            .set_index("group_id")
+            .sort_index()
+        )
+
+        # Union of the agent sets of every fine row in a group
+        fine_group = np.full(len(self.fine), -1, dtype=np.int64)
+        fine_group[mask] = group_id
+        agent_group = fine_group[self.agents["fine_id"].to_numpy()]
+        agents = pd.DataFrame({"group_id": agent_group, "code": self.agents["code"].to_numpy()})
+        agents = agents.loc[agent_group >= 0].drop_duplicates()
+
+        def distinct(groups):
+            return groups.groupby("group_id").size().reindex(totals.index, fill_value=0).to_numpy()
+
+        rolled = pd.concat([
+            group_keys[keys + ["Timeframe"]].reset_index(drop=True),
+            totals[LEADING_COLUMNS].reset_index(drop=True),
+        ], axis=1)
+        rolled["unique_agents_count"] = distinct(agents).astype(np.int64)
+        for column, name in (("team_name", "unique_teams_count"), ("skill_name", "unique_skills_count")):
+            labels = pd.DataFrame({"group_id": group_id, column: fine[column].to_numpy()})
+            rolled[name] = distinct(labels.drop_duplicates()).astype(np.int64)
+        for out_col in CATEGORY_COLUMNS:
+            rolled[out_col] = totals[out_col].to_numpy()
+        return rolled
+
+
+def build_rollups(partials, levels=ROLLUP_SHEET_LEVELS, periods=ROLLUP_PERIODS):
+    """``{"Rollup - <level> - <period>": frame}`` of all calls from :class:`SkillPartials`."""
+    if partials is None:
+        return {}
+    return rollup_sheets(RollupCube.from_partials(partials), levels, periods)
+
+
+def rollup_sheets(cube, levels=ROLLUP_SHEET_LEVELS, periods=ROLLUP_PERIODS):
+    """``{"Rollup - <level> - <period>": frame}`` of a :class:`RollupCube`."""
+    with stage("rollups", len(cube.fine)) as record:
+        rollups = {
+            f"Rollup - {level} - {period}": cube.rollup(level, period)
+            for level in levels for period in periods
+        }
+        record.rows_out = sum(len(df) for df in rollups.values())
+    return rollups
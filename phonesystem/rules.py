@@ -0,0 +1,131 @@
+"""Skill and team classification rules.
+
+Call categories come from regex patterns over skill names and departments
+from a team mapping. Both can be loaded from a JSON file so they can
+change without a code edit::
+
+    {
+      "version": "2024-06",
+      "categories": [["After Hours", "\\\\bafterhours\\\\b"], ...],
+      "default_category": "Other",
+      "team_to_dept": {"Billing": "Billing and Collections", ...},
+      "default_department": "Other"
+    }
+
+Skill names are factorized and each distinct skill is classified once per
+rules version; the resulting skill -> category table is kept for later
+runs and chunks, so categorization costs O(distinct skills).
+"""
+
+import functools
+import json
+import os
+import re
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from phonesystem.config import (
+    CATEGORY_RULES,
+    DEFAULT_CATEGORY,
+    DEFAULT_DEPARTMENT,
+    TEAM_TO_DEPT,
+)
+
+
+# Environment variable naming a rules file for the dashboard and CLI
+RULES_ENV = "PHONESYSTEM_RULES"
+
+# Rules key -> {skill name: category}
+_SKILL_CATEGORIES = {}
+
+
+@dataclass
+class ClassificationRules:
+    """Ordered ``(category, pattern)`` rules plus the team -> department map."""
+
+    categories: list = field(default_factory=lambda: list(CATEGORY_RULES))
+    team_to_dept: dict = field(default_factory=lambda: dict(TEAM_TO_DEPT))
+    default_category: str = DEFAULT_CATEGORY
+    default_department: str = DEFAULT_DEPARTMENT
+    version: str = "builtin"
+
+    @property
+    def key(self):
+        """Identity of the category rules, used to share memoized tables."""
+        categories = tuple((label, pattern) for label, pattern in self.categories)
+        return self.version, categories, self.default_category
+
+    def _classify_distinct(self, skills):
+        skill_clean = pd.Series(skills, dtype=object).astype(str).str.lower().str.replace(" ", "", regex=False)
+        return np.select(
+            [skill_clean.str.contains(_compiled(pattern), na=False) for _, pattern in self.categories],
+            [label for label, _ in self.categories],
+            default=self.default_category
+        ).tolist()
+
+    def categorize(self, skill_name):
+        """Category label per row of ``skill_name``."""
+        codes, skills = pd.factorize(skill_name)
+        table = _SKILL_CATEGORIES.setdefault(self.key, {})
+        unseen = [skill for skill in skills if skill not in table]
+        if unseen:
+            table.update(zip(unseen, self._classify_distinct(unseen)))
+        # Missing skill names (code -1) take the last entry: the default
+        labels = np.array([table[skill] for skill in skills] + [self.default_category], dtype=object)
+        return labels[codes]
+
+    def departments(self, team_name):
+        """Department per row of ``team_name``."""
+        return team_name.map(self.team_to_dept).fillna(self.default_department)
+
+    def to_dict(self):
+        return {
+            "version": self.version,
+            "categories": [list(rule) for rule in self.categories],
+            "default_category": self.default_category,
+            "team_to_dept": dict(self.team_to_dept),
+            "default_department": self.default_department,
+        }
+
+
+DEFAULT_RULES = ClassificationRules()
+
+
+@functools.lru_cache(maxsize=None)
+def _compiled(pattern):
+    return re.compile(pattern)
+
+
+@functools.lru_cache(maxsize=16)
+def _load_rules(path, mtime_ns):
+    with open(path) as handle:
+        config = json.load(handle)
+    defaults = ClassificationRules()
+    return ClassificationRules(
+        categories=[tuple(rule) for rule in config.get("categories", defaults.categories)],
+        team_to_dept=config.get("team_to_dept", defaults.team_to_dept),
+        default_category=config.get("default_category", defaults.default_category),
+        default_department=config.get("default_department", defaults.default_department),
+        version=str(config.get("version", mtime_ns)),
+    )
+
+
+def load_rules(path):
+    """Rules from a JSON file, re-read only when the file changes."""
+    path = os.path.abspath(path)
+    return _load_rules(path, os.stat(path).st_mtime_ns)
+
+
+def save_rules(rules, path):
+    """Write ``rules`` as a JSON file that :func:`load_rules` reads back."""
+    with open(path, "w") as handle:
+        json.dump(rules.to_dict(), handle, indent=2)
+    return path
+
+
+def default_rules():
+    """Rules named by ``$PHONESYSTEM_RULES``, or the built-in rules."""
+    path = os.environ.get(RULES_ENV)
+    return load_rules(path) if path else DEFAULT_RULES
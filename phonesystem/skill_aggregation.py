@@ -0,0 +1,426 @@
+"""Single-pass skill and team aggregation.
+
+``total_calls`` is grouped once at the finest grain the call type slices
+need (skill, department, team, month, category, business hours) into
+additive counters, and once more over a stacked frame of the
+distinct-value columns (agents, campaigns, internal and external numbers).
+Every ``CALL_TYPE_OPTIONS`` slice, per skill or per team, is then derived
+by re-summing those partials, which are orders of magnitude smaller than
+the call table.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from phonesystem.config import CALL_TYPE_OPTIONS, SKILL_GROUP_KEYS, TEAM_GROUP_KEYS
+from phonesystem.profiling import stage
+
+
+FINE_KEYS = SKILL_GROUP_KEYS + ["call_category", "Business_Hours"]
+
+SUM_COLUMNS = {
+    "total_customer_call_time": "customer_call_time",
+    "prequeue_time": "PreQueue",
+    "inqueue_time": "InQueue",
+    "agent_time": "Agent_Time",
+    "postqueue_time": "PostQueue",
+    "acw_time": "ACW_Seconds",
+    "agent_total_time": "Agent_Work_Time",
+    "abandon_time": "Abandon_Time",
+}
+
+SLA_COLUMNS = {"sla_missed": -1, "sla_met": 0, "sla_exceeded": 1}
+
+CATEGORY_COLUMNS = {
+    "inbound_calls": "Inbound",
+    "outbound_calls": "Outbound",
+    "voicemail_calls": "Voicemail",
+    "afterhours_calls": "After Hours",
+    "noagent_calls": "No Agent",
+    "other_calls": "Other",
+}
+
+HOURS_COLUMNS = ["business_hours_calls", "after_hours_calls"]
+
+VALUE_FIELDS = ("agent_name", "campaign_name", "internal_number", "external_number")
+
+LEADING_COLUMNS = ["call_volume"] + list(SUM_COLUMNS) + list(SLA_COLUMNS) + HOURS_COLUMNS
+
+COUNTER_COLUMNS = LEADING_COLUMNS + list(CATEGORY_COLUMNS)
+
+
+def parse_call_type(option):
+    """Split a call type option into ``(category or None, business_hours_only)``."""
+    business_hours_only = option.endswith("Business Hours")
+    base = option.replace(" Business Hours", "") if business_hours_only else option
+    return (None if base == "All Calls" else base), business_hours_only
+
+
+def indicator_columns(calls):
+    """One-hot SLA, business-hours and category counters as int64 columns.
+
+    Summing these with a native groupby ``sum`` reproduces the per-group
+    ``(x == value).sum()`` counts without calling Python once per group.
+    """
+    indicators = {name: calls["SLA"] == level for name, level in SLA_COLUMNS.items()}
+    indicators["business_hours_calls"] = calls["Business_Hours"] == 1
+    indicators["after_hours_calls"] = calls["Business_Hours"] == 0
+    for name, category in CATEGORY_COLUMNS.items():
+        indicators[name] = calls["call_category"] == category
+    return pd.DataFrame(indicators, index=calls.index).astype(np.int64)
+
+
+@dataclass
+class SkillPartials:
+    """Fine-grained additive partials for every call type slice.
+
+    ``fine`` holds one row per ``FINE_KEYS`` combination with counter
+    columns. ``values`` holds one row per (fine group, field, value code)
+    with the occurrence ``count`` and the smallest ``first`` ordering key,
+    and ``uniques`` maps each field to the labels its codes index into.
+    Partials built from separate chunks of calls combine with :meth:`merge`.
+    """
+
+    fine: pd.DataFrame
+    skill_id: np.ndarray
+    skill_keys: pd.DataFrame
+    values: pd.DataFrame
+    uniques: dict
+
+    @classmethod
+    def assemble(cls, fine, values, uniques):
+        skill_id, skill_keys = _grouping(fine, SKILL_GROUP_KEYS)
+        return cls(
+            fine=fine, skill_id=skill_id, skill_keys=skill_keys,
+            values=values, uniques=uniques,
+        )
+
+    def grouping(self, keys):
+        """Group id of every ``fine`` row for ``keys`` and the key values per id."""
+        if list(keys) == SKILL_GROUP_KEYS:
+            return self.skill_id, self.skill_keys
+        return _grouping(self.fine, keys)
+
+    def labels(self):
+        """The ``values`` table with each code replaced by its label."""
+        labels = np.empty(len(self.values), dtype=object)
+        fields = self.values["field"].to_numpy()
+        codes = self.values["code"].to_numpy()
+        for field_no, field in enumerate(VALUE_FIELDS):
+            mask = fields == field_no
+            labels[mask] = np.asarray(self.uniques[field].take(codes[mask]), dtype=object)
+        return self.values.drop(columns="code").assign(value=labels)
+
+    @classmethod
+    def merge(cls, parts):
+        """Combine partials from disjoint sets of calls into one."""
+        parts = [part for part in parts if part is not None]
+        if len(parts) == 1:
+            return parts[0]
+
+        offsets = np.cumsum([0] + [len(part.fine) for part in parts])
+        stacked = pd.concat([part.fine for part in parts], ignore_index=True)
+        grouped = stacked.groupby(FINE_KEYS, sort=False)
+        fine = grouped[COUNTER_COLUMNS].sum().reset_index()
+        remap = grouped.ngroup().to_numpy()
+
+        labelled = pd.concat(
+            [part.labels().assign(fine_id=lambda v, o=o: remap[v["fine_id"] + o])
+             for part, o in zip(parts, offsets)],
+            ignore_index=True,
+        )
+        codes = np.empty(len(labelled), dtype=np.int64)
+        uniques = {}
+        for field_no, field in enumerate(VALUE_FIELDS):
+            mask = (labelled["field"] == field_no).to_numpy()
+            codes[mask], uniques[field] = pd.factorize(labelled["value"].to_numpy()[mask])
+        values = (
+            labelled.drop(columns="value").assign(code=codes)
+            .groupby(["fine_id", "field", "code"], sort=False)
+            .agg(count=("count", "sum"), first=("first", "min"))
+            .reset_index()
+        )
+        return cls.assemble(fine, values, uniques)
+
+    def value_counts(self, fields):
+        """Tidy ``FINE_KEYS + [field, value, count]`` table for ``fields``."""
+        labelled = self.labels()
+        field_names = np.asarray(VALUE_FIELDS, dtype=object)[labelled["field"].to_numpy()]
+        labelled = labelled.assign(field=field_names)
+        labelled = labelled.loc[labelled["field"].isin(fields)]
+        counts = pd.concat([
+            self.fine[FINE_KEYS].iloc[labelled["fine_id"].to_numpy()].reset_index(drop=True),
+            labelled[["field", "value", "count"]].reset_index(drop=True),
+        ], axis=1)
+        counts["Timeframe"] = (
+            pd.to_datetime(counts["Timeframe"], errors="coerce").dt.to_period("M")
+        )
+        return counts
+
+
+def _grouping(fine, keys):
+    group_id = fine.groupby(keys, sort=True).ngroup().to_numpy()
+    group_keys = (
+        fine[keys]
+        .assign(group_id=group_id)
+        .drop_duplicates("group_id")
+        .set_index("group_id")
+        .sort_index()
+    )
+    return group_id, group_keys
+
+
+def _phone_roles(total_calls):
+    outbound = (total_calls["call_category"] == "Outbound").to_numpy()
+    ani = total_calls["ANI"].to_numpy()
+    dnis = total_calls["DNIS"].to_numpy()
+    return {
+        "internal_number": pd.Series(np.where(outbound, ani, dnis)),
+        "external_number": pd.Series(np.where(outbound, dnis, ani)),
+    }
+
+
+def build_skill_partials(total_calls, order=None):
+    """Scan ``total_calls`` once into :class:`SkillPartials`.
+
+    ``order`` ranks rows for the first-seen order of ``agents_list``; it
+    defaults to row position. Pass a value comparable across chunks (such
+    as start time) when the partials are going to be merged.
+    """
+    counters = pd.DataFrame({
+        "call_volume": total_calls["master_contact_id"].notna().astype(np.int64),
+    }, index=total_calls.index)
+    for out_col, src_col in SUM_COLUMNS.items():
+        counters[out_col] = total_calls[src_col]
+    counters = pd.concat([counters, indicator_columns(total_calls)], axis=1)
+
+    grouped = pd.concat([total_calls[FINE_KEYS], counters], axis=1).groupby(
+        FINE_KEYS, sort=False
+    )
+    fine = grouped.sum().reset_index()
+    fine_id = grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+
+    # Stack the distinct-value columns into one long frame of integer codes
+    sources = {field: total_calls[field] for field in ("agent_name", "campaign_name")}
+    sources.update(_phone_roles(total_calls))
+    if order is None:
+        order = np.arange(len(total_calls))
+    uniques = {}
+    stacked = []
+    for field_no, field in enumerate(VALUE_FIELDS):
+        codes, uniques[field] = pd.factorize(sources[field], use_na_sentinel=True)
+        keep = (codes >= 0) & (fine_id >= 0)
+        stacked.append(pd.DataFrame({
+            "fine_id": fine_id[keep],
+            "field": np.full(keep.sum(), field_no, dtype=np.int64),
+            "code": codes[keep],
+            "order": order[keep],
+        }))
+    values = (
+        pd.concat(stacked, ignore_index=True)
+        .groupby(["fine_id", "field", "code"], sort=False)
+        .agg(count=("order", "size"), first=("order", "min"))
+        .reset_index()
+    )
+
+    return SkillPartials.assemble(fine, values, uniques)
+
+
+def slice_mask(fine, option):
+    """Boolean mask over ``fine`` selecting the rows of one call type slice."""
+    category, business_hours_only = parse_call_type(option)
+    mask = np.ones(len(fine), dtype=bool)
+    if category is not None:
+        mask &= (fine["call_category"] == category).to_numpy()
+    if business_hours_only:
+        mask &= (fine["Business_Hours"] == 1).to_numpy()
+    return mask
+
+
+def _collect(rows, labels, group_ids, as_dict):
+    """Gather per-group lists (first-seen order) or dicts (count descending)."""
+    if as_dict:
+        rows = rows.sort_values(["group_id", "count", "first"], ascending=[True, False, True])
+    else:
+        rows = rows.sort_values(["group_id", "first"])
+    names = labels.take(rows["code"].to_numpy()).tolist()
+    counts = rows["count"].tolist()
+    gid = rows["group_id"].to_numpy()
+    starts = np.searchsorted(gid, group_ids, side="left")
+    ends = np.searchsorted(gid, group_ids, side="right")
+    if as_dict:
+        collected = [dict(zip(names[s:e], counts[s:e])) for s, e in zip(starts, ends)]
+    else:
+        collected = [names[s:e] for s, e in zip(starts, ends)]
+    return collected, ends - starts
+
+
+def _slice_groups(partials, mask, group_id):
+    """Counter totals per group and a ``collect(field, as_dict)`` over its values."""
+    totals = partials.fine.loc[mask, COUNTER_COLUMNS].groupby(group_id[mask]).sum()
+    group_ids = totals.index.to_numpy()
+
+    values = partials.values
+    values = values.loc[mask[values["fine_id"].to_numpy()]]
+    values = (
+        values
+        .assign(group_id=group_id[values["fine_id"].to_numpy()])
+        .groupby(["group_id", "field", "code"], sort=False)
+        .agg(count=("count", "sum"), first=("first", "min"))
+        .reset_index()
+    )
+    by_field = {
+        field: values.loc[values["field"] == field_no]
+        for field_no, field in enumerate(VALUE_FIELDS)
+    }
+
+    def collect(field, as_dict):
+        return _collect(by_field[field], partials.uniques[field], group_ids, as_dict)
+
+    return totals, collect
+
+
+def derive_skill_slice(partials, option, dict_columns=True):
+    """Re-sum :class:`SkillPartials` into the monthly table for one option.
+
+    ``dict_columns=False`` leaves out ``campaigns_dict`` and the
+    internal/external number dicts (see :mod:`phonesystem.frequency`).
+    """
+    mask = slice_mask(partials.fine, option)
+    if not mask.any():
+        return pd.DataFrame()
+
+    totals, collect = _slice_groups(partials, mask, partials.skill_id)
+    skill_ids = totals.index.to_numpy()
+
+    agents_list, unique_agents = collect("agent_name", as_dict=False)
+    campaigns_dict, unique_campaigns = collect("campaign_name", as_dict=dict_columns)
+
+    keys = partials.skill_keys.loc[skill_ids].reset_index(drop=True)
+    totals = totals.reset_index(drop=True)
+
+    monthly_skill_calls = pd.concat([keys, totals[LEADING_COLUMNS]], axis=1)
+    monthly_skill_calls["unique_agents_count"] = unique_agents.astype(np.int64)
+    monthly_skill_calls["unique_teams_count"] = np.int64(1)
+    monthly_skill_calls["unique_campaigns_count"] = unique_campaigns.astype(np.int64)
+    monthly_skill_calls["agents_list"] = agents_list
+    monthly_skill_calls["teams_list"] = [[team] for team in keys["team_name"]]
+    if dict_columns:
+        monthly_skill_calls["campaigns_dict"] = campaigns_dict
+    for out_col in CATEGORY_COLUMNS:
+        monthly_skill_calls[out_col] = totals[out_col].to_numpy()
+    if dict_columns:
+        monthly_skill_calls["internal_num_dict"] = collect("internal_number", as_dict=True)[0]
+        monthly_skill_calls["external_num_dict"] = collect("external_number", as_dict=True)[0]
+
+    monthly_skill_calls = (
+        monthly_skill_calls
+        .sort_values(["Timeframe", "skill_name"])
+        .reset_index(drop=True)
+    )
+    monthly_skill_calls["Timeframe"] = (
+        pd.to_datetime(monthly_skill_calls["Timeframe"], errors="coerce")
+        .dt.to_period("M")
+    )
+    return monthly_skill_calls
+
+
+def derive_team_slice(partials, option, dict_columns=True):
+    """Re-sum :class:`SkillPartials` into the monthly per-team table for one option.
+
+    Distinct agents, skills and campaigns are counted over the team's
+    value codes, so a team's counts are exact rather than sums of its
+    skills' counts.
+    """
+    mask = slice_mask(partials.fine, option)
+    if not mask.any():
+        return pd.DataFrame()
+
+    team_id, team_keys = partials.grouping(TEAM_GROUP_KEYS)
+    totals, collect = _slice_groups(partials, mask, team_id)
+    team_ids = totals.index.to_numpy()
+
+    agents_list, unique_agents = collect("agent_name", as_dict=False)
+    campaigns_dict, unique_campaigns = collect("campaign_name", as_dict=dict_columns)
+
+    # Skills are part of the fine keys: distinct (team, skill) pairs, alphabetical
+    skills = (
+        pd.DataFrame({"group_id": team_id[mask], "skill_name": partials.fine["skill_name"].to_numpy()[mask]})
+        .drop_duplicates()
+        .sort_values(["group_id", "skill_name"])
+    )
+    skill_names = skills["skill_name"].tolist()
+    starts = np.searchsorted(skills["group_id"].to_numpy(), team_ids, side="left")
+    ends = np.searchsorted(skills["group_id"].to_numpy(), team_ids, side="right")
+
+    keys = team_keys.loc[team_ids].reset_index(drop=True)
+    totals = totals.reset_index(drop=True)
+
+    monthly_team_calls = pd.concat([keys, totals[LEADING_COLUMNS]], axis=1)
+    monthly_team_calls["unique_agents_count"] = unique_agents.astype(np.int64)
+    monthly_team_calls["unique_skills_count"] = (ends - starts).astype(np.int64)
+    monthly_team_calls["unique_campaigns_count"] = unique_campaigns.astype(np.int64)
+    monthly_team_calls["agents_list"] = agents_list
+    monthly_team_calls["skills_list"] = [skill_names[s:e] for s, e in zip(starts, ends)]
+    if dict_columns:
+        monthly_team_calls["campaigns_dict"] = campaigns_dict
+    for out_col in CATEGORY_COLUMNS:
+        monthly_team_calls[out_col] = totals[out_col].to_numpy()
+    if dict_columns:
+        monthly_team_calls["internal_num_dict"] = collect("internal_number", as_dict=True)[0]
+        monthly_team_calls["external_num_dict"] = collect("external_number", as_dict=True)[0]
+
+    monthly_team_calls = (
+        monthly_team_calls
+        .sort_values(["Timeframe", "team_name"])
+        .reset_index(drop=True)
+    )
+    monthly_team_calls["Timeframe"] = (
+        pd.to_datetime(monthly_team_calls["Timeframe"], errors="coerce")
+        .dt.to_period("M")
+    )
+    return monthly_team_calls
+
+
+def scan_partials(total_calls):
+    """:class:`SkillPartials` of ``total_calls``, or None when it is empty."""
+    if total_calls.empty:
+        return None
+    with stage("skill partials", len(total_calls)) as record:
+        partials = build_skill_partials(total_calls)
+        record.rows_out = len(partials.fine)
+    return partials
+
+
+def aggregate_skills_single_pass(total_calls, options=CALL_TYPE_OPTIONS, dict_columns=True,
+                                 partials=None):
+    """Build every call type slice from one scan of ``total_calls``.
+
+    Pass ``partials`` from :func:`scan_partials` to reuse an existing scan.
+    """
+    if total_calls.empty:
+        return {option: pd.DataFrame() for option in options}
+    if partials is None:
+        partials = scan_partials(total_calls)
+
+    skill_dfs = {}
+    for option in options:
+        with stage(f"skill slice: {option}", len(partials.fine)) as record:
+            skill_dfs[option] = derive_skill_slice(partials, option, dict_columns)
+            record.rows_out = len(skill_dfs[option])
+    return skill_dfs
+
+
+def aggregate_teams(partials, options=CALL_TYPE_OPTIONS, dict_columns=True):
+    """Build every call type slice per team from :class:`SkillPartials`."""
+    if partials is None:
+        return {option: pd.DataFrame() for option in options}
+
+    team_dfs = {}
+    for option in options:
+        with stage(f"team slice: {option}", len(partials.fine)) as record:
+            team_dfs[option] = derive_team_slice(partials, option, dict_columns)
+            record.rows_out = len(team_dfs[option])
+    return team_dfs
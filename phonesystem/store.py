@@ -0,0 +1,392 @@
+"""Persistent month-partitioned call store.
+
+Processed calls are kept on disk as one directory per ``Timeframe`` month
+holding typed Parquet files for the classified calls and the spam rows,
+and a bundle of that month's aggregate views::
+
+    <root>/manifest.json
+    <root>/2024-01/calls.parquet
+    <root>/2024-01/spam_calls.parquet
+    <root>/2024-01/views.parquet.zip
+    <root>/undated/...
+
+Ingesting a new export only processes and rewrites the months it
+contains; stored rows with the same ``contact_id`` as a new row are
+dropped, whichever month or kind (call or spam) they were stored under.
+The views of each rewritten month are rebuilt with it
+(:func:`build_month_views`). Skill, team, percentile, phone number and
+value-count rows never span two months, so they are stored as built; the
+rollup and interval cubes are stored in their mergeable form.
+:meth:`MonthStore.result` stacks and re-sums the stored views
+(:func:`combine_views`), so a year-to-date refresh aggregates one month
+and reads eleven. Total_Calls, Master_Contacts, Transfer_Paths and
+Repeat_Contacts are still built from the loaded rows.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from phonesystem.bundle import read_bundle, to_table, write_bundle
+from phonesystem.config import CALL_TYPE_OPTIONS
+from phonesystem.frequency import (
+    PHONE_DICT_FIELDS,
+    SKILL_DICT_FIELDS,
+    attach_phone_dicts,
+    phone_value_counts,
+    skill_value_counts,
+)
+from phonesystem.intervals import IntervalCube
+from phonesystem.multifile import files_name, process_files
+from phonesystem.percentiles import PERCENTILE_LEVELS, percentile_sheets
+from phonesystem.pipeline import (
+    DEFAULT_CALENDAR,
+    aggregate_phone_numbers,
+    build_result,
+    sort_calls,
+    stack_phone_numbers,
+)
+from phonesystem.profiling import stage
+from phonesystem.repeat_contacts import INPUT_COLUMNS as REPEAT_INPUT_COLUMNS
+from phonesystem.rollup import RollupCube, rollup_sheets
+from phonesystem.rules import DEFAULT_RULES
+from phonesystem.skill_aggregation import (
+    aggregate_skills_single_pass,
+    aggregate_teams,
+    scan_partials,
+)
+
+
+MANIFEST = "manifest.json"
+FORMAT = "phonesystem-store"
+FORMAT_VERSION = 1
+UNDATED = "undated"
+
+PARTITION_FILES = {
+    "calls": "calls.parquet",
+    "spam_calls": "spam_calls.parquet",
+}
+
+VIEWS_FILE = "views.parquet.zip"
+# Bump when build_month_views changes, so stored views are rebuilt on read
+VIEWS_VERSION = 1
+
+
+def month_keys(dates):
+    """``YYYY-MM`` partition key per row; rows without a date go to ``undated``."""
+    return dates.dt.strftime("%Y-%m").fillna(UNDATED)
+
+
+def _write_parquet(df, path):
+    # Write beside the target and swap in, so readers never see half a file
+    tmp_path = path + ".tmp"
+    pq.write_table(to_table(df), tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+
+
+def _merge_rows(stored, new, incoming):
+    """Stored rows without the ``incoming`` contact ids, plus the ``new`` rows."""
+    parts = []
+    if stored is not None:
+        parts.append(stored.loc[~stored["contact_id"].isin(incoming)])
+    if new is not None:
+        parts.append(new)
+    merged = pd.concat(parts, ignore_index=True)
+    return sort_calls(merged)
+
+
+# =========================
+# Month Views
+# =========================
+def build_month_views(calls):
+    """Aggregate views of one month partition as ``{name: frame}``.
+
+    Skill and team slices keep their dict columns; Phone_Numbers is kept
+    without them, beside the ``Phone_Value_Counts`` they are rebuilt from.
+    Skill value counts are split by field so numbers and campaign names
+    keep their own types.
+    """
+    if calls.empty:
+        return {}
+    partials = scan_partials(calls)
+    views = {}
+    for option, df in aggregate_skills_single_pass(calls, partials=partials).items():
+        views[f"Skill - {option}"] = df
+    for option, df in aggregate_teams(partials).items():
+        views[f"Team - {option}"] = df
+    views.update(percentile_sheets(calls))
+
+    cube = RollupCube.from_partials(partials)
+    views["Rollup_Fine"] = cube.fine
+    views["Rollup_Agents"] = cube.agents
+    views["Rollup_Agent_Names"] = pd.DataFrame({"agent_name": cube.agent_names})
+
+    with stage("phone numbers", len(calls)) as record:
+        phone_df = stack_phone_numbers(calls)
+        views["Phone_Numbers"] = aggregate_phone_numbers(phone_df, dict_columns=False)
+        views["Phone_Value_Counts"] = phone_value_counts(phone_df)
+        record.rows_out = len(views["Phone_Numbers"])
+    skill_counts = skill_value_counts(calls)
+    for field in SKILL_DICT_FIELDS.values():
+        views[f"Skill_Value_Counts - {field}"] = skill_counts.loc[skill_counts["field"] == field]
+    views["Interval_Cube"] = IntervalCube.from_calls(calls).counts
+    return views
+
+
+def _stack(month_views, name):
+    frames = [views[name] for views in month_views if name in views and not views[name].empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def _phone_counts(month_views):
+    # value_counts_long order over all months: field, then internal before
+    # external numbers, then first appearance (i.e. month order)
+    counts = _stack(month_views, "Phone_Value_Counts")
+    if counts.empty:
+        return counts
+    field = pd.Categorical(counts["field"], categories=list(PHONE_DICT_FIELDS.values())).codes
+    internal = (counts["internal_external"].astype(str) == "Internal").to_numpy()
+    order = np.argsort(field.astype(np.int64) * 2 + ~internal, kind="stable")
+    return counts.iloc[order].reset_index(drop=True)
+
+
+def combine_views(month_views, normalized=False):
+    """Stack and re-sum :func:`build_month_views` of several months.
+
+    Returns the :func:`~phonesystem.pipeline.aggregate_views` of the
+    months' calls taken together, in the same row order.
+    """
+    views = {"skill_dfs": {}, "team_dfs": {}}
+    for option in CALL_TYPE_OPTIONS:
+        for key, level in (("skill_dfs", "Skill"), ("team_dfs", "Team")):
+            df = _stack(month_views, f"{level} - {option}")
+            if normalized and not df.empty:
+                df = df.drop(columns=list(SKILL_DICT_FIELDS))
+            views[key][option] = df
+
+    views["percentiles"] = {}
+    for level in PERCENTILE_LEVELS:
+        df = _stack(month_views, f"{level} - Percentiles")
+        if not df.empty:
+            views["percentiles"][f"{level} - Percentiles"] = df
+
+    cubes = [
+        RollupCube(
+            fine=stored["Rollup_Fine"],
+            agents=stored["Rollup_Agents"],
+            agent_names=stored["Rollup_Agent_Names"]["agent_name"].to_numpy(dtype=object),
+        )
+        for stored in month_views if "Rollup_Fine" in stored
+    ]
+    views["rollups"] = rollup_sheets(RollupCube.merge(cubes)) if cubes else {}
+
+    phone_numbers = _stack(month_views, "Phone_Numbers")
+    phone_counts = _phone_counts(month_views)
+    if not normalized:
+        phone_numbers = attach_phone_dicts(phone_numbers, phone_counts)
+    views["phone_numbers"] = phone_numbers
+
+    intervals = [
+        IntervalCube(counts=stored["Interval_Cube"]) for stored in month_views if "Interval_Cube" in stored
+    ]
+    views["interval_calls"] = IntervalCube.merge(intervals).to_frame()
+
+    if normalized and any(month_views):
+        skill_counts = [
+            _stack(month_views, f"Skill_Value_Counts - {field}") for field in SKILL_DICT_FIELDS.values()
+        ]
+        views["value_counts"] = {
+            "Skill_Value_Counts": pd.concat(skill_counts, ignore_index=True),
+            "Phone_Value_Counts": phone_counts,
+        }
+    return views
+
+
+def _read_views(path):
+    views = read_bundle(path)
+    for df in views.values():
+        for column in df.columns:
+            if df[column].dtype == object and df[column].map(type).eq(np.ndarray).any():
+                # Bundles load list columns as arrays
+                df[column] = [v.tolist() if isinstance(v, np.ndarray) else v for v in df[column]]
+    return views
+
+
+# =========================
+# Month Store
+# =========================
+@dataclass
+class MonthStore:
+    """Month-partitioned store of processed calls rooted at ``root``."""
+
+    root: str
+
+    def _manifest_path(self):
+        return os.path.join(self.root, MANIFEST)
+
+    def manifest(self):
+        path = self._manifest_path()
+        if not os.path.exists(path):
+            return {"format": FORMAT, "version": FORMAT_VERSION, "months": {}}
+        with open(path) as handle:
+            manifest = json.load(handle)
+        if manifest.get("format") != FORMAT:
+            raise ValueError(f"{self.root} is not a phone system month store")
+        return manifest
+
+    def _write_manifest(self, manifest):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self._manifest_path() + ".tmp"
+        with open(tmp_path, "w") as handle:
+            json.dump(manifest, handle, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._manifest_path())
+
+    def fingerprint(self):
+        """Digest of the manifest, which changes whenever a month is rewritten."""
+        manifest = json.dumps(self.manifest(), sort_keys=True)
+        return hashlib.sha256(manifest.encode()).hexdigest()
+
+    def months(self):
+        """Stored partition keys in chronological order (``undated`` last)."""
+        return sorted(self.manifest()["months"], key=lambda month: (month == UNDATED, month))
+
+    def _path(self, month, kind):
+        if kind == "views":
+            return os.path.join(self.root, month, VIEWS_FILE)
+        return os.path.join(self.root, month, PARTITION_FILES[kind])
+
+    def partition_files(self, months=None, kind="calls"):
+        """Parquet files of ``kind`` for ``months`` (default: all), for direct scans."""
+        months = self.months() if months is None else [m for m in self.months() if m in months]
+        paths = [self._path(month, kind) for month in months]
+        return [path for path in paths if os.path.exists(path)]
+
+    def read_partition(self, month, kind="calls", columns=None):
+        path = self._path(month, kind)
+        if not os.path.exists(path):
+            return None
+        return pq.read_table(path, columns=columns).to_pandas()
+
+    def _write_views(self, month, entry):
+        calls = self.read_partition(month)
+        views = build_month_views(pd.DataFrame() if calls is None else calls)
+        path = self._path(month, "views")
+        write_bundle(views, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        entry["views"] = VIEWS_VERSION
+        return views
+
+    def month_views(self, month):
+        """Stored :func:`build_month_views` of ``month``, built first if missing or outdated."""
+        manifest = self.manifest()
+        entry = manifest["months"][month]
+        path = self._path(month, "views")
+        if entry.get("views") == VIEWS_VERSION and os.path.exists(path):
+            return _read_views(path)
+        views = self._write_views(month, entry)
+        self._write_manifest(manifest)
+        return views
+
+    def ingest(self, source, calendar=DEFAULT_CALENDAR, rules=DEFAULT_RULES, executor=None):
+        """Process ``source`` and merge it into the months it covers.
+
+        ``source`` may be a list of exports, processed in parallel (see
+        :func:`~phonesystem.multifile.process_files`) and ingested together.
+        Every stored row of an ingested ``contact_id`` is replaced, in
+        whichever month and kind it was stored, so a contact whose month
+        or spam status changed is not kept twice. Returns the sorted list
+        of partition keys that were rewritten.
+        """
+        sources = list(source) if isinstance(source, (list, tuple)) else [source]
+        total_calls, spam_calls = process_files(sources, calendar=calendar, rules=rules, executor=executor)
+        new_rows = {
+            "calls": dict(tuple(total_calls.groupby(month_keys(total_calls["Timeframe"])))),
+            "spam_calls": dict(tuple(spam_calls.groupby(month_keys(spam_calls["start_date"])))),
+        }
+        incoming = pd.concat(
+            [frame["contact_id"] for frame in (total_calls, spam_calls) if "contact_id" in frame],
+            ignore_index=True,
+        ).unique()
+
+        manifest = self.manifest()
+        # Stored partitions holding an ingested contact, in any month or kind
+        stale = set()
+        for month in manifest["months"]:
+            for kind in PARTITION_FILES:
+                stored = self.read_partition(month, kind, columns=["contact_id"])
+                if stored is not None and stored["contact_id"].isin(incoming).any():
+                    stale.add((month, kind))
+        touched = sorted(
+            set(new_rows["calls"]) | set(new_rows["spam_calls"]) | {month for month, _ in stale}
+        )
+
+        updated = datetime.now().isoformat(timespec="seconds")
+        for month in touched:
+            os.makedirs(os.path.join(self.root, month), exist_ok=True)
+            entry = manifest["months"].setdefault(month, {"calls": 0, "spam_calls": 0})
+            for kind, rows in new_rows.items():
+                if month not in rows and (month, kind) not in stale:
+                    continue
+                merged = _merge_rows(self.read_partition(month, kind), rows.get(month), incoming)
+                _write_parquet(merged, self._path(month, kind))
+                entry[kind] = len(merged)
+                if kind == "calls":
+                    self._write_views(month, entry)
+            entry["updated"] = updated
+            entry["source"] = files_name(sources)
+        self._write_manifest(manifest)
+        return touched
+
+    def load(self, months=None):
+        """Stored ``(total_calls, spam_calls)`` for ``months`` (default: all)."""
+        months = self.months() if months is None else [m for m in self.months() if m in months]
+        frames = {kind: [] for kind in PARTITION_FILES}
+        for month in months:
+            for kind in PARTITION_FILES:
+                frame = self.read_partition(month, kind)
+                if frame is not None and not frame.empty:
+                    frames[kind].append(frame)
+        loaded = [
+            pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+            for parts in frames.values()
+        ]
+        total_calls, spam_calls = (sort_calls(frame) for frame in loaded)
+        return total_calls, spam_calls
+
+    def adjacent_months(self, months):
+        """Stored months just before or after ``months`` that are not in it."""
+        stored = set(self.months()) - {UNDATED}
+        selected = set(months)
+        adjacent = set()
+        for month in selected - {UNDATED}:
+            period = pd.Period(month, freq="M")
+            adjacent.update(str(neighbour) for neighbour in (period - 1, period + 1))
+        return sorted((adjacent & stored) - selected)
+
+    def result(self, months=None, normalized=False):
+        """Build every dashboard view from the stored partitions.
+
+        The aggregate views are combined from the stored month views; only
+        the row-level views are built from the loaded calls. When only some
+        months are selected, the calls of the stored months around them
+        are read too, so repeat contacts near the edges of the selection
+        are still found.
+        """
+        selected = self.months() if months is None else [m for m in self.months() if m in months]
+        views = combine_views([self.month_views(month) for month in selected], normalized)
+        total_calls, spam_calls = self.load(selected)
+        adjacent = [
+            self.read_partition(month, columns=REPEAT_INPUT_COLUMNS)
+            for month in ([] if months is None else self.adjacent_months(months))
+        ]
+        adjacent = [frame for frame in adjacent if frame is not None and not frame.empty]
+        adjacent_calls = pd.concat(adjacent, ignore_index=True) if adjacent else None
+        return build_result(
+            total_calls, spam_calls, normalized=normalized, adjacent_calls=adjacent_calls, views=views
+        )
@@ -0,0 +1,311 @@
+"""Chunked ingestion for exports too large to load at once.
+
+Raw rows are read in fixed-size chunks (CSV via ``pandas.read_csv``, xlsx
+via an openpyxl row iterator over the first sheet). Legacy .xls workbooks
+have no row reader and are loaded whole before being sliced, so they get
+no memory saving here. Each chunk goes through the per-row stages
+(datetime parsing, spam filter, classification, business hours) and is
+folded into mergeable partial aggregates for the skill, team, rollup,
+percentile, phone number and interval views. No call rows are kept
+between chunks: peak memory is one chunk plus the partials, which grow
+with the distinct keys (skills, phone numbers and values per month) rather
+than with the number of calls.
+
+Total_Calls, Master_Contacts and Repeat_Contacts need every row and are
+not produced in this mode. For the same reason Phone_Numbers has no
+``call_times_list`` column here: it holds one start time per call.
+"""
+
+import itertools
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from phonesystem.frequency import (
+    PHONE_COUNT_KEYS,
+    SKILL_DICT_FIELDS,
+    attach_phone_dicts,
+    phone_value_counts,
+)
+from phonesystem.intervals import IntervalCube
+from phonesystem.percentiles import PercentileSketch
+from phonesystem.pipeline import (
+    CALL_TYPE_OPTIONS,
+    DEFAULT_CALENDAR,
+    PipelineResult,
+    add_phone_roles,
+    classify,
+    dated_filename,
+    normalize_calls,
+    source_name,
+    split_spam,
+    stack_phone_numbers,
+)
+from phonesystem.profiling import stage
+from phonesystem.rollup import build_rollups
+from phonesystem.rules import DEFAULT_RULES
+from phonesystem.skill_aggregation import (
+    SkillPartials,
+    aggregate_teams,
+    build_skill_partials,
+    derive_skill_slice,
+)
+
+
+DEFAULT_CHUNKSIZE = 100_000
+
+PHONE_SUM_COLUMNS = ["contact_count", "total_agent_time", "total_customer_time"]
+
+
+# =========================
+# Chunk Readers
+# =========================
+def _iter_xlsx(source, chunksize):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        # The first sheet, as pandas.read_excel reads; not the sheet saved as active
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        while True:
+            batch = list(itertools.islice(rows, chunksize))
+            if not batch:
+                break
+            yield pd.DataFrame(batch, columns=list(header))
+    finally:
+        workbook.close()
+
+
+def iter_chunks(source, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield raw DataFrames of at most ``chunksize`` rows from ``source``.
+
+    A .xls workbook is read whole first and then sliced, so its peak
+    memory is that of the full sheet.
+    """
+    name = source_name(source)
+    if name.endswith(".csv"):
+        yield from pd.read_csv(source, chunksize=chunksize)
+    elif name.endswith(".xls"):
+        # Legacy workbooks have no row iterator; load once and slice
+        frame = pd.read_excel(source)
+        for start in range(0, len(frame), chunksize):
+            yield frame.iloc[start:start + chunksize].copy()
+    else:
+        yield from _iter_xlsx(source, chunksize)
+
+
+def time_order(start_time):
+    """Start times as int64 nanoseconds with NaT last, comparable across chunks."""
+    order = start_time.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    order[start_time.isna().to_numpy()] = np.iinfo(np.int64).max
+    return order
+
+
+@dataclass
+class MergeStack:
+    """Per-chunk partials merged pairwise, like the carries of a binary counter.
+
+    Two partials are merged only once they cover the same number of
+    chunks, so each chunk takes part in about ``log2(chunks)`` merges
+    instead of every chunk re-merging all the state accumulated so far.
+    ``merge`` is a partials class's ``merge`` classmethod; chunk order is
+    kept.
+    """
+
+    merge: object
+    levels: list = field(default_factory=list)
+
+    def push(self, part):
+        self.levels.append((1, part))
+        while len(self.levels) > 1 and self.levels[-1][0] == self.levels[-2][0]:
+            chunks, newer = self.levels.pop()
+            _, older = self.levels.pop()
+            self.levels.append((2 * chunks, self.merge([older, newer])))
+
+    def result(self):
+        """All pushed partials merged into one, or None when none were pushed."""
+        if not self.levels:
+            return None
+        return self.merge([part for _, part in self.levels])
+
+
+# =========================
+# Phone Number Partials
+# =========================
+@dataclass
+class PhonePartials:
+    """Mergeable partial aggregates for the Phone_Numbers view.
+
+    ``totals`` holds the additive columns per phone key and ``counts`` the
+    tidy value counts behind the dict columns. Start times are not kept,
+    so there is no ``call_times_list``.
+    """
+
+    totals: pd.DataFrame
+    counts: pd.DataFrame
+
+    @classmethod
+    def from_calls(cls, total_calls):
+        phone_df = stack_phone_numbers(total_calls)
+        totals = (
+            phone_df
+            .groupby(PHONE_COUNT_KEYS, observed=True)
+            .agg(
+                contact_count=("master_contact_id", "count"),
+                total_agent_time=("Agent_Work_Time", "sum"),
+                total_customer_time=("customer_call_time", "sum"),
+            )
+            .reset_index()
+        )
+        return cls(totals=totals, counts=phone_value_counts(phone_df))
+
+    @classmethod
+    def merge(cls, parts):
+        parts = [part for part in parts if part is not None]
+        if len(parts) == 1:
+            return parts[0]
+        totals = (
+            pd.concat([part.totals for part in parts], ignore_index=True)
+            .groupby(PHONE_COUNT_KEYS, observed=True)[PHONE_SUM_COLUMNS]
+            .sum()
+            .reset_index()
+        )
+        counts = (
+            pd.concat([part.counts for part in parts], ignore_index=True)
+            .groupby(PHONE_COUNT_KEYS + ["field", "value"], sort=False, observed=True)["count"]
+            .sum()
+            .reset_index()
+        )
+        return cls(totals=totals, counts=counts)
+
+    def to_frame(self, dict_columns=True):
+        """Assemble the Phone_Numbers view in its usual column layout, less ``call_times_list``."""
+        frame = self.totals.sort_values(PHONE_COUNT_KEYS).reset_index(drop=True)
+        frame["internal_external"] = frame["internal_external"].astype(str)
+        frame["Timeframe"] = (
+            pd.to_datetime(frame["Timeframe"], errors="coerce").dt.to_period("M")
+        )
+        if dict_columns:
+            frame = attach_phone_dicts(frame, self.counts)
+        return frame
+
+
+# =========================
+# Streaming Run
+# =========================
+@dataclass
+class StreamStats:
+    """Row counts and date span observed while streaming."""
+
+    chunks: int = 0
+    rows: int = 0
+    spam_calls: int = 0
+    first_date: pd.Timestamp = None
+    last_date: pd.Timestamp = None
+    peak_chunk_rows: int = 0
+    coerced_start_times: int = 0
+
+    def update(self, raw_rows, calls, spam):
+        self.chunks += 1
+        self.rows += raw_rows
+        self.spam_calls += len(spam)
+        self.peak_chunk_rows = max(self.peak_chunk_rows, raw_rows)
+        dates = pd.concat([calls["start_date"], spam["start_date"]]).dropna()
+        if not dates.empty:
+            lo, hi = dates.min(), dates.max()
+            self.first_date = lo if self.first_date is None else min(self.first_date, lo)
+            self.last_date = hi if self.last_date is None else max(self.last_date, hi)
+
+    def filename(self, suffix=".xlsx"):
+        if self.first_date is None:
+            return f"Phone_System_Analysis{suffix}"
+        return dated_filename(self.first_date, self.last_date, suffix)
+
+
+def stream_pipeline(source, calendar=DEFAULT_CALENDAR, chunksize=DEFAULT_CHUNKSIZE,
+                    normalized=False, options=CALL_TYPE_OPTIONS, rules=DEFAULT_RULES):
+    """Build the skill, team, phone number and interval views chunk by chunk.
+
+    Returns ``(result, stats)``. ``result.total_calls``, ``spam_calls`` and
+    Master_Contacts are left empty; ``stats`` carries the spam count and
+    date span.
+    """
+    stats = StreamStats()
+    skill_stack = MergeStack(SkillPartials.merge)
+    phone_stack = MergeStack(PhonePartials.merge)
+    interval_stack = MergeStack(IntervalCube.merge)
+    sketch_stack = MergeStack(PercentileSketch.merge)
+
+    chunks = iter_chunks(source, chunksize)
+    while True:
+        with stage("load") as record:
+            chunk = next(chunks, None)
+            record.rows_out = 0 if chunk is None else len(chunk)
+        if chunk is None:
+            break
+        raw_rows = len(chunk)
+        chunk = normalize_calls(chunk)
+        stats.coerced_start_times += chunk.attrs.get("coerced_start_times", 0)
+        calls, spam = split_spam(chunk)
+        calls = classify(calls, calendar=calendar, rules=rules)
+        with stage("phone roles", len(calls)) as record:
+            calls = add_phone_roles(calls)
+            record.rows_out = len(calls)
+        stats.update(raw_rows, calls, spam)
+        if calls.empty:
+            continue
+
+        with stage("skill partials", len(calls)) as record:
+            partials = build_skill_partials(calls, order=time_order(calls["start_time"]))
+            skill_stack.push(partials)
+            record.rows_out = len(partials.fine)
+        with stage("phone partials", len(calls)) as record:
+            partials = PhonePartials.from_calls(calls)
+            phone_stack.push(partials)
+            record.rows_out = len(partials.totals)
+        with stage("interval cube", len(calls)) as record:
+            partials = IntervalCube.from_calls(calls)
+            interval_stack.push(partials)
+            record.rows_out = len(partials.counts)
+        with stage("percentile sketch", len(calls)) as record:
+            partials = PercentileSketch.from_calls(calls)
+            sketch_stack.push(partials)
+            record.rows_out = len(partials.buckets)
+
+    with stage("merge partials", stats.chunks) as record:
+        skill_partials = skill_stack.result()
+        phone_partials = phone_stack.result()
+        intervals = interval_stack.result()
+        sketch = sketch_stack.result()
+        record.rows_out = 0 if skill_partials is None else len(skill_partials.fine)
+
+    result = PipelineResult(total_calls=pd.DataFrame(), spam_calls=pd.DataFrame())
+    if skill_partials is None:
+        result.skill_dfs = {option: pd.DataFrame() for option in options}
+        result.team_dfs = aggregate_teams(None, options)
+        return result, stats
+
+    for option in options:
+        with stage(f"skill slice: {option}", len(skill_partials.fine)) as record:
+            result.skill_dfs[option] = derive_skill_slice(
+                skill_partials, option, dict_columns=not normalized
+            )
+            record.rows_out = len(result.skill_dfs[option])
+    result.team_dfs = aggregate_teams(skill_partials, options, dict_columns=not normalized)
+    result.rollups = build_rollups(skill_partials)
+    # Within SKETCH_RELATIVE_ACCURACY of the exact batch percentiles
+    result.percentiles = sketch.sheets()
+    with stage("phone numbers", len(phone_partials.totals)) as record:
+        result.phone_numbers = phone_partials.to_frame(dict_columns=not normalized)
+        record.rows_out = len(result.phone_numbers)
+    result.interval_calls = intervals.to_frame()
+    if normalized:
+        result.value_counts = {
+            "Skill_Value_Counts": skill_partials.value_counts(list(SKILL_DICT_FIELDS.values())),
+            "Phone_Value_Counts": phone_partials.counts,
+        }
+    return result, stats
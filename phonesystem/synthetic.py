@@ -0,0 +1,225 @@
+"""Synthetic NICE-style call exports for benchmarks.
+
+Rows are generated as transfer chains: each master contact has one or
+more legs that share the caller and internal line, start one after the
+other and hop between skills. Skill names follow the ``<team>-<kind>``
+shape the category rules match (``Billing-IB``, ``SDR Team-OB``...),
+external numbers follow a skewed distribution so some callers repeat, and
+a share of one-leg contacts look like spam (IVR time but no queue time).
+Everything is drawn from one seeded generator, so a ``(rows, seed)`` pair
+always gives the same export::
+
+    calls = generate_calls(100_000, seed=1)
+    write_calls(calls, "synthetic_100k.csv")
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from phonesystem.config import TEAM_TO_DEPT
+from phonesystem.datetimes import format_timestamps
+
+
+# Skill kind suffix -> share of inbound legs; outbound chains use "OB"
+INBOUND_KINDS = {
+    "IB": 0.62,
+    "VM": 0.1,
+    "AfterHours": 0.06,
+    "No Agent": 0.07,
+    "Callback": 0.15,
+}
+SKILL_KINDS = list(INBOUND_KINDS) + ["OB"]
+
+# Teams that own skills; "No Assigned Team" comes from missing team names
+TEAMS = [team for team in TEAM_TO_DEPT if team != "No Assigned Team"]
+AGENTS_PER_TEAM = 12
+INTERNAL_NUMBERS = [8005550100 + line for line in range(40)]
+
+EXCEL_MAX_ROWS = 1_048_575
+
+COLUMNS = [
+    "contact_id", "master_contact_id", "media_name", "contact_name", "ANI", "DNIS",
+    "skill_no", "skill_name", "campaign_no", "campaign_name", "agent_no", "agent_name",
+    "team_no", "team_name", "SLA", "start_date", "start_time", "PreQueue", "InQueue",
+    "Agent_Time", "PostQueue", "Total_Time", "Abandon_Time", "abandon", "ACW_Seconds",
+    "ACW_Time",
+]
+
+
+def skill_catalog():
+    """``(skill_name, team_name)`` for every team and skill kind, in skill_no order."""
+    return [(f"{team}-{kind}", team) for team in TEAMS for kind in SKILL_KINDS]
+
+
+def _chain_lengths(rng, rows, transfer_rate, max_legs):
+    mean_length = 1 / (1 - transfer_rate)
+    lengths = np.empty(0, dtype=np.int64)
+    while lengths.sum() < rows:
+        drawn = rng.geometric(1 - transfer_rate, size=int(rows / mean_length * 1.1) + 16)
+        lengths = np.concatenate([lengths, np.minimum(drawn, max_legs)])
+    ends = np.cumsum(lengths)
+    chains = int(np.searchsorted(ends, rows)) + 1
+    lengths = lengths[:chains]
+    lengths[-1] -= ends[chains - 1] - rows
+    return lengths
+
+
+def _time_of_day(rng, chains, after_hours_share):
+    # Business-day arrivals peak around late morning; the rest are spread over the day
+    seconds = rng.normal(12.5 * 3600, 2.6 * 3600, chains)
+    spread = rng.random(chains) < after_hours_share
+    seconds[spread] = rng.uniform(0, 86_400, spread.sum())
+    return np.clip(seconds, 0, 86_399).astype(np.int64)
+
+
+def _clock(seconds):
+    """``HH:MM:SS`` strings for second offsets below one day."""
+    stamps = pd.Series(np.asarray(seconds, dtype="timedelta64[s]") + np.datetime64("2000-01-01"))
+    return pd.Series(format_timestamps(stamps)).str.slice(11).to_numpy(dtype=object)
+
+
+def generate_calls(rows, seed=0, start="2024-01-01", days=90, transfer_rate=0.22,
+                   outbound_rate=0.2, abandon_rate=0.08, spam_rate=0.06, max_legs=6):
+    """A synthetic raw export of ``rows`` call legs, sorted by start time."""
+    rng = np.random.default_rng(seed)
+    catalog = skill_catalog()
+    team_codes = np.repeat(np.arange(len(TEAMS)), len(SKILL_KINDS))
+
+    # Transfer chains: one master contact per chain, legs numbered from 0
+    lengths = _chain_lengths(rng, rows, transfer_rate, max_legs)
+    chains = len(lengths)
+    chain = np.repeat(np.arange(chains), lengths)
+    first_leg = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    leg = np.arange(rows) - first_leg
+    last_leg = leg == lengths[chain] - 1
+
+    # Per chain: start, direction, caller, line and outcome
+    weekday_weight = np.array([1, 1, 1, 1, 1, 0.25, 0.15])
+    calendar_days = pd.date_range(start, periods=days, freq="D")
+    day_weights = weekday_weight[calendar_days.dayofweek]
+    day = rng.choice(days, size=chains, p=day_weights / day_weights.sum())
+    second = _time_of_day(rng, chains, after_hours_share=0.12)
+    outbound = rng.random(chains) < outbound_rate
+    spam = (lengths == 1) & ~outbound & (rng.random(chains) < spam_rate)
+    abandoned = ~outbound & ~spam & (rng.random(chains) < abandon_rate)
+    caller_pool = max(rows // 3, 1)
+    caller = (caller_pool * rng.random(chains) ** 3).astype(np.int64)
+    external = 2_000_000_000 + (caller * 2_654_435_761) % 7_000_000_000
+    internal = rng.choice(INTERNAL_NUMBERS, size=chains)
+
+    # Per leg: team, skill kind and agent; transfers usually land on inbound queues
+    team = rng.choice(len(TEAMS), size=rows, p=rng.dirichlet(np.full(len(TEAMS), 2.0)))
+    kind = rng.choice(len(INBOUND_KINDS), size=rows, p=list(INBOUND_KINDS.values()))
+    kind[leg > 0] = np.where(rng.random((leg > 0).sum()) < 0.85, 0, kind[leg > 0])
+    outside = (second < 7 * 3600) | (second > 19 * 3600)
+    after_hours = (leg == 0) & outside[chain] & (rng.random(rows) < 0.6)
+    kind[after_hours] = SKILL_KINDS.index("AfterHours")
+    kind[outbound[chain]] = SKILL_KINDS.index("OB")
+    skill = team * len(SKILL_KINDS) + kind
+    team = team_codes[skill]
+
+    leg_abandoned = abandoned[chain] & last_leg
+    leg_spam = spam[chain]
+    no_agent = (kind == SKILL_KINDS.index("No Agent")) | (kind == SKILL_KINDS.index("VM"))
+    answered = ~leg_abandoned & ~leg_spam & ~no_agent
+    agent = team * AGENTS_PER_TEAM + rng.integers(0, AGENTS_PER_TEAM, rows)
+
+    inbound = ~outbound[chain]
+    pre_queue = np.where(inbound, rng.integers(3, 41, rows), 0)
+    in_queue = np.where(inbound & ~leg_spam, np.ceil(rng.exponential(40, rows)), 0)
+    agent_time = np.where(answered, np.round(rng.lognormal(5.3, 0.7, rows)), 0)
+    post_queue = np.where(leg_spam, 0, rng.integers(0, 11, rows))
+    acw = np.where(answered, np.round(rng.exponential(45, rows)), 0).astype(np.float64)
+    total = (pre_queue + in_queue + agent_time + post_queue).astype(np.float64)
+
+    # Legs follow each other: a leg starts when the previous leg of its chain ends
+    elapsed = np.cumsum(total)
+    offset = elapsed - total - (elapsed - total)[first_leg]
+    start_seconds = day[chain] * 86_400 + second[chain] + offset.astype(np.int64)
+    start_time = np.datetime64(start, "s") + start_seconds.astype("timedelta64[s]")
+
+    sla = np.where(in_queue <= 30, 1, 0)
+    sla = np.where(leg_abandoned, 0, sla)
+    sla = np.where(inbound, sla, -1)
+
+    skill_names = np.array([name for name, _ in catalog], dtype=object)
+    team_names = np.array(TEAMS, dtype=object)[team]
+    team_names[rng.random(rows) < 0.01] = None
+    agent_names = np.array(
+        [f"Agent {team_no:02d}-{seat:02d}" for team_no in range(len(TEAMS)) for seat in range(AGENTS_PER_TEAM)],
+        dtype=object,
+    )[agent]
+    agent_names[~answered] = None
+    departments = sorted(set(TEAM_TO_DEPT.values()))
+    department_codes = np.array([departments.index(TEAM_TO_DEPT[name]) for name in TEAMS])[team]
+    campaign_names = np.array([f"{name} Campaign" for name in departments], dtype=object)
+
+    calls = pd.DataFrame({
+        "contact_id": 10_000_000 + np.arange(rows),
+        "master_contact_id": 50_000_000 + chain,
+        "media_name": "Call",
+        "contact_name": np.where(rng.random(rows) < 0.3, None, np.where(inbound, "Caller", "Outreach")),
+        "ANI": np.where(inbound, external[chain], internal[chain]),
+        "DNIS": np.where(inbound, internal[chain], external[chain]),
+        "skill_no": 1000 + skill,
+        "skill_name": skill_names[skill],
+        "campaign_no": 200 + department_codes,
+        "campaign_name": campaign_names[department_codes],
+        "agent_no": np.where(answered, 5000 + agent, 0),
+        "agent_name": agent_names,
+        "team_no": 100 + team,
+        "team_name": team_names,
+        "SLA": sla,
+        "start_date": start_time.astype("datetime64[D]"),
+        "start_time": start_time,
+        "PreQueue": pre_queue.astype(np.float64),
+        "InQueue": in_queue.astype(np.float64),
+        "Agent_Time": agent_time.astype(np.float64),
+        "PostQueue": post_queue.astype(np.float64),
+        "Total_Time": total,
+        "Abandon_Time": np.where(leg_abandoned, in_queue, 0).astype(np.float64),
+        "abandon": leg_abandoned.astype(np.int64),
+        "ACW_Seconds": acw,
+        "ACW_Time": _clock(acw),
+    })
+    calls.loc[rng.random(rows) < 0.02, "Total_Time"] = np.nan
+    calls.loc[rng.random(rows) < 0.03, "ACW_Seconds"] = np.nan
+
+    # Exports are in start order with the time of day in its own column
+    calls = calls.sort_values("start_time", kind="stable", ignore_index=True)
+    calls["start_time"] = _clock(calls["start_time"] - calls["start_date"])
+    calls["start_date"] = calls["start_date"].dt.strftime("%Y-%m-%d")
+    return calls[COLUMNS]
+
+
+def write_calls(calls, path):
+    """Write a generated export as .csv or .xlsx, as the dashboard accepts."""
+    if str(path).lower().endswith(".csv"):
+        calls.to_csv(path, index=False)
+    elif len(calls) > EXCEL_MAX_ROWS:
+        raise ValueError(f"{len(calls)} rows do not fit on one Excel sheet; write a .csv instead")
+    else:
+        calls.to_excel(path, index=False, engine="xlsxwriter")
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m phonesystem.synthetic",
+        description="Write a synthetic NICE-style phone system export.",
+    )
+    parser.add_argument("rows", type=int, help="Number of call legs")
+    parser.add_argument("output", help="Target .csv or .xlsx file")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--start", default="2024-01-01", help="First call date (default: 2024-01-01)")
+    parser.add_argument("--days", type=int, default=90, help="Days covered (default: 90)")
+    args = parser.parse_args(argv)
+    calls = generate_calls(args.rows, seed=args.seed, start=args.start, days=args.days)
+    print(write_calls(calls, args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,33 @@
+"""Synthetic exports shared by the tests."""
+
+import pytest
+
+from phonesystem.pipeline import (
+    add_phone_roles,
+    build_result,
+    classify,
+    normalize_calls,
+    split_spam,
+)
+from phonesystem.synthetic import generate_calls
+
+
+ROWS = 8_000
+
+
+@pytest.fixture(scope="session")
+def raw_calls():
+    return generate_calls(ROWS, seed=7)
+
+
+@pytest.fixture(scope="session")
+def total_calls(raw_calls):
+    # process_calls without the file read and the sort
+    total_calls, _ = split_spam(normalize_calls(raw_calls.copy()))
+    return add_phone_roles(classify(total_calls))
+
+
+@pytest.fixture(scope="session")
+def result(total_calls):
+    # Every view of the calls, without spam
+    return build_result(total_calls.copy(), total_calls.iloc[:0])
@@ -0,0 +1,42 @@
+"""Parquet bundles read back as the sheets they were written from."""
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from phonesystem.bundle import read_bundle, write_bundle
+from phonesystem.pipeline import build_result, result_sheets
+
+
+def _as_written(df):
+    # Lists come back as one array per row
+    df = df.reset_index(drop=True)
+    for column in df.columns[df.dtypes == object]:
+        df[column] = df[column].map(lambda value: value.tolist() if isinstance(value, np.ndarray) else value)
+    return df
+
+
+@pytest.mark.parametrize("normalized", [False, True])
+def test_bundle_round_trip(result, total_calls, normalized):
+    if normalized:
+        result = build_result(total_calls.copy(), total_calls.iloc[:0], normalized=True)
+    sheets = result_sheets(result)
+    buffer = io.BytesIO()
+    write_bundle(sheets, buffer)
+    buffer.seek(0)
+    loaded = read_bundle(buffer)
+
+    assert list(loaded) == list(sheets)
+    for name, df in sheets.items():
+        expected = df.reset_index(drop=True)
+        if name == "Skill_Value_Counts":
+            # Agent names and phone numbers share one column, written as text
+            expected["value"] = expected["value"].map(lambda value: None if pd.isna(value) else str(value))
+        assert_frame_equal(
+            _as_written(loaded[name]), expected, check_dtype=False, check_categorical=False, obj=name
+        )
+    assert isinstance(loaded["Master_Contacts"]["Timeframe"].dtype, pd.PeriodDtype)
+    assert read_bundle(buffer, sheets=["Transfer_Paths"]).keys() == {"Transfer_Paths"}
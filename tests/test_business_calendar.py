@@ -0,0 +1,108 @@
+"""Business-hours flags: schedules, weekends, holidays and time zones."""
+
+import dataclasses
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from phonesystem.business_calendar import BusinessCalendar
+from phonesystem.config import BUSINESS_HOURS, DEFAULT_BUSINESS_HOURS
+from phonesystem.pipeline import DEFAULT_CALENDAR
+
+
+def _flag(calendar, calls):
+    times, departments = zip(*calls)
+    return calendar.flag(pd.Series(pd.to_datetime(list(times), format="ISO8601")), pd.Series(departments)).tolist()
+
+
+def test_matches_a_row_by_row_check(total_calls):
+    holidays = ("2024-01-15", "2024-02-19")
+    calendar = dataclasses.replace(DEFAULT_CALENDAR, holidays=holidays)
+
+    def in_hours(start_time, department):
+        start_h, start_m, end_h, end_m = BUSINESS_HOURS.get(department, DEFAULT_BUSINESS_HOURS)
+        minute = start_time.hour * 60 + start_time.minute + start_time.second / 60
+        return int(
+            start_time.weekday() < 5
+            and str(start_time.date()) not in holidays
+            and start_h * 60 + start_m <= minute <= end_h * 60 + end_m
+        )
+
+    expected = [
+        in_hours(start_time, department)
+        for start_time, department in zip(total_calls["start_time"], total_calls["department"])
+    ]
+    flags = calendar.flag(total_calls["start_time"], total_calls["department"])
+    assert flags.tolist() == expected
+    assert 0 < flags.sum() < len(flags)
+
+
+def test_weekends_and_inclusive_boundaries():
+    assert _flag(DEFAULT_CALENDAR, [
+        ("2024-01-13 10:00", "Sales"),  # Saturday
+        ("2024-01-14 10:00", "Sales"),  # Sunday
+        ("2024-01-15 08:00", "Sales"),
+        ("2024-01-15 17:00", "Sales"),
+        ("2024-01-15 17:00:30", "Sales"),
+        ("2024-01-15 07:59", "Sales"),
+    ]) == [0, 0, 1, 1, 0, 0]
+
+
+def test_unknown_departments_take_the_default_hours_without_warning():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        flags = _flag(DEFAULT_CALENDAR, [
+            ("2024-01-15 09:30", "Nowhere"),
+            ("2024-01-15 08:30", "Nowhere"),
+            ("2024-01-15 08:30", None),
+        ])
+    assert flags == [1, 0, 0]
+
+
+def test_holidays():
+    calendar = dataclasses.replace(DEFAULT_CALENDAR, holidays=("2024-12-25",))
+    assert _flag(calendar, [
+        ("2024-12-25 10:00", "Sales"),
+        ("2024-12-24 10:00", "Sales"),
+    ]) == [0, 1]
+
+
+def test_per_day_schedules():
+    calendar = BusinessCalendar(hours={"Support": {5: (10, 0, 14, 0)}}, default_hours=(9, 0, 17, 0))
+    assert _flag(calendar, [
+        ("2024-01-13 11:00", "Support"),  # Saturday, open
+        ("2024-01-15 11:00", "Support"),  # Monday, no entry: closed
+        ("2024-01-15 11:00", "Sales"),
+    ]) == [1, 0, 1]
+
+
+def test_timezone_conversion_follows_dst():
+    calendar = dataclasses.replace(
+        DEFAULT_CALENDAR, source_timezone="UTC", timezones={"Sales": "America/New_York"},
+    )
+    assert _flag(calendar, [
+        ("2024-01-15 12:30", "Sales"),  # 07:30 EST
+        ("2024-01-15 13:00", "Sales"),  # 08:00 EST
+        ("2024-03-11 12:30", "Sales"),  # 08:30 EDT
+        ("2024-01-15 22:30", "Sales"),  # 17:30 EST
+        ("2024-01-15 12:30", "Technical Team"),  # not converted
+    ]) == [0, 1, 1, 0, 1]
+
+
+def test_nonexistent_local_times_are_outside_business_hours():
+    around_the_clock = {day: (0, 0, 23, 59) for day in range(7)}
+    calendar = BusinessCalendar(
+        hours={"Support": around_the_clock}, source_timezone="America/New_York",
+        timezones={"Support": "UTC"},
+    )
+    # 02:30 does not exist on 2024-03-10 in New York
+    assert _flag(calendar, [
+        ("2024-03-10 02:30", "Support"),
+        ("2024-03-10 03:30", "Support"),
+    ]) == [0, 1]
+
+
+def test_empty_input():
+    flags = DEFAULT_CALENDAR.flag(pd.Series([], dtype="datetime64[us]"), pd.Series([], dtype=object))
+    assert flags.dtype == np.int64 and len(flags) == 0
@@ -0,0 +1,56 @@
+"""Byte budget and LRU eviction of the result cache."""
+
+import numpy as np
+import pandas as pd
+
+from phonesystem.cache import ResultCache, estimate_bytes
+from phonesystem.pipeline import build_result
+
+
+def _frame(rows):
+    return pd.DataFrame({"value": np.arange(rows, dtype=np.int64)})
+
+
+def test_entries_are_evicted_past_the_budget():
+    size = estimate_bytes(_frame(1_000))
+    cache = ResultCache(max_bytes=3 * size)
+    for key in "abcde":
+        cache.put(key, _frame(1_000))
+    stats = cache.stats()
+    assert len(cache) == 3
+    assert stats.evictions == 2
+    assert stats.bytes <= cache.max_bytes
+    assert "a" not in cache and "b" not in cache
+
+
+def test_eviction_is_least_recently_used():
+    size = estimate_bytes(_frame(1_000))
+    cache = ResultCache(max_bytes=2 * size)
+    cache.put("a", _frame(1_000))
+    cache.put("b", _frame(1_000))
+    cache.get("a")
+    cache.put("c", _frame(1_000))
+    assert "a" in cache and "c" in cache and "b" not in cache
+
+
+def test_value_over_budget_is_not_stored():
+    cache = ResultCache(max_bytes=estimate_bytes(_frame(10)))
+    value = _frame(1_000)
+    assert cache.put("big", value) is value
+    assert "big" not in cache and len(cache) == 0
+
+
+def test_list_and_dict_cells_are_counted():
+    flat = pd.DataFrame({"cell": [None] * 1_000}, dtype=object)
+    nested = pd.DataFrame({"cell": [list(range(50))] * 1_000})
+    counts = pd.DataFrame({"cell": [{f"555{i:07d}": i for i in range(20)}] * 1_000})
+    # Each list holds 50 int objects of at least 24 bytes
+    assert estimate_bytes(nested) - estimate_bytes(flat) >= 1_000 * 50 * 24
+    assert estimate_bytes(counts) > estimate_bytes(flat) + 1_000 * 20 * 2 * 24
+
+
+def test_materialized_master_contacts_are_counted(total_calls):
+    result = build_result(total_calls.copy(), total_calls.iloc[:0])
+    lazy = estimate_bytes(result)
+    result.master_contact_frame()
+    assert estimate_bytes(result) > lazy + estimate_bytes(result.master_contacts) * 0.9
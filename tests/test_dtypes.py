@@ -0,0 +1,86 @@
+"""Compact call-table dtypes and their export."""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from pandas.testing import assert_frame_equal
+
+from phonesystem.bundle import to_table
+from phonesystem.dtypes import CARRIED_COLUMNS, widen_numbers
+from phonesystem.pipeline import build_result
+from phonesystem.query import QueryEngine, duckdb_available
+
+
+@pytest.fixture(scope="module")
+def results(total_calls):
+    return {
+        compact: build_result(total_calls.copy(), total_calls.iloc[:0], compact=compact)
+        for compact in (False, True)
+    }
+
+
+def test_compaction_leaves_the_views_unchanged(results):
+    full, compact = results[False], results[True]
+    for option, df in full.skill_dfs.items():
+        assert_frame_equal(compact.skill_dfs[option], df, obj=option)
+    for name in ["phone_numbers", "interval_calls", "transfer_paths", "repeat_contacts"]:
+        assert_frame_equal(getattr(compact, name), getattr(full, name), obj=name)
+    decoded = compact.total_calls_frame().astype(full.total_calls.dtypes.to_dict())
+    assert_frame_equal(decoded, full.total_calls)
+
+
+def test_carried_columns_are_compacted_before_the_views(total_calls):
+    calls = total_calls.copy()
+    build_result(calls, total_calls.iloc[:0], views={})
+    # build_result compacts them in the caller's frame, freeing the originals
+    for column in CARRIED_COLUMNS:
+        assert calls[column].memory_usage(deep=True) < total_calls[column].memory_usage(deep=True)
+
+
+def test_memory_report_compares_the_loaded_table(results, total_calls):
+    report = results[True].memory_report.set_index("column")
+    assert report.loc["media_name", "dtype_before"] == str(total_calls["media_name"].dtype)
+    assert report.loc["TOTAL", "bytes_before"] == total_calls.memory_usage(deep=True, index=False).sum()
+    assert report.loc["TOTAL", "reduction"] > 2
+
+
+def test_exported_numbers_are_64_bit(results):
+    compact = results[True]
+    assert compact.total_calls["PreQueue"].dtype == np.float32
+    schema = to_table(compact.total_calls_frame()).schema
+    for field in schema:
+        assert not pa.types.is_integer(field.type) or field.type == pa.int64(), field
+        assert not pa.types.is_floating(field.type) or field.type == pa.float64(), field
+
+
+def test_widen_numbers():
+    frame = pd.DataFrame({
+        "small": np.array([100, 120], dtype=np.int8),
+        "flag": pd.array([1, None], dtype="Int8"),
+        "time": np.array([1.5, 2.0], dtype=np.float32),
+        "label": pd.Categorical(["a", "b"]),
+    })
+    widened = widen_numbers(frame)
+    assert widened.dtypes.astype(str).tolist() == ["int64", "Int64", "float64", "category"]
+    assert (widened["small"] + widened["small"]).tolist() == [200, 240]
+    wide = pd.DataFrame({"calls": [1, 2]})
+    assert widen_numbers(wide) is wide
+
+
+@pytest.mark.skipif(not duckdb_available(), reason="needs duckdb")
+def test_duckdb_sums_compacted_timings(results, tmp_path):
+    compact = results[True]
+    calls = compact.total_calls_frame()
+    engine = QueryEngine.from_sheets(
+        {"Total_Calls": calls}, temp_directory=str(tmp_path / "spill"),
+    )
+    try:
+        totals = engine.query(
+            "SELECT sum(PreQueue + InQueue) AS queue, sum(Agent_Time * 1000) AS agent FROM Total_Calls"
+        )
+    finally:
+        engine.close()
+    full = results[False].total_calls
+    assert totals["queue"].iloc[0] == pytest.approx((full["PreQueue"] + full["InQueue"]).sum())
+    assert totals["agent"].iloc[0] == pytest.approx((full["Agent_Time"] * 1000).sum())
@@ -0,0 +1,136 @@
+"""The fast paths against the implementations they replaced, on synthetic exports."""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal, assert_series_equal
+
+from phonesystem.datetimes import assemble_start_times, format_timestamps
+from phonesystem.pipeline import (
+    CALL_TYPE_OPTIONS,
+    aggregate_skill_slice,
+    aggregate_skills,
+    filter_call_type,
+    run_pipeline,
+)
+from phonesystem.streaming import iter_chunks, stream_pipeline
+from phonesystem.synthetic import write_calls
+
+
+# =========================
+# Skill Aggregation
+# =========================
+@pytest.mark.parametrize("option", CALL_TYPE_OPTIONS)
+def test_vectorized_counters_match_lambdas(total_calls, option):
+    df_filtered = filter_call_type(total_calls, option)
+    assert_frame_equal(
+        aggregate_skill_slice(df_filtered, vectorized_counters=True),
+        aggregate_skill_slice(df_filtered, vectorized_counters=False),
+    )
+
+
+def test_single_pass_matches_per_option_loop(total_calls):
+    single_pass = aggregate_skills(total_calls, single_pass=True)
+    per_option = aggregate_skills(total_calls, single_pass=False)
+    assert list(single_pass) == list(per_option)
+    for option in CALL_TYPE_OPTIONS:
+        assert_frame_equal(single_pass[option], per_option[option], obj=option)
+
+
+# =========================
+# Streaming
+# =========================
+@pytest.mark.parametrize("normalized", [False, True])
+def test_stream_matches_batch(raw_calls, tmp_path, normalized):
+    path = write_calls(raw_calls, str(tmp_path / "calls.csv"))
+    batch = run_pipeline(path, normalized=normalized)
+    stream, stats = stream_pipeline(path, chunksize=3_000, normalized=normalized)
+    assert stats.chunks == -(-len(raw_calls) // 3_000)
+
+    def same(left, right, name):
+        assert_frame_equal(
+            left.reset_index(drop=True), right.reset_index(drop=True),
+            check_dtype=False, obj=name,
+        )
+
+    for option in CALL_TYPE_OPTIONS:
+        same(batch.skill_dfs[option], stream.skill_dfs[option], f"Skill - {option}")
+        same(batch.team_dfs[option], stream.team_dfs[option], f"Team - {option}")
+    # One start time per call is not kept between chunks
+    phone_numbers = batch.phone_numbers.drop(columns="call_times_list", errors="ignore")
+    same(phone_numbers, stream.phone_numbers, "Phone_Numbers")
+    same(batch.interval_calls, stream.interval_calls, "Interval_Calls")
+    for name, counts in batch.value_counts.items():
+        keys = list(counts.columns)
+        same(counts.sort_values(keys), stream.value_counts[name].sort_values(keys), name)
+
+
+def test_xlsx_chunks_read_the_first_sheet(raw_calls, tmp_path):
+    from openpyxl import load_workbook
+
+    path = write_calls(raw_calls.head(250), str(tmp_path / "calls.xlsx"))
+    # A workbook saved with a notes sheet selected
+    workbook = load_workbook(path)
+    workbook.create_sheet("Notes").append(["exported by hand"])
+    workbook.active = 1
+    workbook.save(path)
+
+    chunks = list(iter_chunks(path, chunksize=100))
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+    assert_frame_equal(
+        pd.concat(chunks, ignore_index=True), pd.read_excel(path), check_dtype=False
+    )
+
+
+# =========================
+# Start Times
+# =========================
+def _reference_start_times(start_date, text):
+    # The original parse: date and time strings concatenated
+    return pd.to_datetime(
+        start_date.dt.strftime("%Y-%m-%d") + " " + text, errors="coerce"
+    ).astype("datetime64[us]")
+
+
+def test_start_times_match_string_concat(raw_calls):
+    start_date = pd.to_datetime(raw_calls["start_date"])
+    timestamps, coerced = assemble_start_times(start_date, raw_calls["start_time"])
+    assert coerced == 0
+    assert_series_equal(
+        timestamps.astype("datetime64[us]"),
+        _reference_start_times(start_date, raw_calls["start_time"]),
+        check_names=False,
+    )
+
+
+def test_start_time_shapes_agree(raw_calls):
+    start_date = pd.to_datetime(raw_calls["start_date"])
+    expected, _ = assemble_start_times(start_date, raw_calls["start_time"])
+    offsets = pd.to_timedelta(raw_calls["start_time"])
+    shapes = {
+        "time objects": offsets.map(lambda offset: (datetime.datetime.min + offset).time()),
+        "Excel fractions": offsets.dt.total_seconds() / 86_400,
+        "timedeltas": offsets,
+        "datetimes": start_date + offsets,
+    }
+    # Mixed shapes in one column, e.g. from a workbook edited by hand
+    mixed = raw_calls["start_time"].astype(object).copy()
+    mixed[::3] = shapes["time objects"][::3]
+    shapes["mixed"] = mixed
+    for name, start_time in shapes.items():
+        timestamps, coerced = assemble_start_times(start_date, start_time)
+        assert coerced == 0, name
+        assert_series_equal(timestamps, expected, check_names=False, obj=name)
+
+
+def test_format_timestamps_match_strftime(raw_calls):
+    start_date = pd.to_datetime(raw_calls["start_date"])
+    timestamps, _ = assemble_start_times(start_date, raw_calls["start_time"])
+    timestamps[::50] = pd.NaT
+    expected = timestamps.dt.strftime("%Y-%m-%d %H:%M:%S").to_numpy(dtype=object, na_value=np.nan)
+    formatted = format_timestamps(timestamps)
+    assert formatted.dtype == object
+    assert pd.isna(formatted).tolist() == pd.isna(expected).tolist()
+    assert formatted[~pd.isna(expected)].tolist() == expected[~pd.isna(expected)].tolist()
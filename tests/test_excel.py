@@ -0,0 +1,31 @@
+"""Background workbook builds."""
+
+import io
+import os
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from phonesystem.excel import WorkbookBuild
+
+
+def _open_files():
+    return len(os.listdir("/proc/self/fd")) if os.path.isdir("/proc/self/fd") else 0
+
+
+def test_read_returns_the_workbook_and_closes_it(tmp_path):
+    sheets = {"Calls": pd.DataFrame({"skill_name": ["A-IB", "B-OB"], "calls": [3, 4]})}
+    build = WorkbookBuild.start(sheets, directory=str(tmp_path))
+    build.path()
+    before = _open_files()
+    data = build.read()
+    assert _open_files() == before
+    assert_frame_equal(pd.read_excel(io.BytesIO(data), sheet_name="Calls"), sheets["Calls"])
+
+
+def test_discard_removes_the_file(tmp_path):
+    build = WorkbookBuild.start({"Calls": pd.DataFrame({"calls": [1]})}, directory=str(tmp_path))
+    path = build.path()
+    assert os.path.exists(path)
+    build.discard()
+    assert not os.path.exists(path)
@@ -0,0 +1,69 @@
+"""Department and business-hours selection from the filter index."""
+
+import ast
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from phonesystem.config import CALL_TYPE_OPTIONS
+from phonesystem.filters import MASTER_SHEET, FilterIndex, sheet_call_type
+from phonesystem.pipeline import excel_sheets, result_sheets
+
+
+def _reference_select(all_sheets, department, business_hours_only):
+    # One boolean mask per sheet, as the dashboard filtered before the index
+    selected = {}
+    for name, df in all_sheets.items():
+        if business_hours_only and name.startswith(("Team - ", "Skill - ", "Rollup - ")):
+            if not name.endswith("Business Hours"):
+                continue
+        mask = pd.Series(True, index=df.index)
+        if department != "All" and "department" in df.columns:
+            if name == MASTER_SHEET:
+                mask &= df["department"].map(
+                    lambda cell: department in (ast.literal_eval(cell) if isinstance(cell, str) else list(cell))
+                )
+            else:
+                mask &= df["department"] == department
+        if business_hours_only:
+            for flag in ("Business_Hours", "business_hours_flag"):
+                if flag in df.columns:
+                    mask &= df[flag] == 1
+        selected[name] = df.loc[mask]
+    return selected
+
+
+@pytest.mark.parametrize("department", ["All", "Sales", "Other"])
+@pytest.mark.parametrize("business_hours_only", [False, True])
+@pytest.mark.parametrize("as_text", [False, True])
+def test_selection_matches_row_masks(result, department, business_hours_only, as_text):
+    sheets = result_sheets(result)
+    if as_text:
+        # Master_Contacts departments as a workbook holds them
+        sheets[MASTER_SHEET] = sheets[MASTER_SHEET].assign(
+            department=sheets[MASTER_SHEET]["department"].map(str)
+        )
+    selected = FilterIndex.build(sheets).select(sheets, department, business_hours_only)
+    expected = _reference_select(sheets, department, business_hours_only)
+    assert list(selected) == list(expected)
+    for name, df in expected.items():
+        assert_frame_equal(selected[name], df, obj=name)
+    assert 0 < len(selected["Total_Calls"]) <= len(sheets["Total_Calls"])
+
+
+def test_truncated_sheet_names_keep_their_call_type():
+    assert sheet_call_type("Skill - After Hours Business Ho", "Skill - ") == "After Hours Business Hours"
+    assert sheet_call_type("Team - All Calls Business Hours", "Team - ") == "All Calls Business Hours"
+    assert sheet_call_type("Skill - After Hours", "Skill - ") == "After Hours"
+    assert sheet_call_type("Skill - Unknown", "Skill - ") is None
+
+
+def test_business_hours_selection_of_workbook_sheets(result):
+    sheets = excel_sheets(result)
+    assert "Skill - After Hours Business Ho" in sheets
+    selected = FilterIndex.build(sheets).select(sheets, business_hours_only=True)
+    business_hours = [option for option in CALL_TYPE_OPTIONS if option.endswith("Business Hours")]
+    for prefix in ["Team - ", "Skill - "]:
+        kept = [sheet_call_type(name, prefix) for name in selected if name.startswith(prefix)]
+        assert kept == business_hours
@@ -0,0 +1,43 @@
+"""The interval cube against crosstabs of formatted start times."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from phonesystem.intervals import WEEKDAYS, IntervalCube, interval_labels
+
+
+def _reference_grid(total_calls, values, minutes, aggfunc):
+    # Day names and HH:MM interval starts formatted per row
+    start_time = total_calls["start_time"]
+    grid = pd.crosstab(
+        start_time.dt.day_name(),
+        start_time.dt.floor(f"{minutes}min").dt.strftime("%H:%M"),
+        values=values,
+        aggfunc=aggfunc,
+    )
+    return grid.reindex(index=WEEKDAYS, columns=interval_labels(minutes))
+
+
+@pytest.mark.parametrize("minutes", [15, 30, 60])
+def test_grids_match_crosstabs(total_calls, minutes):
+    cube = IntervalCube.from_calls(total_calls)
+    calls = _reference_grid(total_calls, total_calls["contact_id"], minutes, "count").fillna(0)
+    assert_frame_equal(cube.grid("calls", minutes), calls, check_dtype=False, check_names=False)
+
+    sales = total_calls.loc[(total_calls["department"] == "Sales") & (total_calls["Business_Hours"] == 1)]
+    average = _reference_grid(sales, sales["InQueue"].fillna(0), minutes, "mean")
+    assert_frame_equal(
+        cube.grid("avg_inqueue_time", minutes, department="Sales", business_hours_only=True),
+        average, check_names=False,
+    )
+
+
+def test_merged_and_read_back_cubes_match(total_calls):
+    cube = IntervalCube.from_calls(total_calls)
+    halves = np.array_split(np.arange(len(total_calls)), 2)
+    merged = IntervalCube.merge([IntervalCube.from_calls(total_calls.iloc[half]) for half in halves])
+    assert_frame_equal(merged.counts, cube.counts)
+    read_back = IntervalCube.from_frame(cube.to_frame())
+    assert_frame_equal(read_back.grid("abandon_rate", 60), cube.grid("abandon_rate", 60))
@@ -0,0 +1,28 @@
+"""Master contact legs against per-contact pandas groupbys."""
+
+import numpy as np
+from pandas.testing import assert_frame_equal, assert_series_equal
+
+from phonesystem.master_contacts import PATH_SEPARATOR, UNKNOWN_SKILL, MasterContactLegs
+from phonesystem.pipeline import sort_calls
+
+
+def test_legs_follow_start_time_in_any_input_order(total_calls):
+    in_order = sort_calls(total_calls)
+    shuffled = total_calls.sample(frac=1, random_state=3)
+    assert_frame_equal(
+        MasterContactLegs.from_calls(shuffled).to_frame(),
+        MasterContactLegs.from_calls(in_order).to_frame(),
+    )
+
+    summary = MasterContactLegs.from_calls(shuffled).summary
+    contacts = in_order.groupby("master_contact_id", sort=True)
+    expected_paths = contacts["skill_name"].agg(
+        lambda skills: PATH_SEPARATOR.join(skills.fillna(UNKNOWN_SKILL))
+    )
+    assert_series_equal(
+        summary["skill_path"].astype(str), expected_paths.astype(str), check_names=False
+    )
+    span = contacts["start_time"].agg(lambda times: (times.iloc[-1] - times.iloc[0]).total_seconds())
+    np.testing.assert_allclose(summary["first_to_last_leg_seconds"], span)
+    assert (summary["transfer_count"].to_numpy() == contacts.size().to_numpy() - 1).all()
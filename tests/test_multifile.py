@@ -0,0 +1,35 @@
+"""Merging several exports against reading them as one."""
+
+import pandas as pd
+
+from phonesystem.multifile import process_files
+from phonesystem.synthetic import write_calls
+
+
+def _contact_counts(processed):
+    return pd.concat([frame["contact_id"] for frame in processed]).value_counts()
+
+
+def test_repeats_within_a_file_are_kept(raw_calls, tmp_path):
+    first = raw_calls.iloc[:400].copy()
+    # One contact exported twice in the first file
+    first = pd.concat([first, first.iloc[[10]]], ignore_index=True)
+    repeated = str(first["contact_id"].iloc[10])
+    second = raw_calls.iloc[300:600].copy()
+    second.loc[second.index[:20], "Total_Time"] += 1
+
+    first_path = write_calls(first, str(tmp_path / "first.csv"))
+    second_path = write_calls(second, str(tmp_path / "second.csv"))
+    single = _contact_counts(process_files([first_path]))
+    merged_calls, merged_spam = process_files([first_path, second_path])
+    merged = _contact_counts((merged_calls, merged_spam))
+
+    assert single[repeated] == 2
+    assert merged[repeated] == 2
+    assert len(merged) == 600 and (merged.drop(repeated) == 1).all()
+    # The later file wins across files
+    changed = merged_calls.set_index("contact_id").loc[
+        second["contact_id"].iloc[:20].astype(str).tolist(), "Total_Time"
+    ]
+    original = second["Total_Time"].iloc[:20].fillna(0).to_numpy()
+    assert (changed.to_numpy() == original).all()
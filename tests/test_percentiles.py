@@ -0,0 +1,46 @@
+"""Percentiles against groupby quantiles, and the sketch's error bound."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from phonesystem.config import PERCENTILE_COLUMNS, PERCENTILES, ROLLUP_LEVELS, ROLLUP_PERIODS
+from phonesystem.percentiles import PercentileSketch, exact_percentiles, percentile_name
+
+
+def _reference_percentiles(total_calls, keys, period="Month"):
+    calls = total_calls.assign(
+        Timeframe=pd.to_datetime(total_calls["Timeframe"]).dt.to_period(ROLLUP_PERIODS[period])
+    )
+    grouped = calls.groupby(["Timeframe"] + keys, sort=True)
+    expected = grouped.size().rename("calls").to_frame()
+    for column in PERCENTILE_COLUMNS:
+        for quantile in PERCENTILES:
+            expected[percentile_name(column, quantile)] = grouped[column].quantile(quantile)
+    return expected.reset_index()[keys + ["Timeframe"] + list(expected.columns)]
+
+
+@pytest.mark.parametrize("level", ["Skill", "Team"])
+def test_exact_percentiles_match_quantile(total_calls, level):
+    keys = ROLLUP_LEVELS[level]
+    assert_frame_equal(
+        exact_percentiles(total_calls, keys),
+        _reference_percentiles(total_calls, keys),
+        check_dtype=False,
+    )
+
+
+@pytest.mark.parametrize("level, period", [("Skill", "Month"), ("Department", "Quarter"), ("Company", "Year")])
+def test_sketch_is_within_its_accuracy(total_calls, level, period):
+    keys = ROLLUP_LEVELS[level]
+    # Sketches of three chunks, merged
+    chunks = np.array_split(np.arange(len(total_calls)), 3)
+    sketch = PercentileSketch.merge([PercentileSketch.from_calls(total_calls.iloc[chunk]) for chunk in chunks])
+    estimated = sketch.percentiles(keys, period=period)
+    expected = _reference_percentiles(total_calls, keys, period)
+    counts = keys + ["Timeframe", "calls"]
+    assert_frame_equal(estimated[counts], expected[counts], check_dtype=False)
+    for column in expected.columns[len(keys) + 2:]:
+        error = np.abs(estimated[column] - expected[column])
+        assert (error <= sketch.accuracy * expected[column].abs() + 1e-9).all(), column
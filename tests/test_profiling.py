@@ -0,0 +1,78 @@
+"""Stage records and process-wide allocation tracing."""
+
+import threading
+import time
+import tracemalloc
+
+from phonesystem.profiling import StageProfiler, stage
+
+
+def test_stages_record_rows_and_resident_memory():
+    profiler = StageProfiler()
+    assert not profiler.trace_memory
+    with profiler.activate():
+        with stage("load") as record:
+            record.rows_out = 3
+        with stage("allocate", 3) as record:
+            block = bytearray(64 * 1024 * 1024)
+            record.rows_out = len(block) // (64 * 1024 * 1024)
+    assert not tracemalloc.is_tracing()
+    load, allocate = profiler.records
+    assert (load.rows_out, allocate.rows_in, allocate.rows_out) == (3, 3, 1)
+    assert load.peak_bytes is None
+    if allocate.max_rss_bytes is not None:
+        assert allocate.max_rss_bytes >= load.max_rss_bytes
+    frame = profiler.to_frame()
+    assert frame["stage"].tolist() == ["load", "allocate"]
+    assert frame["peak_mb"].isna().all()
+
+
+def test_traced_stage_peaks_nest():
+    profiler = StageProfiler(trace_memory=True)
+    with profiler.activate():
+        with stage("outer"):
+            with stage("inner"):
+                block = bytearray(8 * 1024 * 1024)
+            del block
+    outer, inner = profiler.records
+    assert inner.peak_bytes >= 8 * 1024 * 1024
+    assert outer.peak_bytes >= inner.peak_bytes
+    assert not tracemalloc.is_tracing()
+
+
+def test_traced_runs_do_not_overlap():
+    running, overlaps, errors = [], [], []
+
+    def run():
+        try:
+            with StageProfiler(trace_memory=True).activate():
+                running.append(1)
+                overlaps.append(len(running))
+                with stage("work"):
+                    time.sleep(0.05)
+                    assert tracemalloc.is_tracing()
+                running.pop()
+        except AssertionError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert overlaps == [1, 1, 1, 1]
+    assert not tracemalloc.is_tracing()
+
+
+def test_untraced_runs_leave_tracing_alone():
+    traced = StageProfiler(trace_memory=True)
+    with traced.activate():
+        with stage("traced") as record:
+            block = bytearray(8 * 1024 * 1024)
+            del block
+            with StageProfiler().activate():
+                with stage("untraced"):
+                    pass
+        assert tracemalloc.is_tracing()
+    assert record.peak_bytes >= 8 * 1024 * 1024
@@ -0,0 +1,59 @@
+"""Queries over filtered views against the same cuts in pandas."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from phonesystem.bundle import write_bundle
+from phonesystem.pipeline import result_sheets
+from phonesystem.query import QueryEngine, duckdb_available
+
+
+pytestmark = pytest.mark.skipif(not duckdb_available(), reason="needs duckdb")
+
+AGENT_CUT = """
+    SELECT agent_name, campaign_name, count(*) AS calls, sum(InQueue) AS inqueue_time
+    FROM Total_Calls GROUP BY ALL ORDER BY agent_name, campaign_name
+"""
+
+
+@pytest.fixture(params=["sheets", "bundle"])
+def engine(request, result, tmp_path):
+    sheets = result_sheets(result)
+    config = {"temp_directory": str(tmp_path / "spill")}
+    if request.param == "sheets":
+        engine = QueryEngine.from_sheets(sheets, **config)
+    else:
+        path = write_bundle(sheets, str(tmp_path / "calls.parquet.zip"))
+        engine = QueryEngine.from_bundle(path, **config)
+    yield engine
+    engine.close()
+
+
+@pytest.mark.parametrize("department, business_hours_only", [("All", False), ("Sales", True)])
+def test_views_match_pandas_cuts(engine, result, department, business_hours_only):
+    engine.select(department=department, business_hours_only=business_hours_only)
+    calls = result.total_calls_frame()
+    masters = result.master_contact_frame()
+    if department != "All":
+        calls = calls.loc[calls["department"] == department]
+        masters = masters.loc[masters["department"].map(lambda cell: department in cell)]
+    if business_hours_only:
+        calls = calls.loc[calls["Business_Hours"] == 1]
+        masters = masters.loc[masters["business_hours_flag"] == 1]
+
+    keys = ["agent_name", "campaign_name"]
+    expected = (
+        calls.astype({key: "str" for key in keys})
+        .groupby(keys, sort=True, dropna=False)
+        .agg(calls=("contact_id", "size"), inqueue_time=("InQueue", "sum"))
+        .reset_index()
+    )
+    assert_frame_equal(engine.query(AGENT_CUT), expected, check_dtype=False)
+
+    counted = engine.query("SELECT count(*) AS contacts FROM Master_Contacts")
+    assert counted["contacts"].iloc[0] == len(masters)
+    months = engine.query("SELECT DISTINCT Timeframe FROM Total_Calls ORDER BY Timeframe")
+    expected_months = np.sort(pd.to_datetime(calls["Timeframe"]).unique())
+    assert pd.to_datetime(months["Timeframe"]).tolist() == list(pd.DatetimeIndex(expected_months))
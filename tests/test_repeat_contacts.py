@@ -0,0 +1,55 @@
+"""Repeat contacts against per-number shifts of the sorted calls."""
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from phonesystem.config import REPEAT_WINDOWS
+from phonesystem.repeat_contacts import REPEAT_KEYS, RepeatIndex
+
+
+def _reference_rates(total_calls, months=None):
+    calls = total_calls.loc[
+        (total_calls["call_category"] != "Outbound")
+        & total_calls["external_number"].notna()
+        & total_calls["start_time"].notna()
+    ]
+    # First leg of every master contact per number
+    calls = calls.sort_values(["external_number", "start_time"], kind="stable")
+    calls = calls.drop_duplicates(["external_number", "master_contact_id"])
+    by_number = calls.groupby("external_number")["start_time"]
+    following = by_number.shift(-1) - calls["start_time"]
+    preceding = calls["start_time"] - by_number.shift(1)
+
+    frame = calls[REPEAT_KEYS].assign(
+        Timeframe=pd.to_datetime(calls["Timeframe"]).dt.to_period("M"), contacts=1
+    )
+    for kind, gaps in (("repeat_contacts", following), ("callbacks", preceding)):
+        for label, hours in REPEAT_WINDOWS.items():
+            frame[f"{kind}_{label}"] = (gaps <= pd.Timedelta(hours=hours)).astype(int)
+    if months is not None:
+        frame = frame.loc[frame["Timeframe"].astype(str).isin(months)]
+    rates = frame.groupby(REPEAT_KEYS + ["Timeframe"], sort=True).sum().reset_index()
+    for label in REPEAT_WINDOWS:
+        rates[f"repeat_rate_{label}"] = rates[f"repeat_contacts_{label}"] / rates["contacts"]
+    return rates
+
+
+def _sorted(rates):
+    return rates.sort_values(REPEAT_KEYS + ["Timeframe"], ignore_index=True)
+
+
+def test_rates_match_shifted_gaps(total_calls):
+    rates = RepeatIndex.from_calls(total_calls).rates()
+    expected = _reference_rates(total_calls)
+    assert_frame_equal(_sorted(rates), _sorted(expected), check_dtype=False)
+    assert rates["repeat_contacts_7d"].sum() > 0
+
+
+@pytest.mark.parametrize("month", ["2024-01", "2024-02", "2024-03"])
+def test_adjacent_calls_extend_the_windows(total_calls, month):
+    in_month = total_calls["Timeframe"].astype(str).str.startswith(month).to_numpy()
+    index = RepeatIndex.from_calls(total_calls.loc[in_month])
+    adjacent = RepeatIndex.from_calls(total_calls.loc[~in_month])
+    expected = _reference_rates(total_calls, months=[month])
+    assert_frame_equal(_sorted(index.rates(adjacent=adjacent)), _sorted(expected), check_dtype=False)
@@ -0,0 +1,47 @@
+"""Rollups of the cube against groupbys of the call table."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from phonesystem.config import ROLLUP_LEVELS, ROLLUP_PERIODS
+from phonesystem.pipeline import filter_call_type
+from phonesystem.rollup import RollupCube
+from phonesystem.skill_aggregation import CATEGORY_COLUMNS, SLA_COLUMNS, SUM_COLUMNS, build_skill_partials
+
+
+def _reference_rollup(total_calls, level, period, option):
+    calls = filter_call_type(total_calls, option)
+    keys = ROLLUP_LEVELS[level]
+    calls = calls.assign(
+        Timeframe=pd.to_datetime(calls["Timeframe"]).dt.to_period(ROLLUP_PERIODS[period]),
+        **{name: calls["SLA"] == level for name, level in SLA_COLUMNS.items()},
+        **{name: calls["call_category"] == category for name, category in CATEGORY_COLUMNS.items()},
+    )
+    grouped = calls.groupby(keys + ["Timeframe"], sort=True)
+    expected = grouped.agg(
+        call_volume=("master_contact_id", "count"),
+        **{name: (column, "sum") for name, column in SUM_COLUMNS.items()},
+        **{name: (name, "sum") for name in list(SLA_COLUMNS) + list(CATEGORY_COLUMNS)},
+        unique_agents_count=("agent_name", "nunique"),
+        unique_teams_count=("team_name", "nunique"),
+        unique_skills_count=("skill_name", "nunique"),
+    )
+    return expected.reset_index()
+
+
+@pytest.mark.parametrize("level", list(ROLLUP_LEVELS))
+@pytest.mark.parametrize("period", list(ROLLUP_PERIODS))
+def test_rollups_match_groupby(total_calls, level, period):
+    cube = RollupCube.from_partials(build_skill_partials(total_calls))
+    # Cubes of two halves merge into the same rollups
+    halves = np.array_split(np.arange(len(total_calls)), 2)
+    merged = RollupCube.merge([
+        RollupCube.from_partials(build_skill_partials(total_calls.iloc[half])) for half in halves
+    ])
+    for option in ["All Calls", "Inbound Business Hours"]:
+        expected = _reference_rollup(total_calls, level, period, option)
+        for rolled in (cube.rollup(level, period, option), merged.rollup(level, period, option)):
+            rolled = rolled.sort_values(ROLLUP_LEVELS[level] + ["Timeframe"], ignore_index=True)
+            assert_frame_equal(rolled[expected.columns], expected, check_dtype=False, obj=option)
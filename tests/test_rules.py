@@ -0,0 +1,47 @@
+"""The memoized skill classification against a per-row np.select."""
+
+import numpy as np
+import pandas as pd
+
+from phonesystem.rules import ClassificationRules, load_rules, save_rules
+
+
+def _reference_categories(skill_name, rules):
+    # The original classification: every row cleaned and matched
+    skill_clean = skill_name.astype(str).str.lower().str.replace(" ", "", regex=False)
+    return np.select(
+        [skill_clean.str.contains(pattern, na=False, regex=True) for _, pattern in rules.categories],
+        [label for label, _ in rules.categories],
+        default=rules.default_category,
+    )
+
+
+def test_categories_match_per_row_matching(raw_calls):
+    skill_name = raw_calls["skill_name"].copy()
+    skill_name[::97] = "Sales-OB"
+    rules = ClassificationRules()
+    categories = rules.categorize(skill_name)
+    assert categories.tolist() == _reference_categories(skill_name, rules).tolist()
+    assert len(set(categories)) > 3
+    # Read again from the memoized table
+    assert rules.categorize(skill_name).tolist() == categories.tolist()
+
+
+def test_missing_skills_take_the_default_category():
+    rules = ClassificationRules()
+    categories = rules.categorize(pd.Series(["Billing-IB", None, "Billing-IB"], dtype=object))
+    assert categories.tolist() == ["Inbound", rules.default_category, "Inbound"]
+
+
+def test_changed_rules_are_not_served_from_the_old_table(raw_calls, tmp_path):
+    skill_name = raw_calls["skill_name"]
+    ClassificationRules().categorize(skill_name)
+    changed = ClassificationRules(
+        categories=[("Voicemail", r"\bvm\b"), ("Inbound", r"\bib\b")],
+        default_category="Unmatched",
+        version="test",
+    )
+    loaded = load_rules(save_rules(changed, str(tmp_path / "rules.json")))
+    expected = _reference_categories(skill_name, changed).tolist()
+    assert loaded.categorize(skill_name).tolist() == expected
+    assert "Outbound" not in expected
@@ -0,0 +1,55 @@
+"""The month store against one full run over the same calls."""
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from phonesystem.pipeline import result_sheets, run_pipeline
+from phonesystem.store import MonthStore
+from phonesystem.synthetic import write_calls
+
+
+def _overlapping_exports(raw_calls):
+    """Two exports sharing ten days of February, with changed contacts in the second."""
+    start_date = pd.to_datetime(raw_calls["start_date"])
+    first = raw_calls.loc[start_date < "2024-02-20"].copy()
+    second = raw_calls.loc[start_date >= "2024-02-10"].copy()
+    overlap = second["contact_id"].isin(first["contact_id"])
+    spam = (second["InQueue"] == 0) & (second["PreQueue"] > 0)
+
+    # A call that is spam in the later export, and spam that became a call
+    to_spam = second.index[overlap & ~spam][:5]
+    second.loc[to_spam, ["InQueue", "PreQueue"]] = [0.0, 12.0]
+    to_call = second.index[overlap & spam][:5]
+    second.loc[to_call, "InQueue"] = 40.0
+    # A January call exported again with a March date
+    moved = first.loc[start_date.loc[first.index] < "2024-01-15"].head(5).copy()
+    moved["start_date"] = "2024-03-04"
+    second = pd.concat([second, moved], ignore_index=True)
+    return first, second
+
+
+@pytest.mark.parametrize("normalized", [False, True])
+def test_store_matches_full_run(raw_calls, tmp_path, normalized):
+    first, second = _overlapping_exports(raw_calls)
+    store = MonthStore(str(tmp_path / "store"))
+    assert store.ingest(write_calls(first, str(tmp_path / "first.csv"))) == [
+        "2024-01", "2024-02",
+    ]
+    assert store.ingest(write_calls(second, str(tmp_path / "second.csv"))) == [
+        "2024-01", "2024-02", "2024-03",
+    ]
+
+    # The later export wins on every contact_id, as in the store
+    union = pd.concat([first, second], ignore_index=True)
+    union = union.drop_duplicates(subset="contact_id", keep="last")
+    expected = result_sheets(run_pipeline(
+        write_calls(union, str(tmp_path / "union.csv")), normalized=normalized
+    ))
+    stored = result_sheets(store.result(normalized=normalized))
+    assert list(stored) == list(expected)
+    for name, frame in expected.items():
+        assert_frame_equal(
+            stored[name].reset_index(drop=True), frame.reset_index(drop=True),
+            check_dtype=False, obj=name,
+        )